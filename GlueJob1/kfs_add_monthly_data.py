@@ -19,8 +19,6 @@
 
 import pandas as pd
 import numpy as np
-import os
-from boto3 import resource
 from io import BytesIO
 from pytz import timezone
 from datetime import datetime, date
@@ -30,7 +28,15 @@ from dateutil.relativedelta import relativedelta
 import awswrangler as wr
 
 import processed_configuration as con
-from kfs_data_cleaning import transform_data_and_write_db
+from kfs_data_cleaning import transform_data_and_write_db, transform_periods_and_write_db
+from ingest_cache import read_order_files
+from kfs_order_reader import normalise_identifiers
+from kfs_history_cache import load_processed_orders
+from snowflake_key_set import delete_key_set
+from kfs_period_codec import encode_periods, code_to_period, dates_to_codes, periods_to_dates
+from kfs_dormancy import build_dormancy_state, update_dormancy_state, drop_items, dormant_items, \
+                         load_dormancy_state, save_dormancy_state
+from sku_sharding import run_sharded
 from error_logging import create_and_insert_error
 from snowflake_db_connection import connect_to_db
 
@@ -69,11 +75,23 @@ def add_monthly_data(cur, conn, run_time_stamp):
         curr_mon = now_est.strftime("%b")
         curr_yr = now_est.strftime("%Y")
         
-        # Connect to AWS S3 bucket where the orders file reside
-        s3 = resource(con.aws_service1)
-        bucket = s3.Bucket(con.bucket_name)
-        prefix = con.folder_name
-        prefix_objs = bucket.objects.filter(Prefix = prefix)
+        # Selecting the incremental files from the S3 listing and
+        # reading only those, the workbooks from their Parquet copy
+        incre_dfs, unexpected_objs, fetch_stats = read_order_files( \
+                                                con.bucket_name,
+                                                con.folder_name,
+                                                con.incre_file_pattern,
+                                                con.incre_file_extensions,
+                                                con.req_columns,
+                                                con.incre_file_max_age_days
+                                               )
+
+        if(len(unexpected_objs) > 0):
+            raise Exception( \
+                    "Incremental or current month data file is not " + 
+                    "in the expected format (csv or xlsx) for the " +
+                    curr_mon + "-" + curr_yr + " run."
+                   )
 
         # Initializing the list of dataframes that will
         # hold incremental monthly data
@@ -82,31 +100,16 @@ def add_monthly_data(cur, conn, run_time_stamp):
         # Setting the file available indicator to false
         incre_file_ind = False
         
-        # Iterating through the objects in S3 bucket folder
-        # to find incremental monthly file
-        for obj in prefix_objs:
-            name, extension = os.path.splitext(obj.key)
-            body = obj.get()['Body'].read()
-            if 'incremental' in str(obj).lower():
-                if(extension == '.csv'):
-                    temp = read_csv(BytesIO(body))
-                elif(extension == '.xlsx'):
-                    temp = read_excel(BytesIO(body),engine='openpyxl')
-                else:
-                    raise Exception( \
-                            "Incremental or current month data file is not " + 
-                            "in the expected format (csv or xlsx) for the " +
-                            curr_mon + "-" + curr_yr + " run."
-                           )
-                    
-                if(temp.shape[0] == 0):
-                    raise Exception( \
-                            "Incremental data file is empty for the " +
-                            curr_mon + "-" + curr_yr + " run."
-                           )
-                
-                prefix_dfs.append(temp)
-                incre_file_ind = True
+        # Checking the incremental monthly files read
+        for temp in incre_dfs:
+            if(temp.shape[0] == 0):
+                raise Exception( \
+                        "Incremental data file is empty for the " +
+                        curr_mon + "-" + curr_yr + " run."
+                       )
+            
+            prefix_dfs.append(temp)
+            incre_file_ind = True
         
         # Raising the resp. exception message if
         # the file is not found
@@ -146,10 +149,8 @@ def add_monthly_data(cur, conn, run_time_stamp):
         # Replacing columns with " " values with ""
         cols_to_strip=['3rd_Item_Number','2nd_Item_Number','Or_Ty']
 
-        for cl in cols_to_strip:
-#             df_monthly[cl]=df_monthly[cl].str.strip() #Commented on 9Feb23
-            df_monthly[cl]=df_monthly[cl].astype(str).str.strip()
-            df_monthly[cl]=df_monthly[cl].str.upper()
+        # Stripped and upper cased once per unique value, kept as categoricals
+        df_monthly = normalise_identifiers(df_monthly, cols_to_strip)
         
         print("Number of SKUs before filtering order types : ", df_monthly["3rd_Item_Number"].nunique())
         
@@ -184,247 +185,227 @@ def add_monthly_data(cur, conn, run_time_stamp):
         
         # Obtaining the periods for which the data is already available in the processed orders table
         print("Reading the Historical orders table ...",con.prsd_KFS_orders_table)
-        kfs_proc_order2= "select * from " + con.prsd_KFS_orders_table
-        kfs_proc_order=read_sql(kfs_proc_order2, conn)
+        kfs_proc_order, hist_stats = load_processed_orders(conn)
         
-        print("Reading MONTH_YEAR column from historical orders table ...")
-        sel_mon_yrs_from_kfs_order = "select MONTH_YEAR from " + con.prsd_KFS_orders_table
-        mon_yrs_prsd_order2=read_sql(sel_mon_yrs_from_kfs_order, conn)
-        mon_yrs_prsd_order = list(mon_yrs_prsd_order2["MONTH_YEAR"].unique())
+        # MONTH_YEAR of the historical orders table, from the same data
+        mon_yrs_prsd_order = list(kfs_proc_order["MONTH_YEAR"].unique())
         print("Unique list of MONTH_YEAR in historical orders table is : ", mon_yrs_prsd_order)
         
         # Initializing a list of dfs to store the resulting dfs
         df_results = []
 
         # Converting period (Mmm-yyyy) to dates (yyyy-mm-dd)
-        period_dates = []
-
-        for period in periods:
-            year = int(period[-4:])
-            month = list(month_abbr).index(period[:3])
-            day = 1
-            date_time_str = str(year) + '-' + str(month) +'-' + str(day)
-            period_date = datetime.strptime(date_time_str, '%Y-%m-%d')
-            period_dates.append(period_date)
+        period_dates = list(periods_to_dates(periods))
         print("period_dates : " , period_dates)
         
-        # Iterating through each available period (Mon-yyyy)
-        for period in periods:
-            if((period != 'nan') & (period != 'None')):
-
-                print('period-->', period)
-                # Pulling only records of the corresponding period
-                temp1 = df_monthly2[df_monthly2['mon_yyyy'] == period].copy()
-
-                # Setting the update indicator to true if the data for the 
-                # period is already available in the processed orders table
-                update_ind = period in (mon_yrs_prsd_order)
-                print("update_ind : ", update_ind)
-                
-                #Sorting the data by Item_id & Request_Date
-                temp2=temp1[["3rd_Item_Number","Request_Date","Quantity_Ordered"]].sort_values(by=["3rd_Item_Number","Request_Date"])
-                print("Shape of dataset sorted at Item_id & Request_Date : ", temp2.shape)
-                
-                # New addition - Removing blank item_ids
-                temp2=temp2[temp2["3rd_Item_Number"]!=""]
-                print("Shape of dataset post removal of blank item_ids : ", temp2.shape)
-                
-                # Creating a Date column which will be 1st of the month
-                temp2["Date"]=temp2["Request_Date"].to_numpy().astype('datetime64[M]')
-                print("Shape of dataset after creating Date column : ", temp2.shape)
-                
-                # Aggregating the Quantity_Ordered at Monthly level
-                temp2=temp2.groupby(["3rd_Item_Number","Date"])["Quantity_Ordered"].sum().reset_index()
-                print("Shape of dataset on aggregating the data at Monthly level : ", temp2.shape)
-                
-                # 2. Checking if there's any negative orders in Quantity_Ordered per month per sku!
-                temp2["Flag"]=np.where(temp2["Quantity_Ordered"]<0,1,0)
-                temp2["Quantity_Ordered_n"]=np.where(temp2["Quantity_Ordered"]<0,0,temp2["Quantity_Ordered"])
-                temp2.drop(columns={"Quantity_Ordered"},inplace=True)
-                temp2.rename(columns={"Quantity_Ordered_n":"Quantity_Ordered"},inplace=True)
-                print("Shape of dataset after treating for negative orders : ", temp2.shape)
-                
-                print("Flag counts : ", temp2["Flag"].value_counts(dropna=False))
-                
-                # Dropping column not required
-                temp2.drop(columns={"Flag"},inplace=True)
-                print("Data after removing Flag column : ", temp2.head(1))
+        # Dormancy state (demand of the latest months, last months with
+        # data / with demand) of every Item_id of the history
+        hist_state = history_dormancy_state(conn, kfs_proc_order)
+        
+        if(con.single_pass_periods):
+            # Processing all the periods together in a single pass
+            result, table_state = process_periods_single_pass( \
+                                                              df_monthly2,
+                                                              periods,
+                                                              kfs_proc_order,
+                                                              hist_state,
+                                                              mon_yrs_prsd_order,
+                                                              run_time_stamp,
+                                                              cur
+                                                             )
+            df_results.append(result)
+        else:
+            # Dormancy state of the table, as each period is written
+            table_state = hist_state
+
+            # Iterating through each available period (Mon-yyyy)
+            for period in periods:
+                if((period != 'nan') & (period != 'None')):
+
+                    print('period-->', period)
+                    # Pulling only records of the corresponding period
+                    temp1 = df_monthly2[df_monthly2['mon_yyyy'] == period].copy()
+
+                    # Setting the update indicator to true if the data for the 
+                    # period is already available in the processed orders table
+                    update_ind = period in (mon_yrs_prsd_order)
+                    print("update_ind : ", update_ind)
+                
+                    #Sorting the data by Item_id & Request_Date
+                    temp2=temp1[["3rd_Item_Number","Request_Date","Quantity_Ordered"]].sort_values(by=["3rd_Item_Number","Request_Date"])
+                    print("Shape of dataset sorted at Item_id & Request_Date : ", temp2.shape)
+                
+                    # New addition - Removing blank item_ids
+                    temp2=temp2[temp2["3rd_Item_Number"]!=""]
+                    print("Shape of dataset post removal of blank item_ids : ", temp2.shape)
+                
+                    # Creating a Date column which will be 1st of the month
+                    temp2["Date"]=temp2["Request_Date"].to_numpy().astype('datetime64[M]')
+                    print("Shape of dataset after creating Date column : ", temp2.shape)
+                
+                    # Aggregating the Quantity_Ordered at Monthly level
+                    temp2=temp2.groupby(["3rd_Item_Number","Date"], observed=True)["Quantity_Ordered"].sum().reset_index()
+                    print("Shape of dataset on aggregating the data at Monthly level : ", temp2.shape)
+                
+                    # 2. Checking if there's any negative orders in Quantity_Ordered per month per sku!
+                    temp2["Flag"]=np.where(temp2["Quantity_Ordered"]<0,1,0)
+                    temp2["Quantity_Ordered_n"]=np.where(temp2["Quantity_Ordered"]<0,0,temp2["Quantity_Ordered"])
+                    temp2.drop(columns={"Quantity_Ordered"},inplace=True)
+                    temp2.rename(columns={"Quantity_Ordered_n":"Quantity_Ordered"},inplace=True)
+                    print("Shape of dataset after treating for negative orders : ", temp2.shape)
+                
+                    print("Flag counts : ", temp2["Flag"].value_counts(dropna=False))
+                
+                    # Dropping column not required
+                    temp2.drop(columns={"Flag"},inplace=True)
+                    print("Data after removing Flag column : ", temp2.head(1))
               
-                # History data shouldnt have current months' data
-                data_hist=kfs_proc_order[kfs_proc_order["MONTH_YEAR"]!=period]
+                    # History data shouldnt have current months' data
+                    data_hist=kfs_proc_order[kfs_proc_order["MONTH_YEAR"]!=period]
                 
-                print("Shape of historical dataset : ", data_hist.shape)
+                    print("Shape of historical dataset : ", data_hist.shape)
                 
-                data_hist["ITEM_ID"]=data_hist["ITEM_ID"].astype(str) #Added 9thFeb23
+                    data_hist["ITEM_ID"]=data_hist["ITEM_ID"].astype(str) #Added 9thFeb23
                 
-                data_hist["year"]=data_hist["MONTH_YEAR"].str[-4:]
-                data_hist["month"]=data_hist["MONTH_YEAR"].str[:3]
-                data_hist["month"]=pd.to_datetime(data_hist.month, format='%b').dt.month
-                data_hist["day"]=1
-
-                data_hist["date_time_str"] = data_hist["year"].astype('str') + '-' + data_hist["month"].astype('str') +\
-                '-' + data_hist["day"].astype('str')
-
-                data_hist["Date"]=pd.to_datetime(data_hist['date_time_str'], format='%Y-%m-%d')
-                print("data_hist : ", data_hist.head(1))
+                    data_hist["Date"]=periods_to_dates(data_hist["MONTH_YEAR"])
+                    print("data_hist : ", data_hist.head(1))
                 
-                data_hist.drop(columns={"year","MONTH_YEAR","month","day","date_time_str"},inplace=True)
-                print("Data types of data_hist : ", data_hist.dtypes)
+                    data_hist.drop(columns={"MONTH_YEAR"},inplace=True)
+                    print("Data types of data_hist : ", data_hist.dtypes)
                 
-                # Minimum value as per group
-                dates=data_hist.groupby('ITEM_ID')['Date'].min().to_frame(name='min')
-                print("Shape of dates dataset: ", dates.shape)
+                    # Minimum value as per group
+                    dates=data_hist.groupby('ITEM_ID')['Date'].min().to_frame(name='min')
+                    print("Shape of dates dataset: ", dates.shape)
                 
-                print("Min date in Snowflake history dataset: ", data_hist["Date"].min(),\
-                      "Max date in Snowflake history dataset: ", data_hist["Date"].max())
+                    print("Min date in Snowflake history dataset: ", data_hist["Date"].min(),\
+                          "Max date in Snowflake history dataset: ", data_hist["Date"].max())
                 
-                dates=dates.reset_index()
-                print("Data types of dates dataset: ", dates.dtypes)
+                    dates=dates.reset_index()
+                    print("Data types of dates dataset: ", dates.dtypes)
                 
-                # New addition - incremenatl month data
-                temp3=temp2.drop_duplicates(subset=["3rd_Item_Number"])
-                temp3=temp3[["3rd_Item_Number"]]
-                temp3.rename(columns={"3rd_Item_Number":"ITEM_ID"},inplace=True)
-                print("No of ITEM_IDs in Incremental dataset:", temp3.shape)
+                    # New addition - incremenatl month data
+                    temp3=temp2.drop_duplicates(subset=["3rd_Item_Number"])
+                    temp3=temp3[["3rd_Item_Number"]]
+                    temp3.rename(columns={"3rd_Item_Number":"ITEM_ID"},inplace=True)
+                    print("No of ITEM_IDs in Incremental dataset:", temp3.shape)
+                
+                    # New addition
+                    dates2=dates[["ITEM_ID"]]
+                    dates_f=pd.concat([dates2,temp3])
+                    print("No of ITEM_IDs whose data for current month is to be created - may include duplicates: ", dates_f.shape)
                 
-                # New addition
-                dates2=dates[["ITEM_ID"]]
-                dates_f=pd.concat([dates2,temp3])
-                print("No of ITEM_IDs whose data for current month is to be created - may include duplicates: ", dates_f.shape)
+                    # New Addition
+                    dates_f2=dates_f.drop_duplicates(subset=["ITEM_ID"]) #Dropping duplicates, if any from final list of ITEM_IDs
+                    dates_f2["max"]=temp2["Date"].max()  #Setting max date to current month date
+                    dates_f2["max"] = pd.to_datetime(dates_f2["max"])
+                    print("No of ITEM_IDs whose data for current month is to be created : ", dates_f2.shape)
                 
-                # New Addition
-                dates_f2=dates_f.drop_duplicates(subset=["ITEM_ID"]) #Dropping duplicates, if any from final list of ITEM_IDs
-                dates_f2["max"]=temp2["Date"].max()  #Setting max date to current month date
-                dates_f2["max"] = pd.to_datetime(dates_f2["max"])
-                print("No of ITEM_IDs whose data for current month is to be created : ", dates_f2.shape)
+                    # Joining the DataFrame with the actual data to get the Quantity_Ordered populated for incremental month
+                    temp4=pd.merge(dates_f2,temp2,how='left',left_on=["ITEM_ID","max"],right_on=["3rd_Item_Number","Date"])
+                    print("Shape of dataset after merging: ", temp4.shape)
                 
-                # Joining the DataFrame with the actual data to get the Quantity_Ordered populated for incremental month
-                temp4=pd.merge(dates_f2,temp2,how='left',left_on=["ITEM_ID","max"],right_on=["3rd_Item_Number","Date"])
-                print("Shape of dataset after merging: ", temp4.shape)
+                    # Filling data with blanks with 0
+                    temp4["Quantity_Ordered"].fillna(0,inplace=True)
                 
-                # Filling data with blanks with 0
-                temp4["Quantity_Ordered"].fillna(0,inplace=True)
+                    print("Count of Date in temp4 dataset: " , temp4["Date"].value_counts(dropna=False))
                 
-                print("Count of Date in temp4 dataset: " , temp4["Date"].value_counts(dropna=False))
+                    print("Count of max in temp4 dataset: " , temp4["max"].value_counts(dropna=False))
                 
-                print("Count of max in temp4 dataset: " , temp4["max"].value_counts(dropna=False))
+                    # Dropping & Renaming columns
+                    temp4.rename(columns={"max":"timestamp","Quantity_Ordered":"target_value","ITEM_ID":"item_id"},inplace=True)
+                    temp4.drop(columns={"3rd_Item_Number","Date"},inplace=True)
+                    print("Shape of dataset after renaming and dropping columns: ", temp4.shape)
+                    print("temp4 dataset: ", temp4.tail(2))
                 
-                # Dropping & Renaming columns
-                temp4.rename(columns={"max":"timestamp","Quantity_Ordered":"target_value","ITEM_ID":"item_id"},inplace=True)
-                temp4.drop(columns={"3rd_Item_Number","Date"},inplace=True)
-                print("Shape of dataset after renaming and dropping columns: ", temp4.shape)
-                print("temp4 dataset: ", temp4.tail(2))
+                    # Checking which all SKUs doesnt have any orders in past 2 years : the
+                    # history state with this period's month replaced by the incremental data
+                    period_state = update_dormancy_state( \
+                                                         hist_state,
+                                                         temp4["item_id"],
+                                                         dates_to_codes(temp4["timestamp"]),
+                                                         temp4["target_value"]
+                                                        )
+                    print("Maximum timestamp : ", code_to_period(period_state["LAST_SEEN"].max()))
                 
-#                 Working on historical dataset to check item_id's with 0 demand in last 2 years
-                data_hist2=data_hist.rename(columns={"ITEM_ID":"item_id","UNITS":"target_value","Date":"timestamp"})
-                data_hist2.drop(columns={"RUN_TIME_STAMP"},inplace=True)
-                print("Shape of historical dataset :" , data_hist2.shape)
-            
-                # Appending history and incremental datasets
-                data_all=pd.concat([data_hist2,temp4])
-                print("Shape of combined dataset : ", data_all.shape)
-                
-                print("Maximum timestamp : ", data_all["timestamp"].max())
-                
-                # Checking which all SKUs doesnt have any orders in past 2 years
-                two_years = data_all["timestamp"].max() + relativedelta(months=-24)
-                print("Date for 2 years : ", two_years)
-                
-                data_all["Date_Tag"]=np.where((data_all["timestamp"]>two_years),"Last 2 year","Other")
-                
-                grp=data_all.groupby(["item_id","Date_Tag"])["target_value"].sum().reset_index()
-                print("Shape of grp table : ", grp.shape)
-                
-                item_emp=grp[(grp["target_value"]==0) & (grp["Date_Tag"]=="Last 2 year")]
-                print("No of items in combined dataset which has 0 demand in past 2 years : ", item_emp.shape)
-                
-                #Converting the above ontained items to a list
-                sku_list_2yrs=item_emp["item_id"].tolist()
-                print("List of skus which has 0 demand in past 2 years : ", sku_list_2yrs)
-                
-                #We would want to exclude items from above list which were provided by Business
-                # File path of SKUs to be forecasted
-                sku_file = 's3://' + con.bucket_name + '/' + con.input_sku + '/' + con.sku_file_name
-                print("sku_file :", sku_file)
-                
-                target_sku = wr.s3.read_csv(sku_file)
-                print("No of SKUs provided by Business : ", target_sku.shape)
-                print("target_sku :", target_sku)
-                
-                # Convert to string
-                target_sku["combined PN"]=target_sku["combined PN"].astype(str)
-                target_sku["combined PN"]=target_sku["combined PN"].str.upper()
-                
-                # Removing leading and trailing spaces
-                target_sku["combined_PN_new"]=target_sku["combined PN"].astype(str).str.strip()
-                
-                # Checking if theres any NaN values in item list
-                target_sku[target_sku["combined_PN_new"].isna()]
-                
-                target_sku["Flag"]=np.where((target_sku["combined_PN_new"]==target_sku["combined PN"]),1,0)
-                
-                # To check how many SKUs has changed post removing leading and trailing spaces
-                print("Flag counts : ", target_sku["Flag"].value_counts(dropna=False))
-                
-                # Dropping duplicates in #SKUs
-                target_sku2=target_sku.copy()
-                target_sku2=target_sku2[["combined_PN_new"]].drop_duplicates()
-                print("target_sku2 :", target_sku2)
-                
-                # Converting the new SKUs names to a list - Has been added in main code
-                sku_list=target_sku2["combined_PN_new"].tolist()
-                print("sku_list : ", sku_list)
-                
-                # Removing sku_list provided by Filip from sku_list_2yrs
-                set1 = set(sku_list) #SKUs list provided by Filip
-                print(len(set1))
-                set2 = set(sku_list_2yrs) #SKUs with 0 demand since 2 years
-                print(len(set2))
-                res = list(set2 - set1) #We need to exclude SKUs provided by business for forecasting purpose
-                print(len(res))
-                
-                print(res)
-                
-                # Changing elements in list to a str in order to write sql code
-                if len(res)==1:
-                    fin_lst=str(tuple(res)).replace(",)",")")
-                    print("Length of res is 1 & element in it is : ",fin_lst)
-                    print(type(fin_lst))
-                else:
-                    fin_lst=tuple(res)
-                    fin_lst = str(fin_lst)
-                    print("Length of res is NE 1 & elements in it are : ",fin_lst)
-                    print(type(fin_lst))
-                    
-                                
-                # Get the delete and insert queries from config file
-                delete_qry_item = con.del_frm_kfs_order + " where ITEM_ID in " + \
-                             fin_lst + ""
-                print("delete query : ", delete_qry_item)
-                
-                print("length of resultant skus whose data needs to be deleted from historical order table :",len(res))
-                
-                if len(res)>0:
-                    cur.execute(delete_qry_item)
-                    
-                # Removing these skus from incremental data as well if exists
-                temp5=temp4[~temp4["item_id"].isin(res)]
-                print("Shape of temp5 dataset post removing 0 demand items : ", temp5.shape)
-                
-#                 Sorting the data
-                temp5=temp5.sort_values(by=["item_id","timestamp"])
+                    #Converting the above ontained items to a list
+                    sku_list_2yrs=dormant_items(period_state, con.dormancy_months)
+                    print("List of skus which has 0 demand in past 2 years : ", sku_list_2yrs)
+                
+                    #We would want to exclude items from above list which were provided by Business
+                    # File path of SKUs to be forecasted
+                    sku_file = 's3://' + con.bucket_name + '/' + con.input_sku + '/' + con.sku_file_name
+                    print("sku_file :", sku_file)
+                
+                    target_sku = wr.s3.read_csv(sku_file)
+                    print("No of SKUs provided by Business : ", target_sku.shape)
+                    print("target_sku :", target_sku)
+                
+                    # Convert to string
+                    target_sku["combined PN"]=target_sku["combined PN"].astype(str)
+                    target_sku["combined PN"]=target_sku["combined PN"].str.upper()
+                
+                    # Removing leading and trailing spaces
+                    target_sku["combined_PN_new"]=target_sku["combined PN"].astype(str).str.strip()
+                
+                    # Checking if theres any NaN values in item list
+                    target_sku[target_sku["combined_PN_new"].isna()]
+                
+                    target_sku["Flag"]=np.where((target_sku["combined_PN_new"]==target_sku["combined PN"]),1,0)
+                
+                    # To check how many SKUs has changed post removing leading and trailing spaces
+                    print("Flag counts : ", target_sku["Flag"].value_counts(dropna=False))
+                
+                    # Dropping duplicates in #SKUs
+                    target_sku2=target_sku.copy()
+                    target_sku2=target_sku2[["combined_PN_new"]].drop_duplicates()
+                    print("target_sku2 :", target_sku2)
+                
+                    # Converting the new SKUs names to a list - Has been added in main code
+                    sku_list=target_sku2["combined_PN_new"].tolist()
+                    print("sku_list : ", sku_list)
+                
+                    # Removing sku_list provided by Filip from sku_list_2yrs
+                    set1 = set(sku_list) #SKUs list provided by Filip
+                    print(len(set1))
+                    set2 = set(sku_list_2yrs) #SKUs with 0 demand since 2 years
+                    print(len(set2))
+                    res = list(set2 - set1) #We need to exclude SKUs provided by business for forecasting purpose
+                    print(len(res))
+                
+                    print(res)
+                
+                    print("length of resultant skus whose data needs to be deleted from historical order table :",len(res))
+                
+                    # Deleting these skus from the historical order table and 
+                    # removing them from incremental data as well if exists
+                    deleted_rows, temp5 = delete_key_set( \
+                                                         cur.connection,
+                                                         con.prsd_KFS_orders_table,
+                                                         "ITEM_ID",
+                                                         res,
+                                                         pending=temp4,
+                                                         pending_column="item_id"
+                                                        )
+                    print("Shape of temp5 dataset post removing 0 demand items : ", temp5.shape)
+                
+    #                 Sorting the data
+                    temp5=temp5.sort_values(by=["item_id","timestamp"])
                 
   
-                # Transforming the data for the corresponding period
-                # and appending the resulting df to the list
-                df_results.append(transform_data_and_write_db( \
-                                                              period,
-                                                              temp5,
-                                                              update_ind,
-                                                              run_time_stamp,
-                                                              cur
-                                                             )
-                                 )
+                    # Transforming the data for the corresponding period
+                    # and appending the resulting df to the list
+                    result = transform_data_and_write_db( \
+                                                         period,
+                                                         temp5,
+                                                         update_ind,
+                                                         run_time_stamp,
+                                                         cur
+                                                        )
+                    df_results.append(result)
+                    table_state = written_dormancy_state(table_state, res, result)
+        
+        # Saving the dormancy state of the table as written by this run
+        save_dormancy_state(conn, con.prsd_KFS_orders_table, table_state, run_time_stamp)
                 
         print("Exiting... add_monthly_data()")
         
@@ -434,4 +415,272 @@ def add_monthly_data(cur, conn, run_time_stamp):
         # Creating and logging an error message, in case of an exception
         create_and_insert_error(cur, run_time_stamp)
         raise
-        
\ No newline at end of file
+        
+
+# 3. Dormancy state of the processed orders table
+
+def history_dormancy_state(conn, kfs_proc_order):
+    """Dormancy state of the historical orders : the saved state with the
+    rows written since applied, else built from the full history.
+
+    Parameters
+    ----------
+    conn : object
+        Snowflake DB connection object.
+    kfs_proc_order : dataframe
+        Historical processed orders data.
+
+    Returns
+    -------
+    dataframe
+        Dormancy state of every Item_id of the history.
+
+    """
+    hist_state, meta = load_dormancy_state(conn, con.prsd_KFS_orders_table)
+    
+    if hist_state is None:
+        print("Building the dormancy state from the history ...")
+        hist_state = build_dormancy_state( \
+                                          kfs_proc_order["ITEM_ID"].astype(str),
+                                          encode_periods(kfs_proc_order["MONTH_YEAR"]),
+                                          kfs_proc_order["UNITS"]
+                                         )
+    else:
+        # Rows written after the state was saved (new rows, the older ones
+        # being unchanged as per the change marker)
+        delta = kfs_proc_order[kfs_proc_order["RUN_TIME_STAMP"].astype(str) > meta["run_time_stamp"]]
+        print("Rows written since the dormancy state was saved : ", delta.shape[0])
+        hist_state = update_dormancy_state( \
+                                           hist_state,
+                                           delta["ITEM_ID"].astype(str),
+                                           encode_periods(delta["MONTH_YEAR"]),
+                                           delta["UNITS"],
+                                           mode='set'
+                                          )
+    
+    print("Items in the dormancy state : ", hist_state.shape[0])
+    return hist_state
+
+
+def written_dormancy_state(state, deleted_items, written):
+    """Dormancy state of the orders table once the 0 demand items are
+    deleted and the processed data (as returned by
+    transform_data_and_write_db) is written, as per bulk_write_mode."""
+    state = drop_items(state, deleted_items)
+    return update_dormancy_state( \
+                                 state,
+                                 written["ITEM_ID"].astype(str),
+                                 encode_periods(written["MONTH_YEAR"]),
+                                 written["UNITS"],
+                                 mode='set' if con.bulk_write_mode == 'merge' else 'replace'
+                                )
+
+
+# 4. Reading the list of SKUs provided by Business
+
+def read_business_sku_list():
+    """Read the list of SKUs to be forecasted, provided by Business.
+
+    Returns
+    -------
+    list
+        Upper cased SKUs without leading and trailing spaces.
+
+    """
+    # File path of SKUs to be forecasted
+    sku_file = 's3://' + con.bucket_name + '/' + con.input_sku + '/' + con.sku_file_name
+    print("sku_file :", sku_file)
+    
+    target_sku = wr.s3.read_csv(sku_file)
+    print("No of SKUs provided by Business : ", target_sku.shape)
+    
+    # Convert to string, upper case and remove leading and trailing spaces
+    target_sku["combined_PN_new"]=target_sku["combined PN"].astype(str).str.upper().str.strip()
+    
+    # Dropping duplicates in #SKUs
+    sku_list=target_sku["combined_PN_new"].drop_duplicates().tolist()
+    print("No of unique SKUs provided by Business : ", len(sku_list))
+    
+    return sku_list
+
+
+# 5. Preprocessing all the periods in a single pass
+
+def process_periods_single_pass(df_monthly2, periods, kfs_proc_order, hist_state,
+                                mon_yrs_prsd_order, run_time_stamp, cur):
+    """Preprocessing the orders data of all the periods of the incremental
+    file together and updating the orders table with one batch.
+
+    Parameters
+    ----------
+    df_monthly2 : dataframe
+        Incremental orders data with the Mon-yyyy column (mon_yyyy).
+    periods : list
+        Periods (Mon-yyyy) available in the incremental data.
+    kfs_proc_order : dataframe
+        Historical processed orders data.
+    hist_state : dataframe
+        Dormancy state of the historical orders (see kfs_dormancy).
+    mon_yrs_prsd_order : list
+        Periods already available in the processed orders table.
+    run_time_stamp : string
+        Timestamp based run id. for the job.
+    cur : object
+        Snowflake DB cursor object.
+
+    Returns
+    -------
+    tuple
+        Processed orders data written to the orders table and the
+        dormancy state of the table once written.
+
+    How it works
+    ------------
+        1. Aggregate Quantity_Ordered of all the periods with one 
+        groupby at Item_id and month level and treat negative orders.
+        2. Parse the history once to a month index (year*12 + month).
+        3. Create the data of every Item_id for each period and check
+        the items with 0 demand in the past 2 years as seen by each
+        period, from the history state with that period's month
+        replaced, the same way the per-period loop does.
+        4. Delete the 0 demand items and write all the periods in one batch.
+
+    """
+    print("Inside... process_periods_single_pass()")
+    
+    periods = [x for x in periods if ((x != 'nan') & (x != 'None'))]
+    
+    # Periods with their month index and processing order
+    period_frame = pd.DataFrame({"mon_yyyy":periods})
+    period_frame["PERIOD_IDX"] = encode_periods(period_frame["mon_yyyy"])
+    period_frame["PERIOD_ORDER"] = range(len(periods))
+    period_frame["key"] = 1
+    print("period_frame : ", period_frame)
+    
+    # 1. Aggregating the Quantity_Ordered of all the periods at Monthly level
+    temp2 = df_monthly2.loc[df_monthly2["mon_yyyy"].isin(periods),
+                            ["3rd_Item_Number","Request_Date","Quantity_Ordered"]]
+    
+    # Removing blank item_ids
+    temp2 = temp2[temp2["3rd_Item_Number"]!=""].copy()
+    
+    # Aggregating per Item_id and month, the Item_ids being sharded over
+    # a process pool
+    temp2 = run_sharded(aggregate_monthly_orders, temp2, "3rd_Item_Number",
+                        sort_by=["3rd_Item_Number","PERIOD_IDX"])
+    print("Shape of dataset on aggregating the data at Monthly level : ", temp2.shape)
+    
+    # Checking if there's any negative orders in Quantity_Ordered per month per sku
+    print("Negative orders count : ", temp2["NEGATIVE"].sum())
+    temp2.drop(columns=["NEGATIVE"], inplace=True)
+    temp2.rename(columns={"3rd_Item_Number":"ITEM_ID"}, inplace=True)
+    
+    # 2. Parsing the history once to month index (its demand is in the
+    # dormancy state)
+    data_hist = kfs_proc_order[["ITEM_ID","MONTH_YEAR"]].copy()
+    data_hist["ITEM_ID"] = data_hist["ITEM_ID"].astype(str)
+    data_hist["MONTH_IDX"] = encode_periods(data_hist["MONTH_YEAR"])
+    
+    data_hist = data_hist[["ITEM_ID","MONTH_IDX"]].drop_duplicates()
+    print("Shape of historical dataset at Item_id & month level : ", data_hist.shape)
+    
+    # 3. Item_ids whose data for each period is to be created : Item_ids 
+    # of the history without that period's month, plus the incremental ones
+    item_months = data_hist.groupby("ITEM_ID").size().rename("N_MONTHS").reset_index()
+    item_months["key"] = 1
+    
+    own_month = data_hist[["ITEM_ID","MONTH_IDX"]].rename(columns={"MONTH_IDX":"PERIOD_IDX"})
+    own_month["OWN"] = 1
+    
+    dates_hist = pd.merge(period_frame, item_months, on="key")
+    dates_hist = pd.merge(dates_hist, own_month, how="left", on=["ITEM_ID","PERIOD_IDX"])
+    dates_hist = dates_hist[dates_hist["N_MONTHS"] > dates_hist["OWN"].fillna(0)]
+    
+    dates_incr = pd.merge(period_frame, temp2[["ITEM_ID","PERIOD_IDX"]], on="PERIOD_IDX")
+    
+    grid_cols = ["ITEM_ID","mon_yyyy","PERIOD_IDX","PERIOD_ORDER"]
+    dates_f2 = pd.concat([dates_hist[grid_cols], dates_incr[grid_cols]])
+    dates_f2 = dates_f2.drop_duplicates(subset=["ITEM_ID","PERIOD_IDX"])
+    print("No of ITEM_ID & period combinations whose data is to be created : ", dates_f2.shape)
+    
+    # Joining with the actual data to get the Quantity_Ordered populated
+    temp4 = pd.merge(dates_f2, temp2, how="left", on=["ITEM_ID","PERIOD_IDX"])
+    temp4["Quantity_Ordered"] = temp4["Quantity_Ordered"].fillna(0)
+    print("Shape of dataset after merging: ", temp4.shape)
+    
+    # Checking which all SKUs doesnt have any orders in past 2 years, as
+    # seen by each period : the history state with that period's month
+    # replaced by its incremental data
+    item_emp = [pd.DataFrame(columns=["PERIOD_IDX","ITEM_ID"])]
+    for period_idx, period_rows in temp4.groupby("PERIOD_IDX", sort=False):
+        period_state = update_dormancy_state( \
+                                             hist_state,
+                                             period_rows["ITEM_ID"],
+                                             period_rows["PERIOD_IDX"],
+                                             period_rows["Quantity_Ordered"]
+                                            )
+        dormant = dormant_items(period_state, con.dormancy_months)
+        print("Period", code_to_period(period_idx), "- maximum month :",
+              code_to_period(period_state["LAST_SEEN"].max()), "- 0 demand items :", len(dormant))
+        item_emp.append(pd.DataFrame({"PERIOD_IDX":period_idx, "ITEM_ID":dormant}))
+    
+    item_emp = pd.concat(item_emp, ignore_index=True)
+    print("No of items & periods which has 0 demand in past 2 years : ", item_emp.shape)
+    
+    # We would want to exclude items from above list which were provided by Business
+    sku_list = read_business_sku_list()
+    item_emp = item_emp[~item_emp["ITEM_ID"].isin(sku_list)]
+    
+    res = list(item_emp["ITEM_ID"].unique())
+    print("length of resultant skus whose data needs to be deleted from historical order table :",len(res))
+    print(res)
+    
+    # Deleting these skus from the historical order table
+    delete_key_set(cur.connection, con.prsd_KFS_orders_table, "ITEM_ID", res)
+    
+    # Removing these skus from incremental data as well. As in the per-period 
+    # loop, a period written before a later period deletes the sku from 
+    # the table loses the sku too.
+    last_flag = pd.merge(item_emp, period_frame[["PERIOD_IDX","PERIOD_ORDER"]], on="PERIOD_IDX")
+    last_flag = last_flag.groupby("ITEM_ID")["PERIOD_ORDER"].max().rename("LAST_FLAG_ORDER").reset_index()
+    
+    temp5 = pd.merge(temp4, last_flag, how="left", on="ITEM_ID")
+    temp5 = temp5[temp5["LAST_FLAG_ORDER"].isna() | \
+                  (temp5["PERIOD_ORDER"] > temp5["LAST_FLAG_ORDER"])]
+    print("Shape of temp5 dataset post removing 0 demand items : ", temp5.shape)
+    
+    # Sorting the data
+    temp5 = temp5.sort_values(by=["PERIOD_ORDER","ITEM_ID"])
+    temp5 = temp5.rename(columns={"ITEM_ID":"item_id","mon_yyyy":"mmm_yyyy",
+                                  "Quantity_Ordered":"target_value"})
+    
+    # Periods already available in the processed orders table
+    update_periods = [x for x in periods if x in mon_yrs_prsd_order]
+    print("Periods to be overwritten : ", update_periods)
+    
+    result = transform_periods_and_write_db( \
+                                            temp5,
+                                            update_periods,
+                                            run_time_stamp,
+                                            cur
+                                           )
+    
+    # Dormancy state of the table as written
+    table_state = written_dormancy_state(hist_state, res, result)
+    
+    print("Exiting... process_periods_single_pass()")
+    return result, table_state
+
+
+# 6. Monthly aggregation of the order lines
+
+def aggregate_monthly_orders(order_lines):
+    """Quantity_Ordered per Item_id and month index (PERIOD_IDX), the
+    negative totals set to 0 and flagged in NEGATIVE. Items are
+    independent, so it can run on shards of the Item_ids."""
+    monthly = order_lines.assign(PERIOD_IDX=dates_to_codes(order_lines["Request_Date"]))
+    monthly = monthly.groupby(["3rd_Item_Number","PERIOD_IDX"], observed=True)["Quantity_Ordered"].sum().reset_index()
+    
+    monthly["NEGATIVE"] = monthly["Quantity_Ordered"] < 0
+    monthly["Quantity_Ordered"] = np.where(monthly["NEGATIVE"], 0, monthly["Quantity_Ordered"])
+    return monthly
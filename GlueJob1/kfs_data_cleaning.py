@@ -15,11 +15,10 @@ from numpy import where
 from pandas import DataFrame
 from pytz import timezone
 from datetime import datetime
-from snowflake.connector.pandas_tools import write_pandas
 
 import processed_configuration as con
 from error_logging import create_and_insert_error
-from snowflake_db_connection import connect_to_db
+from snowflake_bulk_writer import bulk_write
 
       
 # 2. Transforming the processed orders data and updating the table
@@ -94,23 +93,19 @@ def transform_data_and_write_db( \
         # Rounding off the UNITS
         temp['UNITS'] = round(temp['UNITS'])
                 
-        # Get the delete and insert queries from config file
-        delete_qry = con.del_frm_kfs_order + " where MONTH_YEAR = '" + \
-                     mon_yr + "'"
-        insert_qry = con.insert_kfs_order
-
-        # Delete the old records for the Mon-yyyy, if it exists
-        if update_ind:
-            print("update ind is true")
-            cur.execute(delete_qry)
-
-#         Writing all SKUs data into the intermediate table 
+        # Overwrite the old records for the Mon-yyyy, if it exists, 
+        # else append, in one atomic operation on the same connection
+        write_mode = con.bulk_write_mode if update_ind else 'append'
+        print("update ind : ", update_ind, ", write mode : ", write_mode)
         
-        cur, conn = connect_to_db()
-        try:
-            write_pandas(conn, temp, 'KFS_PROCESSED_ORDERS_TARGET')
-        except Exception as e:
-            print(f'Error while writing data to table KFS_PROCESSED_ORDERS_TARGET : {e}')
+        bulk_write( \
+                   cur.connection,
+                   temp,
+                   con.prsd_KFS_orders_table,
+                   write_mode,
+                   key_columns=con.kfs_order_key_columns,
+                   partition_column='MONTH_YEAR'
+                  )
 
         print("Exiting... transform_data_and_write_db()")
         return temp
@@ -120,4 +115,90 @@ def transform_data_and_write_db( \
         # Creating and logging an error message, in case of an exception
         create_and_insert_error(cur, run_time_stamp)
         raise
-    
\ No newline at end of file
+    
+
+# 3. Transforming the processed orders data of several periods and updating the table
+
+def transform_periods_and_write_db( \
+                                   kfs_order,
+                                   update_periods,
+                                   run_time_stamp,
+                                   cur
+                                  ):
+    """Transforming the processed orders data of all the periods and 
+    updating the orders table with a single delete and a single write.
+
+    Parameters
+    ----------
+    kfs_order : dataframe
+        Pre-processed orders data with the Mon-yyyy column (mmm_yyyy).
+    update_periods : list
+        Periods (Mon-yyyy) to be overwritten in the table.
+    run_time_stamp : string
+        Timestamp based run id. for the job.
+    cur : object
+        Snowflake DB cursor object.
+
+    Returns
+    -------
+    temp
+        Returns a dataframe copy of the tranformed data.
+
+    How it works
+    ------------
+        1. Select only the columns that will be inserted to the table.
+        2. Rename them accordingly. 
+        3. Delete records for all the Mon-yyyy in the table for 
+           which new data has come.
+        4. Insert the processed data in to the orders table.
+
+    """    
+    try:
+        print("Inside... transform_periods_and_write_db()")
+
+        # Selecting the required columns
+        temp = kfs_order.copy()
+        temp['run_time_stamp'] = run_time_stamp
+        temp = temp[[\
+                     'run_time_stamp',
+                     'item_id',
+                     'mmm_yyyy',
+                     'target_value'
+                     ]].copy()
+        
+        # Renaming the columns as in the orders table
+        temp.rename(
+                    columns={
+                    'run_time_stamp':'RUN_TIME_STAMP',
+                    'mmm_yyyy':'MONTH_YEAR',
+                    'item_id':'ITEM_ID',
+                    'target_value':'UNITS'},
+                    inplace=True
+                    )
+        temp.reset_index(drop=True, inplace=True)
+        
+        # Rounding off the UNITS
+        temp['UNITS'] = round(temp['UNITS'])
+        
+        # Overwrite the old records of the Mon-yyyy which exist, append 
+        # the others, all the periods in one atomic operation
+        write_mode = con.bulk_write_mode if len(update_periods) > 0 else 'append'
+        print("Periods overwritten : ", update_periods, ", write mode : ", write_mode)
+        
+        bulk_write( \
+                   cur.connection,
+                   temp,
+                   con.prsd_KFS_orders_table,
+                   write_mode,
+                   key_columns=con.kfs_order_key_columns,
+                   partition_column='MONTH_YEAR'
+                  )
+
+        print("Exiting... transform_periods_and_write_db()")
+        return temp
+    except:
+        print("Exception occurred inside transform_periods_and_write_db()")
+        
+        # Creating and logging an error message, in case of an exception
+        create_and_insert_error(cur, run_time_stamp)
+        raise
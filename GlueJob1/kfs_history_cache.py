@@ -0,0 +1,247 @@
+# Watermarked snapshot of the processed orders table
+#
+# Python Version: 3.8.12
+#
+# Description : Keep a columnar (Parquet) snapshot of
+#               KFS_PROCESSED_ORDERS_TARGET in S3 or on local disk and
+#               fetch only the rows newer than its watermark on each run
+#
+# Coding Steps :
+#               1. Read the snapshot and its watermark, if they exist
+#               2. Compare the change marker (row count and HASH_AGG of the
+#                  rows covered by the watermark) with the table
+#               3. Fetch only the newer rows when the marker is unchanged,
+#                  else reload the full table (rows were deleted/updated)
+#               4. Save the merged snapshot with the new watermark
+
+
+# 1. Import built-in packages and user defined functions
+
+import os
+import json
+from time import time
+from pandas import read_parquet, concat
+from boto3 import client
+import awswrangler as wr
+
+import processed_configuration as con
+from kfs_period_codec import encode_periods, code_to_period
+from snowflake_fetch import fetch_frame
+
+
+# 2. Reading and writing the snapshot
+
+def _split_s3_path(path):
+    """Split an s3://bucket/key path into bucket and key."""
+    bucket, _, key = path[len("s3://"):].partition("/")
+    return bucket, key
+
+
+def read_snapshot(cache_path, data_file=None, meta_file=None):
+    """Read the snapshot and its watermark from S3 or local disk.
+
+    Parameters
+    ----------
+    cache_path : string
+        S3 (s3://...) or local folder of the snapshot.
+    data_file : string, optional
+        Parquet file name, defaults to the history snapshot's.
+    meta_file : string, optional
+        Watermark file name, defaults to the history snapshot's.
+
+    Returns
+    -------
+    tuple
+        Snapshot dataframe and watermark dict, (None, None) if the
+        snapshot doesn't exist.
+
+    """
+    data_path = cache_path.rstrip("/") + "/" + (data_file or con.history_cache_data_file)
+    meta_path = cache_path.rstrip("/") + "/" + (meta_file or con.history_cache_meta_file)
+
+    try:
+        if cache_path.startswith("s3://"):
+            bucket, key = _split_s3_path(meta_path)
+            body = client(con.aws_service1).get_object(Bucket=bucket, Key=key)['Body']
+            meta = json.loads(body.read())
+            snapshot = wr.s3.read_parquet(data_path)
+        else:
+            if not os.path.exists(meta_path):
+                return None, None
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            snapshot = read_parquet(data_path)
+    except Exception as e:
+        print(f'History snapshot not available at {cache_path} : {e}')
+        return None, None
+
+    return snapshot, meta
+
+
+def write_snapshot(cache_path, snapshot, meta, data_file=None, meta_file=None):
+    """Write the snapshot and its watermark to S3 or local disk.
+
+    Parameters
+    ----------
+    cache_path : string
+        S3 (s3://...) or local folder of the snapshot.
+    snapshot : dataframe
+        Processed orders data.
+    meta : dict
+        Watermark and change marker of the snapshot.
+    data_file : string, optional
+        Parquet file name, defaults to the history snapshot's.
+    meta_file : string, optional
+        Watermark file name, defaults to the history snapshot's.
+
+    """
+    data_path = cache_path.rstrip("/") + "/" + (data_file or con.history_cache_data_file)
+    meta_path = cache_path.rstrip("/") + "/" + (meta_file or con.history_cache_meta_file)
+
+    # Data first, the watermark only once the data is in place
+    if cache_path.startswith("s3://"):
+        wr.s3.to_parquet(snapshot, data_path, index=False)
+        bucket, key = _split_s3_path(meta_path)
+        client(con.aws_service1).put_object(Bucket=bucket, Key=key,
+                                            Body=json.dumps(meta).encode())
+    else:
+        os.makedirs(cache_path, exist_ok=True)
+        snapshot.to_parquet(data_path, index=False)
+        with open(meta_path, "w") as meta_file:
+            json.dump(meta, meta_file)
+
+
+# 3. Change marker of the table
+
+def get_change_marker(conn, table, run_time_stamp_wm):
+    """Row count and HASH_AGG of the rows at or below the watermark.
+
+    Any delete or update of rows already in the snapshot changes the
+    marker, rows appended after the watermark don't.
+
+    Parameters
+    ----------
+    conn : object
+        Snowflake DB connection object.
+    table : string
+        Table name.
+    run_time_stamp_wm : string
+        RUN_TIME_STAMP watermark.
+
+    Returns
+    -------
+    dict
+        Row count and hash of the rows.
+
+    """
+    marker_qry = "select count(*) as ROW_COUNT, hash_agg(*) as ROW_HASH from " + \
+                 table + " where RUN_TIME_STAMP <= '" + run_time_stamp_wm + "'"
+    marker = fetch_frame(conn, marker_qry)
+
+    return {
+            'row_count':int(marker["ROW_COUNT"][0]),
+            'row_hash':str(marker["ROW_HASH"][0])
+           }
+
+
+def get_watermark(snapshot):
+    """Last RUN_TIME_STAMP and MONTH_YEAR covered by the snapshot."""
+    if snapshot.shape[0] == 0:
+        return "", ""
+
+    last_month = encode_periods(snapshot["MONTH_YEAR"]).max()
+    return snapshot["RUN_TIME_STAMP"].max(), code_to_period(last_month)
+
+
+# 4. Loading the processed orders with the snapshot
+
+def load_processed_orders(conn, table=None, cache_path=None):
+    """Load the processed orders table, fetching only the rows newer
+    than the snapshot watermark.
+
+    Parameters
+    ----------
+    conn : object
+        Snowflake DB connection object.
+    table : string, optional
+        Table name, defaults to the processed orders table.
+    cache_path : string, optional
+        S3 (s3://...) or local folder of the snapshot, defaults to
+        the path in the config file.
+
+    Returns
+    -------
+    tuple
+        Processed orders data (same as "select * from table") and a
+        dict with the load statistics.
+
+    How it works
+    ------------
+        1. Read the snapshot and its watermark.
+        2. Full reload of the table if there's no snapshot or
+        the change marker of the rows it covers has changed.
+        3. Else, fetch the rows with RUN_TIME_STAMP above the
+        watermark and append them to the snapshot.
+        4. Save the snapshot with the new watermark and marker.
+
+    """
+    print("Inside... load_processed_orders()")
+    start = time()
+
+    if table is None:
+        table = con.prsd_KFS_orders_table
+    if cache_path is None:
+        cache_path = con.history_cache_path
+
+    # Cache disabled, reading the full table as before
+    if not con.history_cache_enabled:
+        kfs_proc_order = fetch_frame(conn, "select * from " + table)
+        print("Exiting... load_processed_orders()")
+        return kfs_proc_order, {'full_reload':True, 'delta_rows':kfs_proc_order.shape[0]}
+
+    snapshot, meta = read_snapshot(cache_path)
+
+    full_reload = True
+    if snapshot is not None:
+        marker = get_change_marker(conn, table, meta["run_time_stamp"])
+        full_reload = (marker != meta["marker"])
+        print("Snapshot watermark : ", meta["run_time_stamp"], meta["month_year"],
+              "- change marker", "changed" if full_reload else "unchanged")
+
+    if full_reload:
+        print("Reading the full table ...", table)
+        kfs_proc_order = fetch_frame(conn, "select * from " + table)
+        delta_rows = kfs_proc_order.shape[0]
+    else:
+        print("Reading the rows newer than the watermark ...", table)
+        delta_qry = "select * from " + table + \
+                    " where RUN_TIME_STAMP > '" + meta["run_time_stamp"] + "'"
+        delta = fetch_frame(conn, delta_qry)
+        delta_rows = delta.shape[0]
+        kfs_proc_order = concat([snapshot, delta], ignore_index=True)
+
+    # Saving the snapshot when it has changed
+    if full_reload or delta_rows > 0:
+        run_time_stamp_wm, month_year_wm = get_watermark(kfs_proc_order)
+        new_meta = {
+                    'table':table,
+                    'run_time_stamp':run_time_stamp_wm,
+                    'month_year':month_year_wm,
+                    'marker':get_change_marker(conn, table, run_time_stamp_wm)
+                   }
+        try:
+            write_snapshot(cache_path, kfs_proc_order, new_meta)
+        except Exception as e:
+            # The snapshot is only an optimization, the run goes on without it
+            print(f'Error while writing the history snapshot to {cache_path} : {e}')
+
+    stats = {
+             'full_reload':full_reload,
+             'delta_rows':delta_rows,
+             'total_rows':kfs_proc_order.shape[0],
+             'seconds':round(time() - start, 2)
+            }
+    print("History load :", stats)
+
+    print("Exiting... load_processed_orders()")
+    return kfs_proc_order, stats
@@ -13,6 +13,25 @@ aws_service1 = 's3'
 bucket_name = 'kfs.dev.db'
 folder_name = 'Delta/'
 
+# Selective fetch of the incremental files from the S3 folder
+incre_file_pattern = 'incremental'
+incre_file_extensions = ['.csv', '.xlsx']
+# Only files modified in the last n days are fetched (None to fetch all)
+incre_file_max_age_days = None
+# Maximum number of parallel downloads
+fetch_max_workers = 8
+
+# Parquet copy of the order workbooks, keyed by S3 ETag and size
+ingest_cache_enabled = True
+ingest_cache_path = 's3://kfs.dev.db/Ingest_Cache/'
+
+# Process all the periods of the incremental file in a single pass
+# (False to process and write one period at a time)
+single_pass_periods = True
+
+# Items without demand in this many months are removed from the orders
+dormancy_months = 24
+
 # BU and entity
 BU = 'KFS'
 entity = 'Orders'
@@ -26,6 +45,14 @@ req_columns= ["Order Number","Or Ty","Sold To","Sold To Name","Description 1","R
               "Invoice Date","Cancel Date","Promised Delivery","Branch/Plant","Description Line 2","Quantity Ordered",
               "Quantity Shipped","Quantity Backordered","Quantity Canceled"]
 
+# Declared types of the required columns, identifiers read as text
+order_column_dtypes = {"Order Number":str, "Or Ty":str, "Sold To":str, "Ship To":str,
+                       "2nd Item Number":str, "3rd Item Number":str, "Parent Number":str,
+                       "Quantity Ordered":"float64", "Quantity Shipped":"float64",
+                       "Quantity Backordered":"float64", "Quantity Canceled":"float64"}
+# Date columns, parsed at read time
+order_date_columns = ["Request Date", "Order Date"]
+
               
 # To connect ot Snowflake
 # Service Name
@@ -60,6 +87,31 @@ insert_kfs_order = "INSERT INTO KFS_PROCESSED_ORDERS_TARGET (\
                                                         UNITS \
                                                         ) \
                                                         VALUES (%s,%s,%s,%s)"
+kfs_order_key_columns = ["ITEM_ID", "MONTH_YEAR"]
+
+# Bulk writes to Snowflake
+# 'replace' : delete the periods being written and insert, in one transaction
+# 'merge'   : update matching ITEM_ID & MONTH_YEAR rows and insert the others
+#             (rows of the period absent from the new data are kept)
+bulk_write_mode = 'replace'
+bulk_write_chunk_size = 200000
+bulk_write_compression = 'gzip'
+bulk_write_parallel = 8
+
+# Watermarked snapshot of KFS_PROCESSED_ORDERS_TARGET (S3 or local folder)
+history_cache_enabled = True
+history_cache_path = 's3://kfs.dev.db/History_Cache/KFS_PROCESSED_ORDERS_TARGET'
+history_cache_data_file = 'snapshot.parquet'
+history_cache_meta_file = 'watermark.json'
+
+# Dormancy state of KFS_PROCESSED_ORDERS_TARGET (see kfs_dormancy),
+# saved as Parquet next to the history snapshot, with the demand of the last
+# dormancy_state_months months (at least dormancy_months + the months
+# written again by a run)
+dormancy_state_path = history_cache_path
+dormancy_state_data_file = 'dormancy_state.parquet'
+dormancy_state_meta_file = 'dormancy_state.json'
+dormancy_state_months = 48
 # ERROR_LOG queries
 insert_error_log = "INSERT INTO KFS_ERROR_LOG ( \
                                           RUN_TIME_STAMP, \
@@ -69,3 +121,17 @@ insert_error_log = "INSERT INTO KFS_ERROR_LOG ( \
                                           EXCEPTION_MESSAGE, \
                                           MESSAGE \
                                          ) VALUES (%s,%s,%s,%s,%s,%s)" 
+
+# Per item transforms run on hash partitioned shards of the ITEM_IDs
+# in a process pool (1 shard = serial run, None workers = one per CPU).
+# Serial by default : the per item transforms take well under a second
+# on the usual volumes, less than forking the pool and pickling the
+# frames. Data with fewer rows than sku_shard_min_rows is run serially
+# even with more than one shard
+sku_shards = 1
+sku_shard_workers = None
+sku_shard_min_rows = 1000000
+
+# Query results fetched as dataframes from the connector's Arrow result
+# batches (False = rows fetched as tuples with fetchall)
+arrow_fetch_enabled = True
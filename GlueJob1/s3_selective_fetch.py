@@ -0,0 +1,192 @@
+# Selective fetch of the order files from S3
+#
+# Python Version: 3.8.12
+#
+# Description : Pick the order files to be processed from the S3 listing
+#               alone and download only those, in parallel
+#
+# Coding Steps :
+#               1. List the objects under the prefix
+#               2. Select objects by key pattern, extension and LastModified
+#               3. Download the selected objects on a bounded thread pool
+#               4. Report the bytes fetched versus skipped
+
+
+# 1. Import built-in packages and user defined functions
+
+import os
+from time import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from pytz import utc
+from boto3 import client
+
+import processed_configuration as con
+
+
+# 2. Selecting the objects from the listing
+
+def list_matching_objects(bucket_name, prefix, key_pattern, extensions,
+                          max_age_days=None):
+    """Select the objects to be fetched using only the S3 listing.
+
+    Parameters
+    ----------
+    bucket_name : string
+        S3 bucket name.
+    prefix : string
+        S3 folder (prefix) to be scanned.
+    key_pattern : string
+        Case insensitive text the object key must contain.
+    extensions : list
+        Accepted file extensions, e.g. ['.csv', '.xlsx'].
+    max_age_days : int, optional
+        Only objects modified in the last n days are selected.
+
+    Returns
+    -------
+    tuple
+        List of selected objects (dicts with key, extension, size,
+        etag and last_modified), list of keys matching the pattern
+        with an unexpected extension and the bytes skipped.
+
+    """
+    print("Inside... list_matching_objects()")
+
+    s3 = client(con.aws_service1)
+    paginator = s3.get_paginator('list_objects_v2')
+
+    modified_after = None
+    if max_age_days is not None:
+        modified_after = datetime.now(utc) - timedelta(days=max_age_days)
+
+    selected = []
+    unexpected = []
+    skipped_bytes = 0
+
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            name, extension = os.path.splitext(key)
+
+            # Not an order file of this kind or too old, never downloaded
+            if (key_pattern not in key.lower()) or \
+               ((modified_after is not None) and \
+                (obj['LastModified'] < modified_after)):
+                skipped_bytes += obj['Size']
+                continue
+
+            if extension not in extensions:
+                unexpected.append(key)
+                skipped_bytes += obj['Size']
+                continue
+
+            selected.append({
+                             'key':key,
+                             'extension':extension,
+                             'size':obj['Size'],
+                             'etag':obj['ETag'].strip('"'),
+                             'last_modified':obj['LastModified']
+                            })
+
+    print("Exiting... list_matching_objects()")
+    return selected, unexpected, skipped_bytes
+
+
+# 3. Downloading the selected objects
+
+def download_objects(bucket_name, objects, max_workers):
+    """Download the body of the given objects on a bounded thread pool.
+
+    Parameters
+    ----------
+    bucket_name : string
+        S3 bucket name.
+    objects : list
+        Objects as returned by list_matching_objects().
+    max_workers : int
+        Maximum number of concurrent downloads.
+
+    Returns
+    -------
+    list
+        The same objects, each with its content under 'body'.
+
+    """
+    # boto3 clients are thread safe, one is shared by all the workers
+    s3 = client(con.aws_service1)
+
+    def _download(obj):
+        obj['body'] = s3.get_object(Bucket=bucket_name,
+                                    Key=obj['key'])['Body'].read()
+        return obj
+
+    if len(objects) == 0:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(objects))) \
+            as executor:
+        return list(executor.map(_download, objects))
+
+
+# 4. Listing, selecting and downloading in one call
+
+def fetch_matching_objects(bucket_name, prefix, key_pattern, extensions,
+                           max_age_days=None, max_workers=None):
+    """Fetch only the objects whose key matches the pattern.
+
+    Parameters
+    ----------
+    bucket_name : string
+        S3 bucket name.
+    prefix : string
+        S3 folder (prefix) to be scanned.
+    key_pattern : string
+        Case insensitive text the object key must contain.
+    extensions : list
+        Accepted file extensions.
+    max_age_days : int, optional
+        Only objects modified in the last n days are fetched.
+    max_workers : int, optional
+        Maximum number of concurrent downloads.
+
+    Returns
+    -------
+    tuple
+        Downloaded objects, keys with an unexpected extension and
+        a dict with the fetch statistics.
+
+    How it works
+    ------------
+        1. Select the objects from the listing (no download).
+        2. Download the selected objects in parallel.
+        3. Print the bytes fetched and skipped.
+
+    """
+    print("Inside... fetch_matching_objects()")
+    start = time()
+
+    if max_workers is None:
+        max_workers = con.fetch_max_workers
+
+    selected, unexpected, skipped_bytes = list_matching_objects( \
+                                                bucket_name,
+                                                prefix,
+                                                key_pattern,
+                                                extensions,
+                                                max_age_days
+                                               )
+    objects = download_objects(bucket_name, selected, max_workers)
+
+    stats = {
+             'selected_objects':len(objects),
+             'fetched_bytes':sum(obj['size'] for obj in objects),
+             'skipped_bytes':skipped_bytes,
+             'seconds':round(time() - start, 2)
+            }
+    print("Fetched", stats['selected_objects'], "object(s) matching '" + \
+          key_pattern + "' :", stats['fetched_bytes'], "bytes fetched,",
+          stats['skipped_bytes'], "bytes skipped in", stats['seconds'], "sec")
+
+    print("Exiting... fetch_matching_objects()")
+    return objects, unexpected, stats
@@ -0,0 +1,172 @@
+# Bulk write of a dataframe to a Snowflake table
+#
+# Python Version: 3.8.12
+#
+# Description : Stage the dataframe once in a temporary table (compressed
+#               Parquet, parallel chunk upload) and apply it to the target
+#               table in a single statement or transaction, on the
+#               caller's connection
+#
+# Coding Steps :
+#               1. Create a temporary staging table like the target table
+#               2. Upload the dataframe to the staging table
+#               3. Apply the staged rows to the target table as a MERGE,
+#                  a partition replace (delete + insert in one
+#                  transaction) or an append
+#               4. Drop the staging table and return row counts and timings
+
+
+# 1. Import built-in packages and user defined functions
+
+from time import time
+from uuid import uuid4
+from snowflake.connector.pandas_tools import write_pandas
+
+import processed_configuration as con
+
+
+# 2. Uploading the dataframe to a staging table
+
+def stage_frame(conn, frame, table):
+    """Upload the dataframe to a temporary table with the target's columns.
+
+    Parameters
+    ----------
+    conn : object
+        Snowflake DB connection object.
+    frame : dataframe
+        Data to be written, with the target table's column names.
+    table : string
+        Target table name.
+
+    Returns
+    -------
+    tuple
+        Staging table name and number of rows staged.
+
+    """
+    stage_table = table + "_STG_" + uuid4().hex[:8].upper()
+
+    cur = conn.cursor()
+    try:
+        cur.execute("create temporary table " + stage_table + " like " + table)
+    finally:
+        cur.close()
+
+    success, nchunks, nrows, _ = write_pandas( \
+                                              conn,
+                                              frame,
+                                              stage_table,
+                                              chunk_size=con.bulk_write_chunk_size,
+                                              compression=con.bulk_write_compression,
+                                              parallel=con.bulk_write_parallel
+                                             )
+    if not success:
+        raise Exception("Upload of " + str(frame.shape[0]) + \
+                        " rows to staging table " + stage_table + " failed")
+    print("Staged", nrows, "rows in", nchunks, "chunk(s) to", stage_table)
+
+    return stage_table, nrows
+
+
+# 3. Applying the staged rows to the target table
+
+def _merge_query(table, stage_table, columns, key_columns):
+    """MERGE of the staging table into the target table on the keys."""
+    on_clause = " and ".join("t." + col + " = s." + col for col in key_columns)
+    set_clause = ", ".join("t." + col + " = s." + col \
+                           for col in columns if col not in key_columns)
+    insert_cols = ", ".join(columns)
+    insert_vals = ", ".join("s." + col for col in columns)
+
+    return "merge into " + table + " t using " + stage_table + " s on " + \
+           on_clause + " when matched then update set " + set_clause + \
+           " when not matched then insert (" + insert_cols + \
+           ") values (" + insert_vals + ")"
+
+
+def bulk_write(conn, frame, table, mode, key_columns=None, partition_column=None):
+    """Write the dataframe to the table in one atomic operation.
+
+    Parameters
+    ----------
+    conn : object
+        Snowflake DB connection object (the caller's own connection).
+    frame : dataframe
+        Data to be written, with the target table's column names.
+    table : string
+        Target table name.
+    mode : string
+        'merge'   : update the rows matching key_columns, insert the others.
+        'replace' : delete the partitions (partition_column values) present
+                    in the data and insert the data, in one transaction.
+        'append'  : insert the data.
+    key_columns : list, optional
+        Columns identifying a row, required for 'merge'.
+    partition_column : string, optional
+        Column identifying a partition, required for 'replace'.
+
+    Returns
+    -------
+    dict
+        Rows staged, inserted, updated and deleted, and the
+        seconds taken by the upload and the apply steps.
+
+    How it works
+    ------------
+        1. Stage the dataframe in a temporary table.
+        2. Apply it to the table with a single MERGE, a delete and
+        insert in one transaction, or an insert.
+        3. Drop the staging table. Any failure rolls back the
+        transaction and is raised to the caller.
+
+    """
+    print("Inside... bulk_write()")
+
+    if mode not in ('merge', 'replace', 'append'):
+        raise ValueError("Unknown bulk write mode : " + str(mode))
+    if (mode == 'merge') and not key_columns:
+        raise ValueError("key_columns are required for a merge")
+    if (mode == 'replace') and not partition_column:
+        raise ValueError("partition_column is required for a replace")
+
+    stats = {'table':table, 'mode':mode, 'staged_rows':0, 'inserted_rows':0,
+             'updated_rows':0, 'deleted_rows':0}
+    columns = list(frame.columns)
+
+    start = time()
+    stage_table, stats['staged_rows'] = stage_frame(conn, frame, table)
+    stats['upload_seconds'] = round(time() - start, 2)
+
+    start = time()
+    cur = conn.cursor()
+    try:
+        if mode == 'merge':
+            cur.execute(_merge_query(table, stage_table, columns, key_columns))
+            inserted, updated = cur.fetchone()[:2]
+            stats['inserted_rows'], stats['updated_rows'] = inserted, updated
+        else:
+            cur.execute("begin")
+            try:
+                if mode == 'replace':
+                    cur.execute("delete from " + table + " where " + \
+                                partition_column + " in (select distinct " + \
+                                partition_column + " from " + stage_table + ")")
+                    stats['deleted_rows'] = cur.rowcount
+                cur.execute("insert into " + table + " (" + ", ".join(columns) + \
+                            ") select " + ", ".join(columns) + " from " + stage_table)
+                stats['inserted_rows'] = cur.rowcount
+                cur.execute("commit")
+            except:
+                cur.execute("rollback")
+                raise
+    finally:
+        try:
+            cur.execute("drop table if exists " + stage_table)
+        finally:
+            cur.close()
+    stats['apply_seconds'] = round(time() - start, 2)
+
+    print("Bulk write :", stats)
+    print("Exiting... bulk_write()")
+    return stats
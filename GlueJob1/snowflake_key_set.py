@@ -0,0 +1,100 @@
+# Set based deletion of keys from a Snowflake table
+#
+# Python Version: 3.8.12
+#
+# Description : Delete the rows of a list of keys (e.g. ITEM_IDs) through
+#               a temporary key table and a single join based DELETE,
+#               instead of an "in (...)" literal that grows with the list
+#
+# Coding Steps :
+#               1. Load the keys into a temporary table with one bulk insert
+#               2. Delete the matching rows with one DELETE ... USING
+#               3. Apply the same filter to the pending in-memory data
+
+
+# 1. Import built-in packages and user defined functions
+
+from time import time
+from uuid import uuid4
+from pandas import DataFrame
+from snowflake.connector.pandas_tools import write_pandas
+
+import processed_configuration as con
+
+
+# 2. Deleting the rows of the keys
+
+def delete_key_set(conn, table, key_column, keys, pending=None, pending_column=None):
+    """Delete the rows whose key_column is in keys, in one statement.
+
+    Parameters
+    ----------
+    conn : object
+        Snowflake DB connection object.
+    table : string
+        Table to delete from.
+    key_column : string
+        Key column of the table.
+    keys : list
+        Keys to be deleted, no limit on the number of keys.
+    pending : dataframe, optional
+        Data yet to be written, the same keys are removed from it.
+    pending_column : string, optional
+        Key column of the pending data, key_column if None.
+
+    Returns
+    -------
+    tuple
+        Number of rows deleted and the filtered pending data
+        (None if no pending data was given).
+
+    How it works
+    ------------
+        1. Load the unique keys into a temporary table with write_pandas.
+        2. Delete from the table using the key table.
+        3. Drop the key table and filter the pending data.
+
+    """
+    print("Inside... delete_key_set()")
+    start = time()
+
+    keys = list(dict.fromkeys(keys))
+    deleted_rows = 0
+
+    if len(keys) > 0:
+        key_table = table + "_KEYS_" + uuid4().hex[:8].upper()
+
+        cur = conn.cursor()
+        try:
+            cur.execute("create temporary table " + key_table + " (" + \
+                        key_column + " varchar)")
+
+            success, _, nrows, _ = write_pandas( \
+                                                conn,
+                                                DataFrame({key_column:keys}),
+                                                key_table,
+                                                chunk_size=con.bulk_write_chunk_size
+                                               )
+            if not success:
+                raise Exception("Upload of " + str(len(keys)) + \
+                                " keys to " + key_table + " failed")
+
+            cur.execute("delete from " + table + " t using " + key_table + \
+                        " k where t." + key_column + " = k." + key_column)
+            deleted_rows = cur.rowcount
+        finally:
+            try:
+                cur.execute("drop table if exists " + key_table)
+            finally:
+                cur.close()
+
+    # Removing these keys from the pending data as well
+    if pending is not None:
+        if pending_column is None:
+            pending_column = key_column
+        pending = pending[~pending[pending_column].isin(keys)]
+
+    print("Deleted", deleted_rows, "row(s) of", len(keys), "key(s) from", table,
+          "in", round(time() - start, 2), "sec")
+    print("Exiting... delete_key_set()")
+    return deleted_rows, pending
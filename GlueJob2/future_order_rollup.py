@@ -0,0 +1,154 @@
+# Incremental maintenance of the aggregated future orders table
+#
+# Python Version: 3.8.12
+#
+# Description : Aggregate PROCESSED_INTER_FUTURE_ORDER_RELATED by ITEM_ID
+#               and MONTH_YEAR inside Snowflake and apply only the changed
+#               cells to PROCESSED_FUTURE_ORDER_RELATED, in one transaction,
+#               instead of reading the whole table back, truncating the
+#               target and reloading it
+#
+# Coding Steps :
+#               1. Load the eligible ITEM_IDs into a temporary key table
+#               2. Aggregate the intermediate table in Snowflake (GROUP BY)
+#               3. MERGE the changed and new cells, delete the cells which
+#                  are no longer eligible, in one transaction
+#               4. Drop the temporary tables and return the row counts
+
+
+# 1. Import built-in packages and user defined functions
+
+from time import time
+from uuid import uuid4
+from pandas import DataFrame
+from snowflake.connector.pandas_tools import write_pandas
+
+import processed_configuration as con
+
+
+# 2. Queries of the incremental refresh
+
+def _rollup_query(rollup_table, source_table, key_table, max_date):
+    """Aggregated future orders of the eligible items and months."""
+    return "create temporary table " + rollup_table + " as " + \
+           "select i.ITEM_ID, i.MONTH_YEAR, " + \
+           "coalesce(sum(i.FUTURE_ORDERS), 0) as FUTURE_ORDERS " + \
+           "from " + source_table + " i join " + key_table + " k " + \
+           "on i.ITEM_ID = k.ITEM_ID " + \
+           "where to_date(i.MONTH_YEAR, 'MON-YYYY') <= '" + \
+           max_date.strftime('%Y-%m-%d') + "' " + \
+           "group by i.ITEM_ID, i.MONTH_YEAR"
+
+
+def _merge_changed_query(target_table, rollup_table, run_time_stamp):
+    """MERGE of the cells whose value changed and of the new cells."""
+    return "merge into " + target_table + " t using " + rollup_table + " s " + \
+           "on t.ITEM_ID = s.ITEM_ID and t.MONTH_YEAR = s.MONTH_YEAR " + \
+           "when matched and t.FUTURE_ORDERS is distinct from s.FUTURE_ORDERS " + \
+           "then update set t.FUTURE_ORDERS = s.FUTURE_ORDERS, " + \
+           "t.RUN_TIME_STAMP = '" + run_time_stamp + "' " + \
+           "when not matched then insert " + \
+           "(RUN_TIME_STAMP, MONTH_YEAR, ITEM_ID, FUTURE_ORDERS) values ('" + \
+           run_time_stamp + "', s.MONTH_YEAR, s.ITEM_ID, s.FUTURE_ORDERS)"
+
+
+def _delete_stale_query(target_table, rollup_table):
+    """Delete of the cells no longer produced by the aggregation."""
+    return "delete from " + target_table + " t where not exists " + \
+           "(select 1 from " + rollup_table + " s " + \
+           "where s.ITEM_ID = t.ITEM_ID and s.MONTH_YEAR = t.MONTH_YEAR)"
+
+
+# 3. Refreshing the aggregated table
+
+def refresh_future_orders(conn, item_ids, max_date, run_time_stamp,
+                          source_table=None, target_table=None):
+    """Bring the aggregated future orders table in line with the
+    intermediate table, changing only the cells that differ.
+
+    Parameters
+    ----------
+    conn : object
+        Snowflake DB connection object.
+    item_ids : list
+        ITEM_IDs to be kept (items of the historical orders table).
+    max_date : timestamp
+        Last month of the future orders horizon.
+    run_time_stamp : string
+        Timestamp based run id. for the job, set on the changed cells.
+    source_table : string, optional
+        Intermediate table, the config table if None.
+    target_table : string, optional
+        Aggregated table, the config table if None.
+
+    Returns
+    -------
+    dict
+        Cells aggregated, inserted, updated and deleted, and the seconds
+        taken.
+
+    How it works
+    ------------
+        1. Load the ITEM_IDs into a temporary key table.
+        2. Aggregate the intermediate table by ITEM_ID and MONTH_YEAR in
+        Snowflake, for these items and the months up to max_date, into a
+        temporary table.
+        3. In one transaction, MERGE the cells which changed or are new
+        and delete the cells which are not in the aggregation anymore.
+        The target table is never empty and unchanged cells are not
+        rewritten. Any failure rolls back and is raised to the caller.
+
+    """
+    print("Inside... refresh_future_orders()")
+    start = time()
+
+    if source_table is None:
+        source_table = con.prsd_inter_FUTURE_ORDER_table
+    if target_table is None:
+        target_table = con.prsd_FUTURE_ORDER_table
+
+    suffix = uuid4().hex[:8].upper()
+    key_table = target_table + "_KEYS_" + suffix
+    rollup_table = target_table + "_ROLLUP_" + suffix
+
+    stats = {'table':target_table, 'aggregated_cells':0, 'inserted_rows':0,
+             'updated_rows':0, 'deleted_rows':0}
+
+    cur = conn.cursor()
+    try:
+        cur.execute("create temporary table " + key_table + " (ITEM_ID varchar)")
+        success, _, _, _ = write_pandas( \
+                                        conn,
+                                        DataFrame({"ITEM_ID":list(dict.fromkeys(item_ids))}),
+                                        key_table,
+                                        chunk_size=con.bulk_write_chunk_size
+                                       )
+        if not success:
+            raise Exception("Upload of the ITEM_IDs to " + key_table + " failed")
+
+        cur.execute(_rollup_query(rollup_table, source_table, key_table, max_date))
+        cur.execute("select count(*) from " + rollup_table)
+        stats['aggregated_cells'] = cur.fetchone()[0]
+
+        cur.execute("begin")
+        try:
+            cur.execute(_merge_changed_query(target_table, rollup_table, run_time_stamp))
+            stats['inserted_rows'], stats['updated_rows'] = cur.fetchone()[:2]
+
+            cur.execute(_delete_stale_query(target_table, rollup_table))
+            stats['deleted_rows'] = cur.rowcount
+            cur.execute("commit")
+        except:
+            cur.execute("rollback")
+            raise
+    finally:
+        try:
+            cur.execute("drop table if exists " + rollup_table)
+            cur.execute("drop table if exists " + key_table)
+        finally:
+            cur.close()
+
+    stats['seconds'] = round(time() - start, 2)
+    print("Future orders refresh :", stats)
+    print("Exiting... refresh_future_orders()")
+    return stats
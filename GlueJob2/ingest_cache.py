@@ -0,0 +1,139 @@
+# Parquet cache of the order workbooks
+#
+# Python Version: 3.8.12
+#
+# Description : Convert each order workbook (.xlsx) once into a typed
+#               Parquet file holding only the required columns, keyed by
+#               the S3 ETag and size of the source object, so that retries,
+#               reruns and backfills read the Parquet copy instead of
+#               parsing the workbook again
+#
+# Coding Steps :
+#               1. Select the order files from the S3 listing
+#               2. Look up the Parquet copy of each workbook in the cache
+#               3. Download and parse only the files not in the cache,
+#                  with the declared types (kfs_order_reader)
+#               4. Write the Parquet copy of the newly parsed workbooks
+
+
+# 1. Import built-in packages and user defined functions
+
+from time import time
+from zlib import crc32
+import awswrangler as wr
+
+import processed_configuration as con
+from s3_selective_fetch import list_matching_objects, download_objects
+from kfs_order_reader import read_order_csv, read_order_workbook
+
+
+# 2. Cache path of a workbook
+
+def cache_object_path(obj, columns):
+    """Parquet path of the workbook, from its ETag, size, the columns
+    and their declared types."""
+    schema = "|".join(columns) + "|" + \
+             str(sorted((col, str(dtype)) for col, dtype in con.order_column_dtypes.items()))
+    columns_tag = format(crc32(schema.encode()), '08x')
+    return con.ingest_cache_path.rstrip("/") + "/" + obj['etag'].replace("-", "_") + \
+           "_" + str(obj['size']) + "_" + columns_tag + ".parquet"
+
+
+def to_typed_frame(frame):
+    """Cast the object columns holding mixed types (e.g. numbers and text
+    in an item column) to text, keeping the blanks, so that they can be
+    stored in Parquet."""
+    for col in frame.columns[frame.dtypes == object]:
+        values = frame[col].dropna()
+        if values.map(type).nunique() > 1:
+            frame[col] = frame[col].where(frame[col].isna(), frame[col].astype(str))
+    return frame
+
+
+# 3. Reading the order files through the cache
+
+def read_order_files(bucket_name, prefix, key_pattern, extensions, columns,
+                     max_age_days=None):
+    """Read the order files matching the pattern, the workbooks from
+    their Parquet copy when available.
+
+    Parameters
+    ----------
+    bucket_name : string
+        S3 bucket name.
+    prefix : string
+        S3 folder (prefix) to be scanned.
+    key_pattern : string
+        Case insensitive text the object key must contain.
+    extensions : list
+        Accepted file extensions.
+    columns : list
+        Required columns.
+    max_age_days : int, optional
+        Only objects modified in the last n days are read.
+
+    Returns
+    -------
+    tuple
+        List of dataframes (one per file), keys with an unexpected
+        extension and a dict with the read statistics.
+
+    How it works
+    ------------
+        1. Select the objects from the listing (no download).
+        2. Read the Parquet copy of the workbooks already converted.
+        3. Download the other files in parallel and parse them, the
+        workbooks with only the required columns.
+        4. Write the Parquet copy of the newly parsed workbooks.
+
+    """
+    print("Inside... read_order_files()")
+    start = time()
+
+    selected, unexpected, skipped_bytes = list_matching_objects( \
+                                                bucket_name,
+                                                prefix,
+                                                key_pattern,
+                                                extensions,
+                                                max_age_days
+                                               )
+
+    frames = {}
+    to_download = []
+    for obj in selected:
+        cache_path = cache_object_path(obj, columns)
+        if con.ingest_cache_enabled and (obj['extension'] == '.xlsx') and \
+           wr.s3.does_object_exist(cache_path):
+            print("Ingest cache hit :", obj['key'], "->", cache_path)
+            frames[obj['key']] = wr.s3.read_parquet(cache_path)
+        else:
+            to_download.append(obj)
+
+    for obj in download_objects(bucket_name, to_download, con.fetch_max_workers):
+        if(obj['extension'] == '.csv'):
+            frames[obj['key']] = read_order_csv(obj['body'], columns)
+            continue
+
+        frame = to_typed_frame(read_order_workbook(obj['body'], columns))
+        frames[obj['key']] = frame
+
+        if con.ingest_cache_enabled:
+            cache_path = cache_object_path(obj, columns)
+            print("Ingest cache miss :", obj['key'], "->", cache_path)
+            try:
+                wr.s3.to_parquet(frame, cache_path, index=False)
+            except Exception as e:
+                # The cache is only an optimization, the run goes on without it
+                print(f'Error while writing the ingest cache {cache_path} : {e}')
+
+    stats = {
+             'selected_objects':len(selected),
+             'cache_hits':len(selected) - len(to_download),
+             'fetched_bytes':sum(obj['size'] for obj in to_download),
+             'skipped_bytes':skipped_bytes,
+             'seconds':round(time() - start, 2)
+            }
+    print("Order files read :", stats)
+
+    print("Exiting... read_order_files()")
+    return [frames[obj['key']] for obj in selected], unexpected, stats
@@ -20,22 +20,129 @@
 
 import pandas as pd
 import numpy as np
-import os
-from boto3 import resource
 from io import BytesIO
 from pytz import timezone
 from datetime import datetime, date
 from calendar import monthrange, month_abbr
-from pandas import read_csv, read_excel, concat, read_sql, DataFrame, to_datetime, merge
+from pandas import read_csv, read_excel, concat, DataFrame, to_datetime, merge
 from dateutil.relativedelta import relativedelta
 import awswrangler as wr
 from snowflake.connector.pandas_tools import write_pandas
 
 import processed_configuration as con
+from ingest_cache import read_order_files
+from kfs_order_reader import normalise_identifiers
+from kfs_history_cache import load_processed_orders
+from snowflake_key_set import delete_key_set
+from snowflake_bulk_writer import bulk_write
+from future_order_rollup import refresh_future_orders
+from snowflake_fetch import fetch_frame
+from concurrent.futures import ThreadPoolExecutor
+from kfs_period_codec import encode_periods, decode_periods, code_to_period, add_months, \
+                             codes_to_dates, dates_to_codes, periods_to_dates
+from kfs_month_grid import build_month_grid, fill_month_grid
+from kfs_future_order_kernel import future_order_totals_of_lines
+from sku_sharding import run_sharded
+from kfs_dormancy import build_dormancy_state, update_dormancy_state, drop_items, dormant_items, \
+                         load_dormancy_state, save_dormancy_state
 from error_logging import create_and_insert_error
 from snowflake_db_connection import connect_to_db
 
-# 2. Preprocessing the orders data
+# 2. Future orders of one incremental month
+
+def future_orders_of_month(items, data_req, month_code):
+    """Future orders of an incremental month on its item x month grid.
+
+    Parameters
+    ----------
+    items : series
+        ITEM_IDs of the grid.
+    data_req : dataframe
+        Future orders of all the incremental months (OR_MONTH_IDX,
+        3rd_Item_Number, MONTH_IDX, Future_Orders).
+    month_code : int
+        Month index of the incremental month.
+
+    Returns
+    -------
+    dataframe
+        Date, Future_Orders, ITEM_ID and INCREMENTAL_MONTH, 0 where
+        there's no future order.
+
+    """
+    grid = build_month_grid(items, month_code, add_months(month_code, con.plus_month_period))
+    observed = data_req[data_req["OR_MONTH_IDX"] == month_code]
+
+    month_data = fill_month_grid(grid, observed, "3rd_Item_Number", "MONTH_IDX", "Future_Orders")
+    month_data["Date"] = codes_to_dates(month_data["MONTH_IDX"])
+    month_data["INCREMENTAL_MONTH"] = code_to_period(month_code)
+
+    print("Shape of", code_to_period(month_code), "item x month grid : ", month_data.shape)
+    return month_data[["Date","Future_Orders","ITEM_ID","INCREMENTAL_MONTH"]]
+
+
+# 3. Dormancy state of the intermediate future orders table
+
+def future_order_dormancy_state(conn, kfs_fut_order, periods):
+    """Dormancy state of the intermediate future orders of the previous
+    incremental months : the saved state with the rows written since
+    added, else built from the table.
+
+    Parameters
+    ----------
+    conn : object
+        Snowflake DB connection object.
+    kfs_fut_order : dataframe
+        Intermediate future orders table.
+    periods : list
+        Incremental months (Mon-yyyy) of this run, not counted.
+
+    Returns
+    -------
+    dataframe
+        Dormancy state of every ITEM_ID of the other incremental months.
+
+    How it works
+    ------------
+        1. Load the saved state, it is the state of the whole table
+        once the last run has written it.
+        2. Build it again from the table rows of the other incremental
+        months if there's none or it has rows of this run's months (a
+        month processed again, its rows can't be taken out).
+        3. Else, add the rows written since it was saved.
+
+    """
+    fut_state, meta = load_dormancy_state(conn, con.prsd_inter_FUTURE_ORDER_table)
+    
+    if (fut_state is not None) and (len(set(meta["incremental_months"]) & set(periods)) > 0):
+        print("Dormancy state has rows of the incremental months, building it again")
+        fut_state = None
+    
+    if fut_state is None:
+        print("Building the dormancy state from the intermediate table ...")
+        hist = kfs_fut_order[~kfs_fut_order["INCREMENTAL_MONTH"].isin(periods)]
+        fut_state = build_dormancy_state( \
+                                         hist["ITEM_ID"].astype(str),
+                                         encode_periods(hist["MONTH_YEAR"]),
+                                         hist["FUTURE_ORDERS"]
+                                        )
+    else:
+        delta = kfs_fut_order[(kfs_fut_order["RUN_TIME_STAMP"].astype(str) > meta["run_time_stamp"]) & \
+                              ~kfs_fut_order["INCREMENTAL_MONTH"].isin(periods)]
+        print("Rows written since the dormancy state was saved : ", delta.shape[0])
+        fut_state = update_dormancy_state( \
+                                          fut_state,
+                                          delta["ITEM_ID"].astype(str),
+                                          encode_periods(delta["MONTH_YEAR"]),
+                                          delta["FUTURE_ORDERS"],
+                                          mode='add'
+                                         )
+    
+    print("Items in the dormancy state : ", fut_state.shape[0])
+    return fut_state
+
+
+# 4. Preprocessing the orders data
 
 def add_monthly_data(cur, conn, run_time_stamp):
     """Preprocessing the orders data and updating the orders table.
@@ -71,11 +178,23 @@ def add_monthly_data(cur, conn, run_time_stamp):
 
         print("tz: ",tz,"\nnow_est: ",now_est,"\ncurr_mon: ",curr_mon,"\ncurr_yr: ",curr_yr)
         
-        # Connect to AWS S3 bucket where the orders file reside
-        s3 = resource(con.aws_service1)
-        bucket = s3.Bucket(con.bucket_name)
-        prefix = con.folder_name
-        prefix_objs = bucket.objects.filter(Prefix = prefix)
+        # Selecting the future orders files from the S3 listing and
+        # reading only those, the workbooks from their Parquet copy
+        fut_dfs, unexpected_objs, fetch_stats = read_order_files( \
+                                            con.bucket_name,
+                                            con.folder_name,
+                                            con.future_order_file_pattern,
+                                            con.future_order_file_extensions,
+                                            con.req_columns,
+                                            con.future_order_file_max_age_days
+                                           )
+
+        if(len(unexpected_objs) > 0):
+            raise Exception( \
+                    "Future Orders file is not " + 
+                    "in the expected format (csv or xlsx) for the " +
+                    curr_mon + "-" + curr_yr + " run."
+                   )
         
         # Initializing the list of dataframes that will
         # hold incremental monthly data
@@ -84,31 +203,16 @@ def add_monthly_data(cur, conn, run_time_stamp):
         # Setting the file available indicator to false
         incre_file_ind = False
         
-        # Iterating through the objects in S3 bucket folder
-        # to find incremental monthly file
-        for obj in prefix_objs:
-            name, extension = os.path.splitext(obj.key)
-            body = obj.get()['Body'].read()
-            if 'future_orders' in str(obj).lower():
-                if(extension == '.csv'):
-                    temp = read_csv(BytesIO(body))
-                elif(extension == '.xlsx'):
-                    temp = read_excel(BytesIO(body),engine='openpyxl')
-                else:
-                    raise Exception( \
-                            "Future Orders file is not " + 
-                            "in the expected format (csv or xlsx) for the " +
-                            curr_mon + "-" + curr_yr + " run."
-                           )
-
-                if(temp.shape[0] == 0):
-                    raise Exception( \
-                            "Future Orders file is empty for the " +
-                            curr_mon + "-" + curr_yr + " run."
-                           )
+        # Checking the future orders files read
+        for temp in fut_dfs:
+            if(temp.shape[0] == 0):
+                raise Exception( \
+                        "Future Orders file is empty for the " +
+                        curr_mon + "-" + curr_yr + " run."
+                       )
 
-                prefix_dfs.append(temp)
-                incre_file_ind = True
+            prefix_dfs.append(temp)
+            incre_file_ind = True
                 
         # Raising the resp. exception message if
         # the file is not found
@@ -132,12 +236,6 @@ def add_monthly_data(cur, conn, run_time_stamp):
         print("Shape of Incremental data read from S3 : ",df_monthly_future_order.shape)
         print("Incremental df_monthly_future_order : ", df_monthly_future_order.head(1))
         
-        # Setting incremental order date to 1st day of the month
-        input_dt = df_monthly_future_order["Order Date"].min()
-        print('Incremental order date is:', input_dt)
-        incre_ordt = input_dt.replace(day=1)
-        print('Datetime is :', incre_ordt)
-        
         #Dropping last row    
 #         df_monthly_future_order.drop(df_monthly_future_order.tail(1).index,inplace=True)
         
@@ -155,14 +253,12 @@ def add_monthly_data(cur, conn, run_time_stamp):
         # Replacing columns with " " values with ""
         cols_to_strip=['3rd_Item_Number','2nd_Item_Number','Or_Ty']
 
-        for cl in cols_to_strip:
-            df_monthly_future_order[cl]=df_monthly_future_order[cl].astype(str).str.strip()
-            df_monthly_future_order[cl]=df_monthly_future_order[cl].str.upper()
-            
+        # Stripped and upper cased once per unique value, kept as categoricals
+        df_monthly_future_order = normalise_identifiers(df_monthly_future_order, cols_to_strip)
         
-        df_monthly_future_order['INCREMENTAL_MONTH'] = to_datetime(df_monthly_future_order['Order_Date'])
+        # Order_Date is parsed at read time
         df_monthly_future_order['INCREMENTAL_MONTH'] = \
-                to_datetime(df_monthly_future_order['INCREMENTAL_MONTH'].dt.date).dt.strftime('%b-%Y')
+                to_datetime(df_monthly_future_order['Order_Date']).dt.strftime('%b-%Y')
         print(df_monthly_future_order.shape)
         df_monthly_future_order.head(2)
         
@@ -172,7 +268,10 @@ def add_monthly_data(cur, conn, run_time_stamp):
         periods2 = list((df_monthly_future_order['INCREMENTAL_MONTH']).unique())
         print("periods2 : ",periods2)
         
-        periods = [x for x in periods2 if str(x) != 'nan']
+        # Incremental months in chronological order, each one is
+        # processed as a separate incremental month below
+        period_codes = np.unique(encode_periods([x for x in periods2 if str(x) != 'nan']))
+        periods = list(decode_periods(period_codes))
         print("periods after removing nan if it exists : ",periods)
         
         print("Number of SKUs before filtering order types : ", df_monthly_future_order["3rd_Item_Number"].nunique())
@@ -204,95 +303,41 @@ def add_monthly_data(cur, conn, run_time_stamp):
         
         ### 1. Creating Future order dataset
         
-        df_monthly_future_order3=df_monthly_future_order2[["3rd_Item_Number","Request_Date",'Order_Date',"Quantity_Ordered"]]\
-        .sort_values(by=["3rd_Item_Number","Request_Date",'Order_Date'])
-        
-        df_monthly_future_order4=df_monthly_future_order3.groupby\
-        (["3rd_Item_Number","Request_Date",'Order_Date'])["Quantity_Ordered"].sum().reset_index()
-        
-        df_monthly_future_order4["Rq_Date"]=df_monthly_future_order4["Request_Date"].to_numpy().astype('datetime64[M]')
-        df_monthly_future_order4["Or_Date"]=df_monthly_future_order4["Order_Date"].to_numpy().astype('datetime64[M]')
-        
-        print("Shape of df_monthly_future_order4 : ", df_monthly_future_order4.shape)
-        print("df_monthly_future_order4 : ", df_monthly_future_order4.head(1))
-        
-        agg_data=df_monthly_future_order4.groupby(["3rd_Item_Number","Or_Date","Rq_Date",])["Quantity_Ordered"].sum().reset_index()
-        print("Shape of dataset on aggregating the data at Order date and Request date : ", agg_data.shape)
-        
-        print("agg_data['Or_Date'].min() : ", agg_data["Or_Date"].min(),"agg_data['Or_Date'].max() :", agg_data["Or_Date"].max())
-        
-        agg_data["ind"]=np.where((agg_data["Or_Date"]<agg_data["Rq_Date"]),1,0)
-        
-        agg_data2=agg_data.copy()
-        agg_data2["or_month"]=agg_data2["Or_Date"].dt.month
-        agg_data2["or_year"]=agg_data2["Or_Date"].dt.year
-
-        agg_data2["rq_month"]=agg_data2["Rq_Date"].dt.month
-        agg_data2["rq_year"]=agg_data2["Rq_Date"].dt.year
-
-              
-        agg_data2["same_month_ind"]=np.where(((agg_data2["or_month"]==agg_data2["rq_month"]) \
-                                              & (agg_data2["or_year"]==agg_data2["rq_year"])),0,1)
-        
-        agg_data2["final_ind"]=np.where(((agg_data2["ind"]==1) & (agg_data2["same_month_ind"]==1)),1,0)
-        
-        print("agg_data2['final_ind'] count: ",agg_data2["final_ind"].value_counts(dropna=False))
-        
-        agg_data3=agg_data2[agg_data2["final_ind"]==1]
-        print("Shape of data post filtering final_ind = 1 : " , agg_data3.shape)
-        
-        agg_data3.drop(columns={"ind","or_month","or_year","rq_month","rq_year","same_month_ind","final_ind"},inplace=True)
-        agg_data3.rename(columns={"Quantity_Ordered":"Future_Orders"},inplace=True)
-        print("Shape of data post dropping & renaming columns : ", agg_data3.shape)
-        print("Data post dropping & renaming columns : ", agg_data3.head(1))
-        
-        # 2. Aggregating the data
-        data_req=agg_data3.groupby(["3rd_Item_Number","Rq_Date"])["Future_Orders"].sum().reset_index()
+        # Future orders (request month later than the order month) per
+        # incremental (order) month, item and request month, reduced from
+        # the order lines in one pass on month codes, the items being
+        # sharded over a process pool
+        data_req=run_sharded( \
+                             future_order_totals_of_lines,
+                             df_monthly_future_order2[["3rd_Item_Number","Order_Date","Request_Date","Quantity_Ordered"]],
+                             "3rd_Item_Number",
+                             sort_by=["OR_MONTH_IDX","3rd_Item_Number","MONTH_IDX"]
+                            )
+        print("Shape of dataset on aggregating the future orders : ", data_req.shape)
         
-        # Sorted the data by 3rd_Item_Number & Request_Date
-        data_req=data_req[["3rd_Item_Number","Rq_Date","Future_Orders"]].sort_values(by=["3rd_Item_Number","Rq_Date"])
-        
-        data_req["Future_Orders"].fillna(0,inplace=True)
         print("value_counts of Future_Orders : ", data_req["Future_Orders"].value_counts(dropna=False))
         
-        # Assumed that all the orders are placed on 1st of that month and created a Date column
-        data_req["Date"]=data_req["Rq_Date"].to_numpy().astype('datetime64[M]')
-        
-        # Aggregating the Quantity_Ordered at Monthly level
-        data_req=data_req.groupby(["3rd_Item_Number","Date"])["Future_Orders"].sum().reset_index()
-        
         # 2. Checking if there's any negative orders in Quantity_Ordered per month per sku!
-        data_req["Flag"]=np.where(data_req["Future_Orders"]<0,1,0)
-        data_req["Future_Orders_n"]=np.where(data_req["Future_Orders"]<0,0,data_req["Future_Orders"])
-        data_req.drop(columns={"Future_Orders"},inplace=True)
-        data_req.rename(columns={"Future_Orders_n":"Future_Orders"},inplace=True)
+        print("Flag counts : ", (data_req["Future_Orders"]<0).astype(int).value_counts(dropna=False))
+        data_req["Future_Orders"]=data_req["Future_Orders"].clip(lower=0)
         print("Shape of dataset after treating for negative orders : ", data_req.shape)
-                
-        print("Flag counts : ", data_req["Flag"].value_counts(dropna=False))
-        
-        
-        # Dropping column not required
-        data_req.drop(columns={"Flag"},inplace=True)
-        print("Data after removing Flag column : ", data_req.head(1))
-        
-        print(data_req["Date"].min(),data_req["Date"].max())
+        print("Data after treating for negative orders : ", data_req.head(1))
         
         
         # Reading historical datasets
         print("Reading the Historical orders table ...",con.prsd_KFS_orders_table)
-        kfs_proc_order2= "select * from " + con.prsd_KFS_orders_table
-        kfs_proc_order=read_sql(kfs_proc_order2, conn)
+        kfs_proc_order, hist_stats = load_processed_orders(conn)
         
         kfs_proc_order["ITEM_ID"]=kfs_proc_order["ITEM_ID"].astype(str) #Added 9thFeb23
         
         print("Reading the Historical Future orders table ...",con.prsd_inter_FUTURE_ORDER_table)
         kfs_fut_order2= "select * from " + con.prsd_inter_FUTURE_ORDER_table
-        kfs_fut_order=read_sql(kfs_fut_order2, conn)
+        kfs_fut_order=fetch_frame(conn, kfs_fut_order2)
         
-        print("periods :", periods[0])
+        print("periods :", periods)
         
-        # Removing data of same months' run
-        kfs_fut_order_n=kfs_fut_order[kfs_fut_order["INCREMENTAL_MONTH"]!=periods[0]]
+        # Removing data of the same months' runs
+        kfs_fut_order_n=kfs_fut_order[~kfs_fut_order["INCREMENTAL_MONTH"].isin(periods)]
         print(kfs_fut_order_n.shape)
         kfs_fut_order_n.head(2)
         
@@ -300,14 +345,6 @@ def add_monthly_data(cur, conn, run_time_stamp):
         
         kfs_fut_order_n["INCREMENTAL_MONTH"].value_counts(dropna=False)
         
-        # Deleting records if it already exsits in the current incremental file
-        del_frm_inter_order="delete from PROCESSED_INTER_FUTURE_ORDER_RELATED"
-        delete_qry_inter = del_frm_inter_order + " where INCREMENTAL_MONTH = '" + \
-                     periods[0] + "'"
-        delete_qry_inter
-        
-        cur.execute(delete_qry_inter)
-
         # New addition
         data1=kfs_proc_order[["ITEM_ID"]].drop_duplicates() #Historical KFS_PROCESSED_ORDERS_TARGET dataset
         data2=kfs_fut_order_n[["ITEM_ID"]].drop_duplicates() #Historical PROCESSED_INTER_FUTURE_ORDER_RELATED dataset
@@ -324,81 +361,39 @@ def add_monthly_data(cur, conn, run_time_stamp):
         data_all=data_all.drop_duplicates(subset=["ITEM_ID"])
         print("Shape of concatenated dataset post removal of duplicated ITEM_IDs : ", data_all.shape)
         
-        data_all["min"]=incre_ordt #NEW
-        
-        print("Minimum date in data_all dataset : ", data_all["min"].min())
-        
-        # Add 12 months to the date
-        data_all['max']=data_all["min"] + pd.DateOffset(months=con.plus_month_period)
+        # Item x month grid of each incremental month (the month and the
+        # next 12 months) joined with its future orders, the months
+        # being built concurrently
+        with ThreadPoolExecutor(max_workers=con.future_order_month_workers) as pool:
+            month_frames=list(pool.map(
+                lambda month_code: future_orders_of_month(data_all["ITEM_ID"], data_req, month_code),
+                period_codes
+            ))
         
-        data_all2=data_all.set_index("ITEM_ID")
-        
-        # Create MultiIndex with separate Date rangs per group
-        midx=pd.MultiIndex.from_frame(
-            data_all2.apply(
-                lambda x: pd.date_range(x['min'],x['max'],freq='MS'), axis=1
-            ).explode().reset_index(name='Date')[['Date','ITEM_ID']]
-        )
-
-        # Changing the above obtained MultiIndex to DataFrame
-        data_all2=midx.to_frame(index=False)
-        
-        # data_req will contain data for further more future months' data, hence outer join
-        # Joining the DataFrame with the actual data to get the Quantity_Ordered populated
-        temp3=pd.merge(data_all2,data_req,how='outer',left_on=["ITEM_ID",'Date'],right_on=["3rd_Item_Number",'Date'])
+        temp3=pd.concat(month_frames, ignore_index=True)
         print("Combined dataset shape : ", temp3.shape)
         
-#         Dropping and renaming columns
-        temp3["ITEM_ID_N"]=np.where(temp3["ITEM_ID"].isna(),temp3["3rd_Item_Number"],temp3["ITEM_ID"])
-        temp3.drop(columns={"ITEM_ID","3rd_Item_Number"},inplace=True)
-        temp3.rename(columns={"ITEM_ID_N":"ITEM_ID"},inplace=True)
-        print("Shape of dataset post dropping and renaming columns : ", temp3.shape)
+        # Last month of the horizon of the latest incremental month
+        max_date = pd.Timestamp(codes_to_dates([add_months(period_codes.max(), con.plus_month_period)])[0])
         
-        temp3["Future_Orders"].fillna(0,inplace=True)
-        
-        kfs_fut_order_n["year"]=kfs_fut_order_n["MONTH_YEAR"].str[-4:]
-        kfs_fut_order_n["month"]=kfs_fut_order_n["MONTH_YEAR"].str[:3]
-        kfs_fut_order_n["month"]=pd.to_datetime(kfs_fut_order_n.month, format='%b').dt.month
-        kfs_fut_order_n["day"]=1
-
-        kfs_fut_order_n["date_time_str"] = kfs_fut_order_n["year"].astype('str') + '-' + kfs_fut_order_n["month"].astype('str') +\
-        '-' + kfs_fut_order_n["day"].astype('str')
-
-        kfs_fut_order_n["Date"]=pd.to_datetime(kfs_fut_order_n['date_time_str'], format='%Y-%m-%d')
+        kfs_fut_order_n["Date"]=periods_to_dates(kfs_fut_order_n["MONTH_YEAR"])
         print("kfs_fut_order_n : ", kfs_fut_order_n.head(1))
 
-        kfs_fut_order_n.drop(columns={"year","MONTH_YEAR","month","day","date_time_str"},inplace=True)
+        kfs_fut_order_n.drop(columns={"MONTH_YEAR"},inplace=True)
         print("Data types of kfs_fut_order_n : ", kfs_fut_order_n.dtypes)
         
     
         #Added on 30thJan23 - starts
         #Working on historical dataset to check item_id's with 0 demand in last 2 years
-        data_futord=kfs_fut_order_n.rename(columns={"ITEM_ID":"item_id","FUTURE_ORDERS":"Future_Orders"})
-        data_futord.drop(columns={"RUN_TIME_STAMP","INCREMENTAL_MONTH"},inplace=True)
-        print("Shape of historical Future order dataset :" , data_futord.shape)
-            
-        # Appending history and incremental datasets
-        data_comb=pd.concat([data_futord,temp3])
-        print("Shape of combined dataset : ", data_comb.shape)
+        # Dormancy state (future orders of the latest months, last months
+        # with data / with future orders) of the historical items. The
+        # incremental rows never counted here, so they aren't added.
+        fut_state=future_order_dormancy_state(conn, kfs_fut_order, periods)
                 
-        print("Maximum timestamp : ", data_all2["Date"].max())
-        
-        # Checking which all SKUs doesnt have any orders in past 2 years - starting 2021 to 2022 for creating history dataset
-        three_years = data_all2["Date"].max() + relativedelta(months=-36)
-        print("Date for 3 years : ", three_years)
-        
-        data_comb["Date_Tag"]=np.where((data_comb["Date"]>three_years),"Last 3 year","Other")
-        
-        data_comb["Date_Tag"].value_counts(dropna=False)
-        
-        grp=data_comb.groupby(["item_id","Date_Tag"])["Future_Orders"].sum().reset_index()
-        print("Shape of grp table : ", grp.shape)
+        print("Maximum timestamp : ", max_date)
         
-        item_emp=grp[(grp["Future_Orders"]==0) & (grp["Date_Tag"]=="Last 3 year")]
-        print("No of items in combined dataset which has 0 demand in past 3 years : ", item_emp.shape)
-        
-        #Converting the above ontained items to a list
-        sku_list_3yrs=item_emp["item_id"].tolist()
+        # Checking which all SKUs doesnt have any orders in past 3 years, up to the horizon end
+        sku_list_3yrs=dormant_items(fut_state, con.dormancy_months, as_of=dates_to_codes([max_date])[0])
         print("List of skus which has 0 demand in past 3 years : ", sku_list_3yrs)
                      
         #We would want to exclude items from above list which were provided by Business
@@ -454,33 +449,22 @@ def add_monthly_data(cur, conn, run_time_stamp):
                 
         print(res)
         
-        # Changing elements in list to a str in order to write sql code
-        if len(res)==1:
-            fin_lst=str(tuple(res)).replace(",)",")")
-            print("Length of res is 1 & element in it is : ",fin_lst)
-            print(type(fin_lst))
-        else:
-            fin_lst=tuple(res)
-            fin_lst = str(fin_lst)
-            print("Length of res is NE 1 & elements in it are : ",fin_lst)
-            print(type(fin_lst))
-        
-        # Get the delete and insert queries from config file
-        delete_qry_item = con.del_frm_inter_order + " where ITEM_ID in " + \
-                     fin_lst + ""
-        print("delete query : ", delete_qry_item)
-        
         print("No. of resultant skus whose data needs to be deleted from historical inter order table :",len(res))
         
-        if len(res)>0:
-            cur.execute(delete_qry_item)
-            
-        # Removing these skus from incremental data as well if exists
-        temp4=temp3[~temp3["ITEM_ID"].isin(res)]
+        # Deleting these skus from the historical inter order table and 
+        # removing them from incremental data as well if exists
+        deleted_rows, temp4 = delete_key_set( \
+                                             cur.connection,
+                                             con.prsd_inter_FUTURE_ORDER_table,
+                                             "ITEM_ID",
+                                             res,
+                                             pending=temp3
+                                            )
         print("Shape of temp4 dataset  post removing 0 demand items : ", temp4.shape)
 
         #Added on 30thJan23 - ends
         
+        temp4=temp4.reset_index(drop=True)
         temp5=temp4[["Date","ITEM_ID","Future_Orders"]]
         temp5.columns=["timestamp","item_id","Future_Orders"]
         print("temp5 shape : ", temp5.shape) 
@@ -491,15 +475,11 @@ def add_monthly_data(cur, conn, run_time_stamp):
 #         Changing format of timestamp to month_year
         # Extracting date from Request_Date column in
         # the format Mon-yyyy
-        temp5['mm'] = temp5['timestamp'].dt.month
+        temp5['mon_yyyy'] = decode_periods(dates_to_codes(temp5['timestamp']))
         
-        temp5['mon'] = temp5['mm'].apply(lambda x: month_abbr[x])
+        print("value count of mon_yyyy : ", temp5['mon_yyyy'].value_counts(dropna=False))
         
-        print("value count of mon : ", temp5['mon'].value_counts(dropna=False))
-        
-        temp5['mon_yyyy'] = temp5['mon'] + "-" + temp5['timestamp'].dt.year.astype(str)
-        
-        temp5=temp5.drop(columns={"mm","mon","timestamp"})
+        temp5=temp5.drop(columns={"timestamp"})
         
         temp5.columns=["ITEM_ID","FUTURE_ORDERS","RUN_TIME_STAMP","MONTH_YEAR"]
         temp5=temp5[["RUN_TIME_STAMP","MONTH_YEAR","ITEM_ID","FUTURE_ORDERS"]]
@@ -510,76 +490,104 @@ def add_monthly_data(cur, conn, run_time_stamp):
         
         print("Unique MONTH_YEAR : ", temp5["MONTH_YEAR"].unique())
         
-        temp5["INCREMENTAL_MONTH"]=periods[0]
+        temp5["INCREMENTAL_MONTH"]=temp4["INCREMENTAL_MONTH"]
         
         # Appending this monthly orders data to the intermediate table in snowflake
         #Static table name entered
 
         # Create table - PROCESSED_INTER_FUTURE_ORDER_RELATED in snowflake which will contain history non-aggregated data
 
-        cur, conn = connect_to_db()
-        try:
-            write_pandas(conn, temp5, 'PROCESSED_INTER_FUTURE_ORDER_RELATED')
-        except Exception as e:
-            print(f'Error while writing data to table PROCESSED_INTER_FUTURE_ORDER_RELATED : {e}')
-            
-        
-        # Now, reading the intermediate future order file in order to aggregate at month_year
-        kfs_inter_order1= "select * from " + con.prsd_inter_FUTURE_ORDER_table
-        kfs_inter_order=read_sql(kfs_inter_order1, conn)
-        print("Shape of intermediate table : ", kfs_inter_order.shape)
+        # Each incremental month replaces the rows of the same month already
+        # in the table (delete + insert in one transaction), so a failed
+        # month keeps its previous rows
+        failed_periods = []
+        for period in periods:
+            month_rows = temp5[temp5["INCREMENTAL_MONTH"]==period].reset_index(drop=True)
+            try:
+                if month_rows.shape[0] > 0:
+                    bulk_write(conn, month_rows, con.prsd_inter_FUTURE_ORDER_table,
+                               'replace', partition_column="INCREMENTAL_MONTH")
+                else:
+                    cur.execute(con.del_frm_inter_order + " where INCREMENTAL_MONTH = %s",
+                                (period,))
+            except Exception as e:
+                print(f'Error while writing {period} data to table {con.prsd_inter_FUTURE_ORDER_table} : {e}')
+                failed_periods.append(period)
+
+        # The final table is refreshed from the intermediate one, not
+        # refreshed when a month is missing there
+        if len(failed_periods) > 0:
+            raise Exception("Incremental month(s) not written to " +
+                            con.prsd_inter_FUTURE_ORDER_table + " : " +
+                            ", ".join(failed_periods))
+        
+        # Saving the dormancy state of the intermediate table as written by
+        # this run : without the deleted skus, with the incremental months
+        table_state=update_dormancy_state( \
+                                          drop_items(fut_state, res),
+                                          temp5["ITEM_ID"].astype(str),
+                                          encode_periods(temp5["MONTH_YEAR"]),
+                                          temp5["FUTURE_ORDERS"],
+                                          mode='add'
+                                         )
+        incremental_months=set(kfs_fut_order_n["INCREMENTAL_MONTH"].dropna().astype(str)) | set(periods)
+        save_dormancy_state(conn, con.prsd_inter_FUTURE_ORDER_table, table_state, run_time_stamp,
+                            incremental_months=sorted(incremental_months))
+        
+        if con.future_order_refresh_mode == 'incremental':
+            # Aggregating the intermediate table in Snowflake and merging
+            # only the changed cells of the next 12 months, for the items
+            # present in historical orders table
+            refresh_future_orders(conn, sku_list_ord, max_date, run_time_stamp)
+        else:
+            # Now, reading the intermediate future order file in order to aggregate at month_year
+            kfs_inter_order1= "select * from " + con.prsd_inter_FUTURE_ORDER_table
+            kfs_inter_order=fetch_frame(conn, kfs_inter_order1)
+            print("Shape of intermediate table : ", kfs_inter_order.shape)
         
-        kfs_inter_order["ITEM_ID"]=kfs_inter_order["ITEM_ID"].astype(str) #Added 9thFeb23
+            kfs_inter_order["ITEM_ID"]=kfs_inter_order["ITEM_ID"].astype(str) #Added 9thFeb23
         
                
-        kfs_inter_order2=kfs_inter_order.groupby(["ITEM_ID","MONTH_YEAR"])["FUTURE_ORDERS"].sum().reset_index()
+            kfs_inter_order2=kfs_inter_order.groupby(["ITEM_ID","MONTH_YEAR"])["FUTURE_ORDERS"].sum().reset_index()
         
-        # Filtering future orders for Items present in historical orders table
-        kfs_inter_order3=kfs_inter_order2[kfs_inter_order2["ITEM_ID"].isin(sku_list_ord)]
-        print(kfs_inter_order3.shape)
-        kfs_inter_order3.head(2)
+            # Filtering future orders for Items present in historical orders table
+            kfs_inter_order3=kfs_inter_order2[kfs_inter_order2["ITEM_ID"].isin(sku_list_ord)]
+            print(kfs_inter_order3.shape)
+            kfs_inter_order3.head(2)
         
-        kfs_inter_order3["year"]=kfs_inter_order3["MONTH_YEAR"].str[-4:]
-        kfs_inter_order3["month"]=kfs_inter_order3["MONTH_YEAR"].str[:3]
-        kfs_inter_order3["month"]=pd.to_datetime(kfs_inter_order3.month, format='%b').dt.month
-        kfs_inter_order3["day"]=1
-
-        kfs_inter_order3["date_time_str"] = kfs_inter_order3["year"].astype('str') + '-' + kfs_inter_order3["month"].astype('str') +\
-        '-' + kfs_inter_order3["day"].astype('str')
-
-        kfs_inter_order3["Date"]=pd.to_datetime(kfs_inter_order3['date_time_str'], format='%Y-%m-%d')
+            kfs_inter_order3["Date"]=periods_to_dates(kfs_inter_order3["MONTH_YEAR"])
         
-        print("max Date in data_all2 dataset is : ",  data_all2["Date"].max())
+            print("max Date in data_all2 dataset is : ",  max_date)
         
-        #Sorting the data
-        kfs_inter_order3=kfs_inter_order3.sort_values(by=["ITEM_ID","Date"])
+            #Sorting the data
+            kfs_inter_order3=kfs_inter_order3.sort_values(by=["ITEM_ID","Date"])
         
-        #         Filtering for data till next 12 months
-        kfs_inter_order4=kfs_inter_order3[kfs_inter_order3["Date"]<=data_all2["Date"].max()]
-        print("kfs_inter_order4 : " ,kfs_inter_order4.tail(1))
+            #         Filtering for data till next 12 months
+            kfs_inter_order4=kfs_inter_order3[kfs_inter_order3["Date"]<=max_date]
+            print("kfs_inter_order4 : " ,kfs_inter_order4.tail(1))
         
-        kfs_inter_order4["RUN_TIME_STAMP"]=run_time_stamp
+            kfs_inter_order4["RUN_TIME_STAMP"]=run_time_stamp
 
-        kfs_inter_order4.drop(columns={"year","month","day","date_time_str","Date"},inplace=True)        
+            kfs_inter_order4.drop(columns={"Date"},inplace=True)        
 
-        kfs_inter_order4=kfs_inter_order4[["RUN_TIME_STAMP","MONTH_YEAR","ITEM_ID","FUTURE_ORDERS"]]
-        print("Shape of final dataset to be inserted in PROCESSED_FUTURE_ORDER_RELATED is : ", kfs_inter_order4.shape)
-        print("kfs_inter_order4 : " ,kfs_inter_order4.head(1))
+            kfs_inter_order4=kfs_inter_order4[["RUN_TIME_STAMP","MONTH_YEAR","ITEM_ID","FUTURE_ORDERS"]]
+            print("Shape of final dataset to be inserted in PROCESSED_FUTURE_ORDER_RELATED is : ", kfs_inter_order4.shape)
+            print("kfs_inter_order4 : " ,kfs_inter_order4.head(1))
         
               
-        # Appending this monthly orders data to the intermediate table in snowflake
-        #Static table name entered
+            # Appending this monthly orders data to the intermediate table in snowflake
+            #Static table name entered
 
-        # Create table - PROCESSED_FUTURE_ORDER_RELATED in snowflake which will contain history & current month aggregated data
-        # For deleting records from snowflake table
-        cur.execute('TRUNCATE TABLE PROCESSED_FUTURE_ORDER_RELATED')
-        cur, conn = connect_to_db()
+            # Create table - PROCESSED_FUTURE_ORDER_RELATED in snowflake which will contain history & current month aggregated data
+            # For deleting records from snowflake table
+            cur.execute('TRUNCATE TABLE PROCESSED_FUTURE_ORDER_RELATED')
+            cur, conn = connect_to_db()
         
-        try:
-            write_pandas(conn, kfs_inter_order4, 'PROCESSED_FUTURE_ORDER_RELATED')
-        except Exception as e:
-            print(f'Error while writing data to table PROCESSED_FUTURE_ORDER_RELATED : {e}')
-                 
+            try:
+                write_pandas(conn, kfs_inter_order4, 'PROCESSED_FUTURE_ORDER_RELATED')
+            except Exception as e:
+                print(f'Error while writing data to table PROCESSED_FUTURE_ORDER_RELATED : {e}')
+
         print("Exiting... add_monthly_data()")
         
     except:
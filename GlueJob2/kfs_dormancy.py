@@ -0,0 +1,382 @@
+# Zero demand (dormancy) detection per item
+#
+# Python Version: 3.8.12
+#
+# Description : Keep, for each item, its demand of the latest months
+#               (windowed monthly sums, integer month codes, see
+#               kfs_period_codec) and its last month with data / with a
+#               non zero demand, save it as Parquet next to the history
+#               snapshot, update it from a month's delta and list the
+#               items without demand in the last n months, without going
+#               through the full history again
+#
+# Coding Steps :
+#               1. Build the per item state from the history once
+#               2. Apply the delta (e.g. the incremental month) to the
+#                  state : replace its months, set or add its cells
+#               3. List the dormant items from the state alone
+#               4. Save the state with the watermark and change marker of
+#                  its table, reload it only while the marker is unchanged
+#
+# The window keeps the last dormancy_state_months months of the state,
+# the months before it only count in SEEN_BEFORE / NONZERO_BEFORE. The
+# demand is non negative (negative orders are treated before being
+# written), so for a window reaching before the state's, "sum of the
+# demand in the window is 0" is the same as "last non zero month is
+# before the window".
+
+
+# 1. Import built-in packages and user defined functions
+
+from time import time
+import numpy as np
+from numpy import asarray, int64
+from pandas import DataFrame, Index
+
+import processed_configuration as con
+from kfs_history_cache import read_snapshot, write_snapshot, get_change_marker
+
+
+# No month (item never seen / never with demand)
+NO_MONTH = 0
+
+STATE_COLUMNS = ["LAST_SEEN","LAST_NONZERO","SEEN_BEFORE","NONZERO_BEFORE"]
+
+UPDATE_MODES = ('replace', 'set', 'add')
+
+
+# 2. Building the state
+
+def _monthly(items, codes, values):
+    """Demand per (ITEM_ID, MONTH_IDX) of a set of rows, blanks as 0."""
+    monthly = DataFrame({
+                         "ITEM_ID":asarray(items, dtype=object),
+                         "MONTH_IDX":asarray(codes, dtype=int64),
+                         "VALUE":asarray(values, dtype=float)
+                        })
+    monthly["VALUE"] = monthly["VALUE"].fillna(0)
+    return monthly.groupby(["ITEM_ID","MONTH_IDX"])["VALUE"].sum().reset_index()
+
+
+def _window_months(state):
+    """Month codes of the window columns of the state, in order."""
+    return [month for month in state.columns if not isinstance(month, str)]
+
+
+def _last_month(mask, months):
+    """Last month of each row where mask is True, NO_MONTH if none."""
+    if mask.shape[1] == 0:
+        return np.full(mask.shape[0], NO_MONTH, dtype=int64)
+    return np.where(mask, asarray(months, dtype=int64), NO_MONTH).max(axis=1)
+
+
+def _empty_state():
+    """State without any item nor window month."""
+    return DataFrame(columns=STATE_COLUMNS, index=Index([], name="ITEM_ID"),
+                     dtype=int64)
+
+
+def build_dormancy_state(items, codes, values):
+    """Per item dormancy state of a set of (item, month, demand) rows.
+
+    Parameters
+    ----------
+    items : series or array
+        ITEM_ID of each row.
+    codes : series or array
+        Month index of each row.
+    values : series or array
+        Demand of each row (blanks count as 0).
+
+    Returns
+    -------
+    dataframe
+        One row per ITEM_ID (index) with the LAST_SEEN and LAST_NONZERO
+        month codes (NO_MONTH if none), the same before the window
+        (SEEN_BEFORE, NONZERO_BEFORE) and one column per month code of
+        the window with the item's demand (NaN if no data that month).
+
+    """
+    return update_dormancy_state(_empty_state(), items, codes, values, mode='add')
+
+
+# 3. Updating the state with a delta
+
+def update_dormancy_state(state, items, codes, values, mode='replace'):
+    """State with the delta's rows applied.
+
+    Parameters
+    ----------
+    state : dataframe
+        Dormancy state, as returned by build_dormancy_state(). It isn't
+        modified.
+    items : series or array
+        ITEM_ID of each row of the delta.
+    codes : series or array
+        Month index of each row of the delta.
+    values : series or array
+        Demand of each row of the delta.
+    mode : string, optional
+        'replace' : the months of the delta are replaced by the delta's
+                    rows, for all the items (a month written again).
+        'set'     : only the (item, month) cells of the delta are
+                    replaced (rows updated or inserted).
+        'add'     : the delta's rows are added to the cells (new rows of
+                    a month that already has rows of the same items).
+
+    Returns
+    -------
+    dataframe
+        Updated dormancy state.
+
+    How it works
+    ------------
+        1. Move the window forward to the delta's latest month, the
+        months leaving the window go to SEEN_BEFORE / NONZERO_BEFORE.
+        2. Add the items of the delta which aren't in the state yet.
+        3. Months of the delta before the window only move
+        SEEN_BEFORE / NONZERO_BEFORE forward, so replacing them isn't
+        exact (the state is built again when its table changes).
+        4. Apply the delta's cells of the window months, as per mode,
+        and derive LAST_SEEN / LAST_NONZERO from the window. Items
+        without any month left are removed.
+
+    """
+    if mode not in UPDATE_MODES:
+        raise ValueError(f"Update mode must be one of {UPDATE_MODES}, got {mode!r}")
+
+    monthly = _monthly(items, codes, values)
+    if monthly.shape[0] == 0:
+        return state.copy()
+
+    # 1. Window of the updated state
+    months = _window_months(state)
+    end = max(months[-1] if months else NO_MONTH, int(monthly["MONTH_IDX"].max()))
+    start = end - con.dormancy_state_months + 1
+
+    all_items = state.index.union(Index(monthly["ITEM_ID"].unique()))
+    all_items.name = "ITEM_ID"
+    state = state.reindex(all_items)
+
+    seen_before = np.array(state["SEEN_BEFORE"].fillna(NO_MONTH), dtype=int64)
+    nonzero_before = np.array(state["NONZERO_BEFORE"].fillna(NO_MONTH), dtype=int64)
+
+    leaving = [month for month in months if month < start]
+    if leaving:
+        demand = state[leaving].to_numpy(dtype=float)
+        seen = ~np.isnan(demand)
+        seen_before = np.maximum(seen_before, _last_month(seen, leaving))
+        nonzero_before = np.maximum(nonzero_before,
+                                    _last_month(seen & (demand != 0), leaving))
+
+    window = list(range(start, end + 1))
+    demand = np.array(state.reindex(columns=window), dtype=float)
+
+    # 3. Months of the delta before the window
+    before = monthly[monthly["MONTH_IDX"] < start]
+    if before.shape[0] > 0:
+        rows = all_items.get_indexer(before["ITEM_ID"])
+        np.maximum.at(seen_before, rows, before["MONTH_IDX"].to_numpy())
+        nonzero = before[before["VALUE"] != 0]
+        np.maximum.at(nonzero_before, all_items.get_indexer(nonzero["ITEM_ID"]),
+                      nonzero["MONTH_IDX"].to_numpy())
+
+    # 4. Months of the delta in the window
+    recent = monthly[monthly["MONTH_IDX"] >= start]
+    rows = all_items.get_indexer(recent["ITEM_ID"])
+    cols = recent["MONTH_IDX"].to_numpy() - start
+    if mode == 'replace':
+        demand[:, np.unique(cols)] = np.nan
+    if mode == 'add':
+        demand[rows, cols] = np.nan_to_num(demand[rows, cols]) + recent["VALUE"].to_numpy()
+    else:
+        demand[rows, cols] = recent["VALUE"].to_numpy()
+
+    seen = ~np.isnan(demand)
+    updated = DataFrame({
+                         "LAST_SEEN":np.maximum(seen_before, _last_month(seen, window)),
+                         "LAST_NONZERO":np.maximum(nonzero_before,
+                                                   _last_month(seen & (demand != 0), window)),
+                         "SEEN_BEFORE":seen_before,
+                         "NONZERO_BEFORE":nonzero_before
+                        }, index=all_items)
+    updated = updated.join(DataFrame(demand, index=all_items, columns=window))
+
+    # Items left without any row by a replaced month
+    return updated[updated["LAST_SEEN"].to_numpy() != NO_MONTH]
+
+
+def drop_items(state, items):
+    """State without the given items (e.g. deleted from the table)."""
+    return state.drop(index=list(items), errors='ignore')
+
+
+# 4. Listing the dormant items
+
+def window_sums(state, months, as_of=None):
+    """Demand of each item in the months after as_of - months.
+
+    Parameters
+    ----------
+    state : dataframe
+        Dormancy state.
+    months : int
+        Number of months of the window, e.g. 24 for the past 2 years.
+    as_of : int, optional
+        Month index the window ends at, the latest month of the state if
+        None. Months after as_of count in the window as well.
+
+    Returns
+    -------
+    series
+        Demand per ITEM_ID (0 for the items without data in the window).
+
+    """
+    if as_of is None:
+        as_of = state["LAST_SEEN"].max()
+
+    cut = as_of - months
+    window = _window_months(state)
+    if window and (cut + 1 < window[0]) and (state["SEEN_BEFORE"].max() > cut):
+        raise ValueError(f"Window of {months} months ending at {as_of} starts "
+                         f"before the state's window ({window[0]})")
+
+    return state[[month for month in window if month > cut]].sum(axis=1)
+
+
+def dormant_items(state, months, as_of=None):
+    """Items with data but no demand in the months after as_of - months.
+
+    Parameters
+    ----------
+    state : dataframe
+        Dormancy state.
+    months : int
+        Number of months of the window, e.g. 24 for the past 2 years.
+    as_of : int, optional
+        Month index the window ends at, the latest month of the state if
+        None. Months after as_of count in the window as well.
+
+    Returns
+    -------
+    list
+        ITEM_IDs with at least one month in the window and no demand in
+        the window.
+
+    """
+    if state.shape[0] == 0:
+        return []
+    if as_of is None:
+        as_of = state["LAST_SEEN"].max()
+
+    cut = as_of - months
+    window = _window_months(state)
+    if window and (cut + 1 >= window[0]):
+        no_demand = window_sums(state, months, as_of) == 0
+    else:
+        # Window reaching before the state's, see the note at the top
+        no_demand = state["LAST_NONZERO"] <= cut
+
+    dormant = (state["LAST_SEEN"] > cut) & no_demand
+    return state.index[dormant.to_numpy()].tolist()
+
+
+# 5. Saving and loading the state
+
+def save_dormancy_state(conn, table, state, run_time_stamp, cache_path=None, **info):
+    """Save the state as Parquet with the watermark and change marker of
+    its table, once the table is written.
+
+    Parameters
+    ----------
+    conn : object
+        Snowflake DB connection object.
+    table : string
+        Table the state is built from.
+    state : dataframe
+        Dormancy state of all the rows of the table.
+    run_time_stamp : string
+        RUN_TIME_STAMP watermark (the latest run that wrote the table).
+    cache_path : string, optional
+        S3 (s3://...) or local folder, defaults to the path in the
+        config file.
+    info : dict
+        Other entries of the watermark file.
+
+    """
+    if not con.history_cache_enabled:
+        return
+    if cache_path is None:
+        cache_path = con.dormancy_state_path
+
+    meta = {
+            'table':table,
+            'run_time_stamp':run_time_stamp,
+            'months':con.dormancy_state_months,
+            'marker':get_change_marker(conn, table, run_time_stamp)
+           }
+    meta.update(info)
+
+    frame = state.copy()
+    frame.columns = [str(column) for column in frame.columns]
+    try:
+        write_snapshot(cache_path, frame.reset_index(), meta,
+                       con.dormancy_state_data_file, con.dormancy_state_meta_file)
+        print("Dormancy state saved : ", state.shape, "watermark", run_time_stamp)
+    except Exception as e:
+        # The state is only an optimization, the run goes on without it
+        print(f'Error while writing the dormancy state to {cache_path} : {e}')
+
+
+def load_dormancy_state(conn, table, cache_path=None):
+    """Load the saved state if its table hasn't changed since.
+
+    Parameters
+    ----------
+    conn : object
+        Snowflake DB connection object.
+    table : string
+        Table the state is built from.
+    cache_path : string, optional
+        S3 (s3://...) or local folder, defaults to the path in the
+        config file.
+
+    Returns
+    -------
+    tuple
+        Dormancy state and its watermark dict, (None, None) if there's
+        no state or it has to be built again.
+
+    How it works
+    ------------
+        1. Read the state and its watermark.
+        2. Discard it if the window length has changed or the change
+        marker of the rows at or below the watermark has : rows were
+        deleted or updated by another job since it was saved.
+        3. Else, the rows newer than the watermark are the delta to
+        apply to it.
+
+    """
+    if not con.history_cache_enabled:
+        return None, None
+    if cache_path is None:
+        cache_path = con.dormancy_state_path
+
+    start = time()
+    frame, meta = read_snapshot(cache_path, con.dormancy_state_data_file,
+                                con.dormancy_state_meta_file)
+    if frame is None:
+        return None, None
+
+    if (meta.get("table") != table) or (meta.get("months") != con.dormancy_state_months) or \
+       (get_change_marker(conn, table, meta["run_time_stamp"]) != meta["marker"]):
+        print("Dormancy state of", meta.get("run_time_stamp"), "out of date, building it again")
+        return None, None
+
+    state = frame.set_index("ITEM_ID")
+    state.columns = [column if column in STATE_COLUMNS else int(column) \
+                     for column in state.columns]
+    state[STATE_COLUMNS] = state[STATE_COLUMNS].astype(int64)
+    print("Dormancy state loaded : ", state.shape, "watermark", meta["run_time_stamp"],
+          "in", round(time() - start, 2), "sec")
+    return state, meta
@@ -0,0 +1,141 @@
+# Benchmark of the future orders reduction kernel
+#
+# Python Version: 3.8.12
+#
+# Description : Check that future_order_totals() gives the same totals as
+#               the former two-stage Order/Request date aggregation of
+#               kfs_add_monthly_futureorder_data and time both, on
+#               synthetic order lines
+#
+# Coding Steps :
+#               1. Generate random order lines (blank dates and negative
+#                  quantities included)
+#               2. Run the former aggregation for each order month
+#               3. Run the kernel once for all the order months
+#               4. Compare the totals and print the timings
+#
+# Usage : python kfs_future_order_benchmark.py [n_lines] [n_items]
+
+
+# 1. Import built-in packages and user defined functions
+
+import sys
+from time import time
+import numpy as np
+import pandas as pd
+
+from kfs_future_order_kernel import future_order_totals
+from kfs_period_codec import dates_to_codes
+
+
+# 2. Synthetic order lines
+
+def make_order_lines(n_lines, n_items, n_order_months=2, seed=0):
+    """Random order lines over n_order_months consecutive order months."""
+    rng = np.random.default_rng(seed)
+
+    order_month = np.datetime64('2022-03') + rng.integers(0, n_order_months, n_lines)
+    order_dates = order_month.astype('datetime64[D]') + rng.integers(0, 28, n_lines)
+    request_dates = order_dates + rng.integers(-20, 400, n_lines)
+
+    lines = pd.DataFrame({
+                          "3rd_Item_Number":np.char.add("SKU", rng.integers(0, n_items, n_lines).astype(str)),
+                          "Request_Date":request_dates.astype('datetime64[ns]'),
+                          "Order_Date":order_dates.astype('datetime64[ns]'),
+                          "Quantity_Ordered":rng.integers(-5, 50, n_lines).astype(float)
+                         })
+    lines.loc[rng.random(n_lines) < 0.001, "Request_Date"] = pd.NaT
+    return lines
+
+
+# 3. Former aggregation (one incremental month)
+
+def former_future_orders(lines):
+    """Future orders per item and request month, the former way."""
+    lines = lines[["3rd_Item_Number","Request_Date",'Order_Date',"Quantity_Ordered"]]\
+    .sort_values(by=["3rd_Item_Number","Request_Date",'Order_Date'])
+
+    lines4 = lines.groupby(["3rd_Item_Number","Request_Date",'Order_Date'])["Quantity_Ordered"].sum().reset_index()
+    lines4["Rq_Date"] = lines4["Request_Date"].to_numpy().astype('datetime64[M]')
+    lines4["Or_Date"] = lines4["Order_Date"].to_numpy().astype('datetime64[M]')
+
+    agg_data = lines4.groupby(["3rd_Item_Number","Or_Date","Rq_Date"])["Quantity_Ordered"].sum().reset_index()
+    agg_data["ind"] = np.where((agg_data["Or_Date"] < agg_data["Rq_Date"]), 1, 0)
+
+    agg_data2 = agg_data.copy()
+    agg_data2["or_month"] = agg_data2["Or_Date"].dt.month
+    agg_data2["or_year"] = agg_data2["Or_Date"].dt.year
+    agg_data2["rq_month"] = agg_data2["Rq_Date"].dt.month
+    agg_data2["rq_year"] = agg_data2["Rq_Date"].dt.year
+    agg_data2["same_month_ind"] = np.where(((agg_data2["or_month"] == agg_data2["rq_month"]) \
+                                            & (agg_data2["or_year"] == agg_data2["rq_year"])), 0, 1)
+    agg_data2["final_ind"] = np.where(((agg_data2["ind"] == 1) & (agg_data2["same_month_ind"] == 1)), 1, 0)
+
+    agg_data3 = agg_data2[agg_data2["final_ind"] == 1]
+    agg_data3 = agg_data3.rename(columns={"Quantity_Ordered":"Future_Orders"})
+
+    data_req = agg_data3.groupby(["3rd_Item_Number","Rq_Date"])["Future_Orders"].sum().reset_index()
+    data_req = data_req.sort_values(by=["3rd_Item_Number","Rq_Date"])
+    data_req["Future_Orders"] = data_req["Future_Orders"].fillna(0)
+    data_req["Date"] = data_req["Rq_Date"].to_numpy().astype('datetime64[M]')
+
+    return data_req.groupby(["3rd_Item_Number","Date"])["Future_Orders"].sum().reset_index()
+
+
+# 4. Comparison and timings
+
+def run_benchmark(n_lines=1000000, n_items=20000):
+    """Compare the kernel with the former aggregation and time both.
+
+    Returns
+    -------
+    dict
+        Number of lines and cells, seconds taken by each path and
+        whether the totals are equal.
+
+    """
+    lines = make_order_lines(n_lines, n_items)
+    order_codes = dates_to_codes(lines["Order_Date"])
+
+    start = time()
+    former = []
+    for code in np.unique(order_codes):
+        month_totals = former_future_orders(lines[order_codes == code])
+        month_totals.insert(0, "OR_MONTH_IDX", code)
+        former.append(month_totals)
+    former = pd.concat(former, ignore_index=True)
+    former_seconds = time() - start
+
+    start = time()
+    kernel = future_order_totals(
+                                 lines["3rd_Item_Number"],
+                                 lines["Order_Date"],
+                                 lines["Request_Date"],
+                                 lines["Quantity_Ordered"]
+                                )
+    kernel_seconds = time() - start
+
+    # Same cells and totals, the request month compared as a month code
+    former["MONTH_IDX"] = dates_to_codes(former["Date"])
+    columns = ["OR_MONTH_IDX","3rd_Item_Number","MONTH_IDX","Future_Orders"]
+    former = former[columns].sort_values(columns[:3]).reset_index(drop=True)
+    kernel = kernel[columns].sort_values(columns[:3]).reset_index(drop=True)
+
+    equal = former[columns[:3]].astype(str).equals(kernel[columns[:3]].astype(str)) and \
+            np.allclose(former["Future_Orders"].to_numpy(), kernel["Future_Orders"].to_numpy())
+
+    return {
+            'lines':n_lines,
+            'cells':kernel.shape[0],
+            'former_seconds':round(former_seconds, 3),
+            'kernel_seconds':round(kernel_seconds, 3),
+            'equal':equal
+           }
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    result = run_benchmark(*args)
+    print(result)
+    if not result['equal']:
+        sys.exit("The kernel totals differ from the former aggregation")
@@ -0,0 +1,102 @@
+# Future orders reduction kernel
+#
+# Python Version: 3.8.12
+#
+# Description : Reduce the raw order lines to future order totals per
+#               order month, item and request month in a single pass on
+#               integer month codes (year*12 + month, see
+#               kfs_period_codec)
+#
+# Coding Steps :
+#               1. Month code of the order and request dates
+#               2. Keep the lines requested for a later month than the
+#                  order month
+#               3. Sum the quantities per (order month, item, request
+#                  month) key with one bincount
+
+
+# 1. Import built-in packages and user defined functions
+
+from numpy import asarray, isnat, unique, bincount, nan_to_num, int64
+from pandas import DataFrame, factorize
+
+from kfs_period_codec import dates_to_codes
+
+
+# 2. Reduction of the order lines
+
+def future_order_totals(items, order_dates, request_dates, quantities):
+    """Future orders per order month, item and request month.
+
+    Same totals as grouping the lines by item, request and order date,
+    truncating the dates to the month, keeping the request months later
+    than the order month and summing again by item and request month,
+    without any intermediate dataframe.
+
+    Parameters
+    ----------
+    items : series or array
+        Item id of each order line.
+    order_dates : series or array
+        Order date of each line (datetime64).
+    request_dates : series or array
+        Request date of each line (datetime64).
+    quantities : series or array
+        Quantity ordered of each line (blanks count as 0).
+
+    Returns
+    -------
+    dataframe
+        OR_MONTH_IDX, 3rd_Item_Number, MONTH_IDX (request month) and
+        Future_Orders, sorted by these keys. Negative totals are kept.
+
+    How it works
+    ------------
+        1. Convert both dates to month codes, drop the lines with a
+        blank date or a request month not after the order month.
+        2. Factorize (sorted) the order months, items and request months
+        and combine them into one integer key.
+        3. Sum the quantities of each unique key with bincount and
+        decode the keys.
+
+    """
+    order_dates = asarray(order_dates, dtype='datetime64[ns]')
+    request_dates = asarray(request_dates, dtype='datetime64[ns]')
+
+    valid = ~(isnat(order_dates) | isnat(request_dates))
+    or_codes = dates_to_codes(order_dates[valid])
+    rq_codes = dates_to_codes(request_dates[valid])
+
+    future = rq_codes > or_codes
+    or_codes, rq_codes = or_codes[future], rq_codes[future]
+    line_items = asarray(items, dtype=object)[valid][future]
+    line_qty = nan_to_num(asarray(quantities, dtype=float)[valid][future])
+
+    or_pos, or_uniques = factorize(or_codes, sort=True)
+    item_pos, item_uniques = factorize(line_items, sort=True)
+    rq_pos, rq_uniques = factorize(rq_codes, sort=True)
+
+    n_items, n_rq = max(len(item_uniques), 1), max(len(rq_uniques), 1)
+    keys = (or_pos.astype(int64)*n_items + item_pos)*n_rq + rq_pos
+
+    cells, inverse = unique(keys, return_inverse=True)
+    totals = bincount(inverse.ravel(), weights=line_qty, minlength=cells.shape[0])
+
+    return DataFrame({
+                      "OR_MONTH_IDX":asarray(or_uniques, dtype=int64)[cells // (n_items*n_rq)],
+                      "3rd_Item_Number":asarray(item_uniques, dtype=object)[(cells // n_rq) % n_items],
+                      "MONTH_IDX":asarray(rq_uniques, dtype=int64)[cells % n_rq],
+                      "Future_Orders":totals
+                     })
+
+
+def future_order_totals_of_lines(lines):
+    """future_order_totals() of an order lines dataframe (3rd_Item_Number,
+    Order_Date, Request_Date and Quantity_Ordered columns). Items are
+    independent, so it can run on shards of the items."""
+    return future_order_totals( \
+                               lines["3rd_Item_Number"],
+                               lines["Order_Date"],
+                               lines["Request_Date"],
+                               lines["Quantity_Ordered"]
+                              )
@@ -0,0 +1,123 @@
+# Item x month grid on integer month codes
+#
+# Python Version: 3.8.12
+#
+# Description : Build the item x month cross product of the future orders
+#               horizon and join the observed values to it, with NumPy
+#               operations on the integer month index (year*12 + month,
+#               see kfs_period_codec) instead of one date range per item
+#
+# Coding Steps :
+#               1. Repeat each item over its own range of month codes
+#               2. Encode (item, month) pairs as a single integer key
+#               3. Outer join the observed values to the grid on that key
+
+
+# 1. Import built-in packages and user defined functions
+
+from numpy import asarray, broadcast_to, concatenate, repeat, arange, cumsum, \
+                  clip, unique, searchsorted, bincount, int64
+from pandas import DataFrame, factorize
+
+
+# 2. Building the grid
+
+def build_month_grid(items, start_codes, end_codes):
+    """Every month between the start and end month (both included) of
+    each item.
+
+    Parameters
+    ----------
+    items : series or list
+        Item ids, unique.
+    start_codes : int or array
+        First month index of each item (or of all the items).
+    end_codes : int or array
+        Last month index of each item (or of all the items).
+
+    Returns
+    -------
+    dataframe
+        ITEM_ID and MONTH_IDX, one row per item and month.
+
+    How it works
+    ------------
+        1. Number of months of each item (end - start + 1, 0 if
+        the end is before the start).
+        2. Repeat each item that many times.
+        3. Month of each row = start of its item + position of the
+        row inside the item's block.
+
+    """
+    items = asarray(items, dtype=object)
+    starts = broadcast_to(asarray(start_codes, dtype=int64), items.shape)
+    ends = broadcast_to(asarray(end_codes, dtype=int64), items.shape)
+
+    lengths = clip(ends - starts + 1, 0, None)
+    offsets = cumsum(lengths) - lengths
+    rows = repeat(arange(len(items)), lengths)
+    months = starts[rows] + arange(rows.shape[0]) - offsets[rows]
+
+    return DataFrame({"ITEM_ID":items[rows], "MONTH_IDX":months})
+
+
+# 3. Joining the observed values
+
+def fill_month_grid(grid, observed, item_column, code_column, value_column):
+    """Outer join of the observed values to the grid.
+
+    Parameters
+    ----------
+    grid : dataframe
+        ITEM_ID and MONTH_IDX, as returned by build_month_grid().
+    observed : dataframe
+        Observed values, one row per item and month.
+    item_column : string
+        Item id column of the observed data.
+    code_column : string
+        Month index column of the observed data.
+    value_column : string
+        Value column of the observed data.
+
+    Returns
+    -------
+    dataframe
+        ITEM_ID, MONTH_IDX and value_column, for the grid cells and the
+        observed cells outside the grid; 0 where nothing was observed.
+        Sorted by item (order of first appearance) and month.
+
+    How it works
+    ------------
+        1. Factorize the items of both sides together.
+        2. Key of each row = item code * span of months + month offset.
+        3. The sorted unique keys are the rows of the result, the
+        observed values are added at their key's position.
+
+    """
+    grid_items = asarray(grid["ITEM_ID"], dtype=object)
+    obs_items = asarray(observed[item_column], dtype=object)
+
+    item_codes, item_uniques = factorize(concatenate([grid_items, obs_items]))
+    if (item_codes < 0).any():
+        raise ValueError("Blank item id in the month grid")
+
+    months = concatenate([asarray(grid["MONTH_IDX"], dtype=int64),
+                          asarray(observed[code_column], dtype=int64)])
+    if months.shape[0] == 0:
+        return DataFrame({"ITEM_ID":[], "MONTH_IDX":[], value_column:[]})
+
+    base = months.min()
+    span = months.max() - base + 1
+    keys = item_codes.astype(int64)*span + (months - base)
+
+    cells = unique(keys)
+    obs_positions = searchsorted(cells, keys[grid_items.shape[0]:])
+    values = bincount(obs_positions,
+                      weights=asarray(observed[value_column], dtype=float),
+                      minlength=cells.shape[0])
+
+    return DataFrame({
+                      "ITEM_ID":asarray(item_uniques, dtype=object)[cells // span],
+                      "MONTH_IDX":cells % span + base,
+                      value_column:values
+                     })
@@ -0,0 +1,113 @@
+# Typed readers of the order files
+#
+# Python Version: 3.8.12
+#
+# Description : Read only the required columns of the order files with
+#               declared types, parse the date columns once and normalise
+#               the identifier columns as categoricals
+#
+# Coding Steps :
+#               1. Read the csv / xlsx with usecols, dtype and parse_dates
+#               2. Strip and upper case the identifiers once per unique
+#                  value and keep them as categoricals
+
+
+# 1. Import built-in packages and user defined functions
+
+from io import BytesIO
+from numpy import unique, append, where
+from pandas import read_csv, read_excel, Categorical
+
+import processed_configuration as con
+
+
+# 2. Reading the order files
+
+def _declared_types(columns):
+    """Declared dtypes and date columns among the required columns."""
+    dtypes = {col: dtype for col, dtype in con.order_column_dtypes.items() \
+              if col in columns}
+    date_cols = [col for col in con.order_date_columns if col in columns]
+    return dtypes, date_cols
+
+
+def read_order_csv(body, columns):
+    """Read the required columns of an order csv with declared types.
+
+    Parameters
+    ----------
+    body : bytes
+        Content of the csv file.
+    columns : list
+        Required columns.
+
+    Returns
+    -------
+    dataframe
+        Orders data with only the required columns.
+
+    """
+    dtypes, date_cols = _declared_types(columns)
+    return read_csv(BytesIO(body), usecols=columns, dtype=dtypes,
+                    parse_dates=date_cols)
+
+
+def read_order_workbook(body, columns):
+    """Read the required columns of an order workbook with declared types.
+
+    Parameters
+    ----------
+    body : bytes
+        Content of the xlsx file.
+    columns : list
+        Required columns.
+
+    Returns
+    -------
+    dataframe
+        Orders data with only the required columns.
+
+    """
+    dtypes, date_cols = _declared_types(columns)
+    return read_excel(BytesIO(body), usecols=columns, dtype=dtypes,
+                      parse_dates=date_cols, engine='openpyxl')
+
+
+# 3. Normalising the identifier columns
+
+def normalise_identifiers(frame, columns):
+    """Strip and upper case the identifier columns, as categoricals.
+
+    Same values as astype(str).str.strip().str.upper() (blanks become
+    'NAN'), but the string operations run once per unique value and the
+    columns are stored as integer codes. Group by these columns with
+    observed=True.
+
+    Parameters
+    ----------
+    frame : dataframe
+        Orders data.
+    columns : list
+        Identifier columns.
+
+    Returns
+    -------
+    dataframe
+        The same dataframe with the columns normalised.
+
+    """
+    for col in columns:
+        values = frame[col].astype('category')
+        codes = values.cat.codes.to_numpy()
+
+        # Normalising each unique value once, blanks as 'NAN'
+        labels = values.cat.categories.astype(str).str.strip().str.upper().to_numpy(dtype=object)
+        if (codes < 0).any():
+            labels = append(labels, 'NAN')
+            codes = where(codes < 0, len(labels) - 1, codes)
+
+        # Merging the values which are equal once normalised
+        categories, inverse = unique(labels, return_inverse=True)
+        frame[col] = Categorical.from_codes(inverse[codes], categories=categories)
+
+    return frame
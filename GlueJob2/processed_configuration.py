@@ -15,6 +15,18 @@ aws_service1 = 's3'
 bucket_name = 'kfs.dev.db'
 folder_name = 'Delta/'
 
+# Selective fetch of the future orders files from the S3 folder
+future_order_file_pattern = 'future_orders'
+future_order_file_extensions = ['.csv', '.xlsx']
+# Only files modified in the last n days are fetched (None to fetch all)
+future_order_file_max_age_days = None
+# Maximum number of parallel downloads
+fetch_max_workers = 8
+
+# Parquet copy of the order workbooks, keyed by S3 ETag and size
+ingest_cache_enabled = True
+ingest_cache_path = 's3://kfs.dev.db/Ingest_Cache/'
+
 # BU and entity
 BU = 'KFS'
 entity = 'Orders'
@@ -28,6 +40,14 @@ req_columns= ["Order Number","Or Ty","Sold To","Sold To Name","Description 1","R
               "Invoice Date","Cancel Date","Promised Delivery","Branch/Plant","Description Line 2","Quantity Ordered",
               "Quantity Shipped","Quantity Backordered","Quantity Canceled","Sls Cd3"]
 
+# Declared types of the required columns, identifiers read as text
+order_column_dtypes = {"Order Number":str, "Or Ty":str, "Sold To":str, "Ship To":str,
+                       "2nd Item Number":str, "3rd Item Number":str, "Parent Number":str,
+                       "Quantity Ordered":"float64", "Quantity Shipped":"float64",
+                       "Quantity Backordered":"float64", "Quantity Canceled":"float64"}
+# Date columns, parsed at read time
+order_date_columns = ["Request Date", "Order Date"]
+
               
 # To connect ot Snowflake
 # Service Name
@@ -50,6 +70,10 @@ SCHEMA = "SCHEMA"
 #Period for which future orders data is required
 plus_month_period=12
 
+# Items without future orders in this many months are removed from
+# the intermediate table
+dormancy_months = 36
+
 # Reading SKU file
 input_sku='Input_SKU'
 sku_file_name='SKU_List_new.csv'
@@ -58,12 +82,42 @@ sku_file_name='SKU_List_new.csv'
 prsd_KFS_orders_table = "KFS_PROCESSED_ORDERS_TARGET"
 sel_run_tmp_kfs_order = "select RUN_TIME_STAMP from " + prsd_KFS_orders_table
 
+# Watermarked snapshot of KFS_PROCESSED_ORDERS_TARGET (S3 or local folder)
+history_cache_enabled = True
+history_cache_path = 's3://kfs.dev.db/History_Cache/KFS_PROCESSED_ORDERS_TARGET'
+history_cache_data_file = 'snapshot.parquet'
+history_cache_meta_file = 'watermark.json'
+
+# Dormancy state of PROCESSED_INTER_FUTURE_ORDER_RELATED (see
+# kfs_dormancy), saved as Parquet next to the history snapshot, with the
+# future orders of the last dormancy_state_months months (at least
+# dormancy_months + the horizon, plus_month_period)
+dormancy_state_path = 's3://kfs.dev.db/History_Cache/PROCESSED_INTER_FUTURE_ORDER_RELATED'
+dormancy_state_data_file = 'dormancy_state.parquet'
+dormancy_state_meta_file = 'dormancy_state.json'
+dormancy_state_months = 48
+
+# Bulk writes to Snowflake (rows per uploaded chunk, compression and
+# parallel uploads of the staged chunks, see snowflake_bulk_writer)
+bulk_write_chunk_size = 200000
+bulk_write_compression = 'gzip'
+bulk_write_parallel = 8
+
 # PROCESSED_FUTURE_ORDER_RELATED queries
 #Intermediate Table
 prsd_inter_FUTURE_ORDER_table = "PROCESSED_INTER_FUTURE_ORDER_RELATED"
 del_frm_inter_order="delete from PROCESSED_INTER_FUTURE_ORDER_RELATED"
 
 #Final Table
+prsd_FUTURE_ORDER_table = "PROCESSED_FUTURE_ORDER_RELATED"
+
+# 'incremental' : aggregate in Snowflake and merge only the changed cells
+# 'rebuild'     : read back the intermediate table, truncate and reload
+future_order_refresh_mode = 'incremental'
+
+# Incremental months whose item x month grids are built concurrently
+future_order_month_workers = 4
+
 # prsd_FUTURE_ORDER_table = "PROCESSED_FUTURE_ORDER_RELATED"
 # del_FUTURE_ORDER_query = "delete from " + prsd_FUTURE_ORDER_table
 # insert_FUTURE_ORDER_qry = "INSERT INTO PROCESSED_FUTURE_ORDER_RELATED (\
@@ -83,3 +137,17 @@ insert_error_log = "INSERT INTO KFS_ERROR_LOG ( \
                                           EXCEPTION_MESSAGE, \
                                           MESSAGE \
                                          ) VALUES (%s,%s,%s,%s,%s,%s)" 
+
+# Per item transforms run on hash partitioned shards of the ITEM_IDs
+# in a process pool (1 shard = serial run, None workers = one per CPU).
+# Serial by default : the per item transforms take well under a second
+# on the usual volumes, less than forking the pool and pickling the
+# frames. Data with fewer rows than sku_shard_min_rows is run serially
+# even with more than one shard
+sku_shards = 1
+sku_shard_workers = None
+sku_shard_min_rows = 1000000
+
+# Query results fetched as dataframes from the connector's Arrow result
+# batches (False = rows fetched as tuples with fetchall)
+arrow_fetch_enabled = True
@@ -6,6 +6,7 @@ from kfs_get_latest_run_id import get_latest_run_id
 from kfs_aws_time_series_format import outlier_treatment
 from kfs_concat_for_related import concat_for_rel
 from kfs_creating_item_metadata import creating_item_metadata
+from kfs_stage_executor import run_analytical_stages
 from error_logging import create_and_insert_error
 import processed_configuration as con #Added
 import awswrangler as wr #Added
@@ -65,21 +66,26 @@ def main():
         sku_list 
         #Added on 3Feb23 - Priyanka - ends        
         
-        data,min_date,max_date,pf_tos_list=outlier_treatment(run_time_stamp, cur, conn, sku_list) #Added sku_list
-        all_related = concat_for_rel(\
-                                     min_date, 
-                                     max_date, 
-                                     run_time_stamp,
-                                     cur,
-                                     conn,
-                                     sku_list
-                                    )
-        creating_item_metadata(\
-                               pf_tos_list, 
-                               run_time_stamp,
-                               cur,
-                               conn
-                              )
+        if con.analytical_stage_mode == 'concurrent':
+            # Reads, stages and uploads overlapped, see kfs_stage_executor
+            data,min_date,max_date,pf_tos_list,all_related = \
+                run_analytical_stages(run_time_stamp, cur, conn, sku_list)
+        else:
+            data,min_date,max_date,pf_tos_list=outlier_treatment(run_time_stamp, cur, conn, sku_list) #Added sku_list
+            all_related = concat_for_rel(\
+                                         min_date, 
+                                         max_date, 
+                                         run_time_stamp,
+                                         cur,
+                                         conn,
+                                         sku_list
+                                        )
+            creating_item_metadata(\
+                                   pf_tos_list, 
+                                   run_time_stamp,
+                                   cur,
+                                   conn
+                                  )
                               
         #Added on 05Feb23 - Ranjan - Successful
         sns = boto3.client("sns", region_name=region_name)
@@ -1,71 +1,89 @@
 # Code modified on 3Feb23
 
 
-from numpy import quantile, where
-from pandas import to_datetime, read_sql
-from calendar import month_abbr
-from dateutil.relativedelta import relativedelta
+from numpy import trunc, where
+from pandas import Timestamp
 
 import processed_configuration as con
 from error_logging import create_and_insert_error
-import awswrangler as wr
+from kfs_history_cache import load_processed_orders
+from kfs_period_codec import encode_periods, codes_to_dates, add_months
+from sku_sharding import run_sharded
+from snowflake_sku_query import read_sku_rows
+from artifact_io import write_artifact
 
-def outlier_treatment(run_time_stamp, cur, conn, sku_list):
-    try:
-        print("Inside... outlier_treatment()")
-        data2 = read_sql(con.prsd_target_query, conn)
+
+def cap_outliers(data):
+    """Cap and floor the UNITS of each item with 3 months or more at its
+    1st and 99th percentile (items are independent).
+
+    The months count and both percentiles of every item come from one
+    groupby, the bounds are then applied to all the rows at once.
+    """
+    grouped = data.groupby('ITEM_ID')['UNITS']
+    bounds = grouped.quantile([0.01, 0.99]).unstack()
+    bounds.columns = ['Q1', 'Q3']
+    bounds['N_MONTHS'] = grouped.size()
+    print("original data")
+    print(bounds.shape[0])
+    
+    # Only the items with 3 months or more are treated
+    print("after 3 months condition")        
+    print((bounds['N_MONTHS'] >= 3).sum())
+    
+    # Define Boundries for outlier as 1st and 99th percentile
+    # (truncated to integers, as int() does)
+    bounds['LOWER'] = trunc(bounds['Q1'].clip(lower=0)).astype('int64')
+    bounds['UPPER'] = trunc(bounds['Q3']).astype('int64')
+    
+    rows = bounds.index.get_indexer(data['ITEM_ID'])
+    treated = bounds['N_MONTHS'].to_numpy()[rows] >= 3
+    lower_bound = bounds['LOWER'].to_numpy()[rows]
+    upper_bound = bounds['UPPER'].to_numpy()[rows]
+    
+    # Capping and flooring the orders within the boundaries
+    data['UNITS'] = where(treated & (data['UNITS'] > upper_bound),
+                          upper_bound,
+                          data['UNITS'])
+    
+    data['UNITS'] = where(treated & (data['UNITS'] < lower_bound),
+                          lower_bound,
+                          data['UNITS'])
+
+    return data
+
+
+def read_target_orders(conn, sku_list):
+    """Processed orders of the SKUs to be forecasted (MONTH_YEAR, ITEM_ID
+    and UNITS)."""
+    if con.sku_filter_pushdown:
+        # Only the needed columns of the SKUs to be forecasted
+        data = read_sku_rows(conn, con.prsd_KFS_orders_table,
+                             con.target_query_columns, sku_list)
+    else:
+        data2, hist_stats = load_processed_orders(conn)
         print("Shape of data read from snowflake : ", data2.shape)
         
         #Added on 3Feb23 - Priyanka - starts
         data2["ITEM_ID"]=data2["ITEM_ID"].astype(str) #Added 9Feb23
         data=data2[data2["ITEM_ID"].isin(sku_list)] 
-        print("Shape of dataset post Item_id filter : ", data.shape)
-        print("Unique ITEM_ID's : ", data["ITEM_ID"].nunique())
         #Added on 3Feb23 - Priyanka - ends
         
         data = data.drop(['RUN_TIME_STAMP'],axis=1)
-        prod_fam_list = data['ITEM_ID'].unique()
-        print("original data")
-        print(len(prod_fam_list))
-        pf_final = []
-        
-        for pf in prod_fam_list:
-            order_pf = data[data['ITEM_ID']==pf].copy()
-            if ((order_pf.shape[0]>=3)):
-                pf_final.append(pf) 
-        print("after 3 months condition")        
-        print(len(pf_final))
-        
-        for pf in pf_final:
-            
-           # Calculate 1st and 99th percentile
-            q1 = quantile(data[data['ITEM_ID'] == pf]['UNITS'], 
-                          0.01)
-            q3 = quantile(data[data['ITEM_ID'] == pf]['UNITS'],
-                          0.99)
+    return data
 
-            # Define Boundries for outlier as 1st and 99th percentile
-            lower_bound = int(max(q1, 0))
-            upper_bound = int(q3)
-            
-            # Capping and flooring the orders within the boundaries
-            data['UNITS'] = where(
-                            (
-                                (data['ITEM_ID']==pf) &
-                                (data['UNITS'] > upper_bound)
-                            ),
-                            upper_bound,
-                            data['UNITS']
-                            )
 
-            data['UNITS'] = where(
-                            (
-                                (data['ITEM_ID']==pf) &
-                                (data['UNITS'] < lower_bound)
-                            ),
-                            lower_bound,
-                            data['UNITS']
-                            )               
+def outlier_treatment(run_time_stamp, cur, conn, sku_list, data=None,
+                      upload=None, n_shards=None):
+    try:
+        print("Inside... outlier_treatment()")
+        if data is None:
+            data = read_target_orders(conn, sku_list)
+        print("Shape of dataset post Item_id filter : ", data.shape)
+        print("Unique ITEM_ID's : ", data["ITEM_ID"].nunique())
+        # Capping the orders of each item, the items being sharded
+        # over a process pool
+        data = run_sharded(cap_outliers, data, 'ITEM_ID', n_shards=n_shards)
         
         order = data.copy()
         print("Length of Order data : ", order.shape)
@@ -76,15 +94,8 @@ def outlier_treatment(run_time_stamp, cur, conn, sku_list):
                     'UNITS':'target_value',
                     'ITEM_ID':'item_id',
                     },inplace=True)
-        order['YEAR'] = order['timestamp'].str[-4:]
-        order['YEAR'] = order['YEAR'].astype(int)
-        order['MONTH'] = order[\
-                                     'timestamp'
-                                    ].str[:3].apply(lambda x: list(\
-                                                                   month_abbr
-                                                                   ).index(x))
-        order['DAY'] = 1
-        order['timestamp'] = to_datetime(order[['YEAR', 'MONTH', 'DAY']])
+        order['MONTH_IDX'] = encode_periods(order['timestamp'])
+        order['timestamp'] = codes_to_dates(order['MONTH_IDX'])
         
         min_date = min(order['timestamp'])
         print("min_date :", min_date)
@@ -94,8 +105,8 @@ def outlier_treatment(run_time_stamp, cur, conn, sku_list):
         
         print("maximum order timestamp : ", max(order['timestamp']))
         
-        max_date = max(order['timestamp']) + \
-        relativedelta(months = total_months)
+        max_date = Timestamp(codes_to_dates( \
+                   [add_months(order['MONTH_IDX'].max(), total_months)])[0])
         print("max_date :", max_date)
         
         target_data1 = order.sort_values(\
@@ -108,11 +119,8 @@ def outlier_treatment(run_time_stamp, cur, conn, sku_list):
         pf_tos_list = list(target_data3.item_id.unique())
         print("Length of pf_tos_list : ", len(pf_tos_list))
         
-        dict_pf_tos_str_dt = {}        
-        
-        for item in pf_tos_list:
-            temp = target_data3[target_data3['item_id'] == item]
-            dict_pf_tos_str_dt[item] = min(temp['timestamp'])
+        # First month of each item, in one groupby
+        dict_pf_tos_str_dt = target_data3.groupby('item_id')['timestamp'].min().to_dict()
             
         target_data3['timestamp'] = target_data3['timestamp'].astype(str)
         
@@ -127,7 +135,11 @@ def outlier_treatment(run_time_stamp, cur, conn, sku_list):
         print("analytical_path : ", analytical_path)
         
         
-        wr.s3.to_csv(target_data3, analytical_path, index=False)
+        # Typed artifact (Parquet) read by GlueJob4 and GlueJob6
+        if upload is None:
+            write_artifact(target_data3, analytical_path)
+        else:
+            upload(write_artifact, target_data3, analytical_path)
         print("Exiting... outlier_treatment()")        
         return data,min_date,max_date,pf_tos_list
 
@@ -1,38 +1,44 @@
 # Code modified on 3Feb23
 
-from pandas import read_sql, to_datetime
-
-from calendar import month_abbr
 import processed_configuration as con
 from error_logging import create_and_insert_error
-import awswrangler as wr
+from kfs_period_codec import periods_to_dates
+from snowflake_sku_query import read_sku_rows
+from snowflake_fetch import fetch_frame
+from artifact_io import write_artifact
 
-def concat_for_rel(min_date, max_date, run_time_stamp, cur, conn, sku_list):
-    try:
-        print("Inside... concat_for_rel()")
-        
-        # Get the data from the DB
-        future_order2 = read_sql(con.prsd_related_query, conn)
+def read_future_orders(conn, sku_list):
+    """Aggregated future orders of the SKUs to be forecasted (MONTH_YEAR,
+    ITEM_ID and FUTURE_ORDERS)."""
+    if con.sku_filter_pushdown:
+        # Only the needed columns of the SKUs to be forecasted
+        future_order = read_sku_rows(conn, con.prsd_related_table,
+                                     con.related_query_columns, sku_list)
+    else:
+        future_order2 = fetch_frame(conn, con.prsd_related_query)
         print("Shape of data read from snowflake : ", future_order2.shape)
         
         #Added on 3Feb23 - Priyanka - starts
         future_order2["ITEM_ID"]=future_order2["ITEM_ID"].astype(str) #Added 9Feb23
         future_order=future_order2[future_order2["ITEM_ID"].isin(sku_list)] 
+        #Added on 3Feb23 - Priyanka - ends        
+        
+        future_order = future_order.drop(['RUN_TIME_STAMP'], axis=1)
+    return future_order
+
+
+def concat_for_rel(min_date, max_date, run_time_stamp, cur, conn, sku_list,
+                   future_order=None, upload=None):
+    try:
+        print("Inside... concat_for_rel()")
+        
+        # Get the data from the DB
+        if future_order is None:
+            future_order = read_future_orders(conn, sku_list)
         print("Shape of dataset post Item_id filter : ", future_order.shape)
         print("Unique ITEM_ID's : ", future_order["ITEM_ID"].nunique())
-        #Added on 3Feb23 - Priyanka - ends        
         
-        future_order = future_order.drop(['RUN_TIME_STAMP'], axis=1)        
-        future_order['YEAR'] = future_order['MONTH_YEAR'].str[-4:]
-        future_order['YEAR'] = future_order['YEAR'].astype(int)
-        future_order['MONTH'] = future_order['MONTH_YEAR'].str[:3]
-        future_order['MONTH'] = future_order['MONTH'].apply(lambda x: list(month_abbr).index(x))
-        future_order['DAY'] = 1
-        future_order['timestamp'] = to_datetime(future_order[[\
-                                                              'YEAR', 
-                                                              'MONTH', 
-                                                              'DAY'
-                                                              ]])
+        future_order['timestamp'] = periods_to_dates(future_order['MONTH_YEAR'])
         print("Shape of future_order dataset : ", future_order.shape)
         
         # Slice data for the required time range
@@ -42,12 +48,7 @@ def concat_for_rel(min_date, max_date, run_time_stamp, cur, conn, sku_list):
                                     ].copy()
         print("Shape of future_order dataset post applying min_date & max_date filter: ", future_order.shape)
         
-        future_order = future_order.drop([\
-                                          'MONTH_YEAR',
-                                          'YEAR',
-                                          'MONTH',
-                                          'DAY'
-                                          ], axis=1)
+        future_order = future_order.drop(['MONTH_YEAR'], axis=1)
         print("Shape of future_order dataset post dropping columns: ", future_order.shape)
         
         future_order['timestamp'] = future_order['timestamp'].astype(str)
@@ -65,7 +66,11 @@ def concat_for_rel(min_date, max_date, run_time_stamp, cur, conn, sku_list):
                           con.rel_file_name
         print("analytical_path : ", analytical_path)
         
-        wr.s3.to_csv(df_rel_final1, analytical_path, index=False)
+        # Typed artifact (Parquet) read by GlueJob4
+        if upload is None:
+            write_artifact(df_rel_final1, analytical_path)
+        else:
+            upload(write_artifact, df_rel_final1, analytical_path)
         print("Exiting... concat_for_rel()")
         return df_rel_final1
     
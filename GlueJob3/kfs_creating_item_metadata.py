@@ -1,18 +1,41 @@
-from pandas import read_sql
 import processed_configuration as con
 from error_logging import create_and_insert_error
+from snowflake_sku_query import read_sku_rows
+from snowflake_fetch import fetch_frame
 import awswrangler as wr
 
 import pandas as pd
 import numpy as np
 
+# 1. Read and write the item meta data
+
+def read_item_metadata(conn, item_list):
+    """Item meta data of the given items (all the items if the SKU
+    filter isn't pushed down to Snowflake)."""
+    if con.sku_filter_pushdown:
+        # Only the metadata of the given items, the others are
+        # dropped by the merge with pf_tos_list anyway
+        df_item_meta = read_sku_rows(conn, con.itm_mtd_table,
+                                     con.itm_mtd_query_columns, item_list)
+    else:
+        df_item_meta = fetch_frame(conn, con.sel_from_itm_mtd)
+    return df_item_meta
+
+
+def write_item_metadata(df_item_meta, analytical_path):
+    """Write the item meta data CSV file."""
+    df_item_meta.to_csv(analytical_path, index=False)
+
+
 # 2. Create item meta data and export it to S3
 
-def creating_item_metadata(pf_tos_list, run_time_stamp, cur, conn):
+def creating_item_metadata(pf_tos_list, run_time_stamp, cur, conn,
+                           df_item_meta=None, upload=None):
     try:
         print("Inside... creating_item_metadata()")
         
-        df_item_meta = read_sql(con.sel_from_itm_mtd, conn)
+        if df_item_meta is None:
+            df_item_meta = read_item_metadata(conn, pf_tos_list)
         print("Shape of data read from snowflake : ", df_item_meta.shape)
         
         df_item_meta["ITEM_ID"]=df_item_meta["ITEM_ID"].astype(str) #Added 9Feb23
@@ -69,7 +92,11 @@ def creating_item_metadata(pf_tos_list, run_time_stamp, cur, conn):
                          con.itm_mtd_file_name  
         print("analytical_path : ", analytical_path)
         
-        df_final3.to_csv(analytical_path, index=False)
+        # CSV, the file is imported as is by Amazon Forecast
+        if upload is None:
+            write_item_metadata(df_final3, analytical_path)
+        else:
+            upload(write_item_metadata, df_final3, analytical_path)
         print("Exiting... creating_item_metadata()")
     
     except:
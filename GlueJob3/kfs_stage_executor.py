@@ -0,0 +1,144 @@
+# Concurrent execution of the analytical stages
+#
+# Python Version: 3.8.12
+#
+# Description : Start the Snowflake reads of the three analytical stages
+#               (target, related and item meta data) together, run each
+#               stage as soon as its inputs are ready and upload the
+#               outputs to S3 in the background, then print the timeline
+#
+# Coding Steps :
+#               1. Submit the three reads to a thread pool
+#               2. Run the outlier treatment once the target data is read
+#               3. Run the related and item meta data stages once their
+#                  data and the outlier treatment outputs are ready
+#               4. Wait for the S3 uploads and print the stage timeline
+
+
+# 1. Import built-in packages and user defined functions
+
+from time import time
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+import processed_configuration as con
+from kfs_aws_time_series_format import read_target_orders, outlier_treatment
+from kfs_concat_for_related import read_future_orders, concat_for_rel
+from kfs_creating_item_metadata import read_item_metadata, creating_item_metadata
+
+
+# 2. Timeline of the stages
+
+def print_timeline(timeline):
+    """Print the start, end and duration (seconds from the start of the
+    run) of each stage."""
+    print("Stage timeline (seconds) :")
+    for stage, stage_start, stage_end in sorted(timeline, key=lambda x: x[1]):
+        print(f"    {stage:<36} {stage_start:8.2f} -> {stage_end:8.2f}   ({stage_end - stage_start:.2f})")
+
+
+# 3. Running the stages
+
+def run_analytical_stages(run_time_stamp, cur, conn, sku_list):
+    """Run outlier_treatment, concat_for_rel and creating_item_metadata
+    with concurrent reads and background uploads.
+
+    Parameters
+    ----------
+    run_time_stamp : string
+        Timestamp based run id. for the job.
+    cur : object
+        Snowflake DB cursor object.
+    conn : object
+        Snowflake DB connection object (shared by the reads, each one
+        uses its own cursor).
+    sku_list : list
+        SKUs to be forecasted.
+
+    Returns
+    -------
+    tuple
+        Capped orders data, min date, max date, pf_tos_list and the
+        related data, as the serial stages return them.
+
+    How it works
+    ------------
+        1. Start the three reads in a thread pool. The item meta data is
+        read for sku_list, which contains pf_tos_list.
+        2. Run the outlier treatment as soon as the target data is read
+        (serially on its items, a process pool can't be forked safely
+        while the other threads run).
+        3. Run the related and item meta data stages in the pool, each
+        as soon as its data is read.
+        4. The S3 uploads run in the pool as well, overlapping the
+        stages still computing. Wait for all of them and print the
+        timeline.
+
+    """
+    print("Inside... run_analytical_stages()")
+    start = time()
+    timeline = []
+    timeline_lock = Lock()
+
+    def timed(stage, func, *args, **kwargs):
+        stage_start = time() - start
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with timeline_lock:
+                timeline.append((stage, stage_start, time() - start))
+
+    try:
+        with ThreadPoolExecutor(max_workers=con.analytical_stage_workers) as pool:
+            uploads = []
+
+            def upload(write, frame, path):
+                uploads.append(pool.submit(timed, "upload " + path.rsplit("/", 1)[-1],
+                                           write, frame, path))
+
+            # 1. All the reads at once
+            target_read = pool.submit(timed, "read target", read_target_orders,
+                                      conn, sku_list)
+            related_read = pool.submit(timed, "read related", read_future_orders,
+                                       conn, sku_list)
+            metadata_read = pool.submit(timed, "read item metadata", read_item_metadata,
+                                        conn, sku_list)
+
+            # 2. Target stage, its outputs feed the two others
+            data, min_date, max_date, pf_tos_list = timed( \
+                                                          "outlier_treatment",
+                                                          outlier_treatment,
+                                                          run_time_stamp, cur, conn, sku_list,
+                                                          data=target_read.result(),
+                                                          upload=upload,
+                                                          n_shards=1
+                                                         )
+
+            # 3. Related and item meta data stages, as soon as their data is read
+            related = pool.submit(lambda: timed( \
+                                                "concat_for_rel",
+                                                concat_for_rel,
+                                                min_date, max_date, run_time_stamp,
+                                                cur, conn, sku_list,
+                                                future_order=related_read.result(),
+                                                upload=upload
+                                               ))
+            metadata = pool.submit(lambda: timed( \
+                                                 "creating_item_metadata",
+                                                 creating_item_metadata,
+                                                 pf_tos_list, run_time_stamp, cur, conn,
+                                                 df_item_meta=metadata_read.result(),
+                                                 upload=upload
+                                                ))
+            all_related = related.result()
+            metadata.result()
+
+            # 4. Uploads
+            for uploaded in uploads:
+                uploaded.result()
+    finally:
+        print_timeline(timeline)
+        print("Analytical stages run in", round(time() - start, 2), "sec")
+
+    print("Exiting... run_analytical_stages()")
+    return data, min_date, max_date, pf_tos_list, all_related
@@ -53,12 +53,31 @@ prsd_KFS_orders_table = "KFS_PROCESSED_ORDERS_TARGET"
 prsd_target_query = "select * from " + prsd_KFS_orders_table
 sel_run_tmp_kfs_order = "select RUN_TIME_STAMP from " + prsd_KFS_orders_table
 
+# Watermarked snapshot of KFS_PROCESSED_ORDERS_TARGET (S3 or local folder)
+history_cache_enabled = True
+history_cache_path = 's3://kfs.dev.db/History_Cache/KFS_PROCESSED_ORDERS_TARGET'
+history_cache_data_file = 'snapshot.parquet'
+history_cache_meta_file = 'watermark.json'
+
 #KFS related data query
 prsd_related_query="select * from PROCESSED_FUTURE_ORDER_RELATED;"
 
 # ITEM_METADATA queries
 sel_from_itm_mtd = "select * from KFS_ITEM_METADATA;"
 
+# SKU filtered reads : only the needed columns, for the SKUs to be
+# forecasted (SKU list joined server side through a temporary table)
+sku_filter_pushdown = True
+prsd_related_table = "PROCESSED_FUTURE_ORDER_RELATED"
+itm_mtd_table = "KFS_ITEM_METADATA"
+target_query_columns = ["MONTH_YEAR", "ITEM_ID", "UNITS"]
+related_query_columns = ["MONTH_YEAR", "ITEM_ID", "FUTURE_ORDERS"]
+itm_mtd_query_columns = ["ITEM_ID", "DEMAND_PROFILE", "PRODUCT_LINE", "BUSINESS_TEAM"]
+sku_query_dtypes = {"ITEM_ID": str, "MONTH_YEAR": str}
+
+# Bulk writes to Snowflake (rows per uploaded chunk)
+bulk_write_chunk_size = 200000
+
 
 # ERROR_LOG queries
 insert_error_log = "INSERT INTO KFS_ERROR_LOG ( \
@@ -76,3 +95,30 @@ list_of_cat = [\
                'BUSINESS_TEAM'\
 
                ]
+
+# Per item transforms run on hash partitioned shards of the ITEM_IDs
+# in a process pool (1 shard = serial run, None workers = one per CPU).
+# Serial by default : the per item transforms take well under a second
+# on the usual volumes, less than forking the pool and pickling the
+# frames. Data with fewer rows than sku_shard_min_rows is run serially
+# even with more than one shard
+sku_shards = 1
+sku_shard_workers = None
+sku_shard_min_rows = 1000000
+
+# Analytical stages : 'concurrent' reads the target, related and item meta
+# data together, runs each stage when its data is ready and uploads the
+# outputs in the background (thread pool, analytical_stage_workers
+# threads), 'serial' runs the stages one after the other
+analytical_stage_mode = 'concurrent'
+analytical_stage_workers = 6
+
+# Query results fetched as dataframes from the connector's Arrow result
+# batches (False = rows fetched as tuples with fetchall)
+arrow_fetch_enabled = True
+
+# Format of the target and related datasets exchanged between the jobs
+# in Analytical_outputs : 'parquet' (item_id dictionary encoded, timestamp
+# as a date, see artifact_io) or 'csv'. The item meta data and the
+# datasets imported by Amazon Forecast stay CSV
+artifact_format = 'parquet'
@@ -0,0 +1,132 @@
+# Hash partitioned (sharded) execution of per item transforms
+#
+# Python Version: 3.8.12
+#
+# Description : Split the data into N shards by a stable hash of the
+#               ITEM_ID and run a per item transform on the shards in a
+#               process pool, then put the results back together in the
+#               same order as a serial run
+#
+# Coding Steps :
+#               1. Shard of each item : crc32 of the item id modulo N
+#               2. Run the transform on each shard in a ProcessPoolExecutor
+#               3. Concatenate the results once and restore the serial order
+
+
+# 1. Import built-in packages and user defined functions
+
+from time import time
+from zlib import crc32
+from concurrent.futures import ProcessPoolExecutor
+from numpy import asarray, int64
+from pandas import concat, factorize
+
+import processed_configuration as con
+
+
+# 2. Sharding the items
+
+def shard_ids(items, n_shards):
+    """Shard (0 to n_shards - 1) of each item.
+
+    The hash is crc32 of the item id text, so an item always lands in
+    the same shard, whatever the process or the run.
+
+    Parameters
+    ----------
+    items : series or array
+        Item ids.
+    n_shards : int
+        Number of shards.
+
+    Returns
+    -------
+    array
+        Shard of each item.
+
+    """
+    labels, uniques = factorize(asarray(items, dtype=object))
+    shards = asarray([crc32(str(item).encode()) % n_shards for item in uniques],
+                     dtype=int64)
+    return shards[labels]
+
+
+def split_into_shards(frame, item_column, n_shards):
+    """Rows of each shard, in their original order (empty shards dropped)."""
+    shards = shard_ids(frame[item_column], n_shards)
+    return [frame[shards == shard] for shard in range(n_shards) \
+            if (shards == shard).any()]
+
+
+# 3. Running a per item transform on the shards
+
+def run_sharded(func, frame, item_column, sort_by=None, n_shards=None,
+                max_workers=None, **kwargs):
+    """Run func on each shard of the data in a process pool.
+
+    Parameters
+    ----------
+    func : function
+        Module level function taking a dataframe (plus kwargs) and
+        returning a dataframe, computed independently for each item.
+    frame : dataframe
+        Input data.
+    item_column : string
+        Item id column the data is sharded on.
+    sort_by : list, optional
+        Columns the serial result is sorted by. If None, func must keep
+        the rows and their index, the rows are put back in the input order.
+    n_shards : int, optional
+        Number of shards, the config value if None. 1 runs func serially,
+        as do data with fewer rows than con.sku_shard_min_rows.
+    max_workers : int, optional
+        Number of processes, the config value if None (one per CPU when
+        that is None too).
+
+    Returns
+    -------
+    dataframe
+        Same result as func(frame, **kwargs).
+
+    How it works
+    ------------
+        1. Split the rows by shard of their item.
+        2. Run func on every shard in a ProcessPoolExecutor.
+        3. Concatenate the results once and sort them back to the
+        order of the serial run.
+
+    """
+    if n_shards is None:
+        n_shards = con.sku_shards
+    if max_workers is None:
+        max_workers = con.sku_shard_workers
+
+    if (n_shards <= 1) or (frame.shape[0] < max(con.sku_shard_min_rows, 1)):
+        return func(frame, **kwargs)
+
+    print("Inside... run_sharded()", func.__name__)
+    start = time()
+
+    # Row positions as index, to put the rows back in the input order
+    if sort_by is None:
+        index = frame.index
+        frame = frame.reset_index(drop=True)
+
+    shards = split_into_shards(frame, item_column, n_shards)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(func, shard, **kwargs) for shard in shards]
+        results = [future.result() for future in futures]
+
+    result = concat(results)
+    if sort_by is None:
+        if result.shape[0] != len(index):
+            raise ValueError(func.__name__ + " doesn't keep the rows, sort_by is required")
+        result = result.sort_index(kind='mergesort')
+        result.index = index
+    else:
+        result = result.sort_values(by=sort_by, kind='mergesort').reset_index(drop=True)
+
+    print(func.__name__, "run on", len(shards), "shard(s) in",
+          round(time() - start, 2), "sec")
+    print("Exiting... run_sharded()")
+    return result
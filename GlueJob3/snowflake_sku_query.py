@@ -0,0 +1,107 @@
+# SKU filtered reads of the Snowflake tables
+#
+# Python Version: 3.8.12
+#
+# Description : Read only the needed columns of a table for the SKUs to be
+#               forecasted, the SKU list being loaded into a temporary key
+#               table and joined server side, instead of reading the whole
+#               table and filtering it in pandas
+#
+# Coding Steps :
+#               1. Load the unique SKUs into a temporary key table
+#               2. Select the projected columns joined with the key table
+#               3. Cast the columns to their declared types
+
+
+# 1. Import built-in packages and user defined functions
+
+from time import time
+from uuid import uuid4
+from pandas import DataFrame
+from snowflake.connector.pandas_tools import write_pandas
+
+import processed_configuration as con
+from snowflake_fetch import fetch_frame
+
+
+# 2. Query of the projected columns for the keys
+
+def sku_query(table, columns, key_table, key_column="ITEM_ID"):
+    """Select of the columns of the table joined with the key table."""
+    select_cols = ", ".join("t." + col for col in columns)
+    return "select " + select_cols + " from " + table + " t join " + \
+           key_table + " k on t." + key_column + " = k." + key_column
+
+
+# 3. Reading the rows of the SKUs
+
+def read_sku_rows(conn, table, columns, sku_list, key_column="ITEM_ID",
+                  dtypes=None):
+    """Read the given columns of the table for the SKUs in sku_list.
+
+    Parameters
+    ----------
+    conn : object
+        Snowflake DB connection object.
+    table : string
+        Table name.
+    columns : list
+        Columns to be read.
+    sku_list : list
+        SKUs (key_column values) to be read, no limit on their number.
+    key_column : string, optional
+        SKU column of the table.
+    dtypes : dict, optional
+        Types of the columns, the config types if None.
+
+    Returns
+    -------
+    dataframe
+        Rows of the SKUs with the given columns, same as reading the
+        whole table and filtering it with isin(sku_list).
+
+    How it works
+    ------------
+        1. Load the unique SKUs into a temporary table with write_pandas.
+        2. Read the projected columns of the table joined with it.
+        3. Drop the key table and cast the columns.
+
+    """
+    print("Inside... read_sku_rows()", table)
+    start = time()
+
+    if dtypes is None:
+        dtypes = con.sku_query_dtypes
+
+    keys = list(dict.fromkeys(str(sku) for sku in sku_list))
+    key_table = table + "_SKUS_" + uuid4().hex[:8].upper()
+
+    cur = conn.cursor()
+    try:
+        cur.execute("create temporary table " + key_table + " (" + \
+                    key_column + " varchar)")
+
+        success, _, _, _ = write_pandas( \
+                                        conn,
+                                        DataFrame({key_column:keys}),
+                                        key_table,
+                                        chunk_size=con.bulk_write_chunk_size
+                                       )
+        if not success:
+            raise Exception("Upload of " + str(len(keys)) + \
+                            " SKUs to " + key_table + " failed")
+
+        data = fetch_frame(conn, sku_query(table, columns, key_table, key_column))
+    finally:
+        try:
+            cur.execute("drop table if exists " + key_table)
+        finally:
+            cur.close()
+
+    data = data.astype({col: dtype for col, dtype in dtypes.items() \
+                        if col in data.columns})
+
+    print("Read", data.shape[0], "row(s) of", len(keys), "SKU(s) from", table,
+          "in", round(time() - start, 2), "sec")
+    print("Exiting... read_sku_rows()")
+    return data
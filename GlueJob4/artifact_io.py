@@ -0,0 +1,145 @@
+# Typed artifacts exchanged between the Glue jobs
+#
+# Python Version: 3.8.12
+#
+# Description : Write and read the Analytical_outputs datasets (target and
+#               related data) as Parquet, with item_id as a dictionary
+#               encoded column and timestamp as a date, instead of CSV
+#               files that every job re-parses. CSV is kept where Amazon
+#               Forecast imports the file itself
+#
+# Coding Steps :
+#               1. Path of the artifact : the .csv file name of the config
+#                  with a .parquet extension in Parquet format
+#               2. Write : item_id stripped and dictionary encoded,
+#                  timestamp cast to date32
+#               3. Read : same columns as reading the CSV (item_id and
+#                  timestamp 'YYYY-MM-DD' as strings)
+
+
+# 1. Import built-in packages and user defined functions
+
+import os
+from io import BytesIO
+from boto3 import client
+from pandas import to_datetime
+from pyarrow import Table, date32, string
+import pyarrow.parquet as pq
+import awswrangler as wr
+
+import processed_configuration as con
+
+
+# 2. Path of the artifacts
+
+def _split_s3_path(path):
+    """Split an s3://bucket/key path into bucket and key."""
+    bucket, _, key = path[len("s3://"):].partition("/")
+    return bucket, key
+
+
+def artifact_path(csv_path):
+    """Path of the artifact of a .csv file path of the config, in the
+    configured artifact format."""
+    if con.artifact_format == 'parquet':
+        return os.path.splitext(csv_path)[0] + ".parquet"
+    return csv_path
+
+
+# 3. Writing an artifact
+
+def write_artifact(frame, csv_path):
+    """Write the dataset in the configured artifact format.
+
+    Parameters
+    ----------
+    frame : dataframe
+        Dataset with item_id and timestamp ('YYYY-MM-DD') columns.
+    csv_path : string
+        S3 (s3://...) or local .csv path of the dataset, the .parquet
+        path is derived from it.
+
+    Returns
+    -------
+    string
+        Path written.
+
+    How it works
+    ------------
+        1. CSV format : written as before with wr.s3.to_csv.
+        2. Parquet format : item_id stripped and stored as a
+        dictionary column, timestamp stored as date32, written with
+        pyarrow and uploaded in one put_object.
+
+    """
+    path = artifact_path(csv_path)
+    if con.artifact_format != 'parquet':
+        wr.s3.to_csv(frame, path, index=False)
+        return path
+
+    frame = frame.copy()
+    if "item_id" in frame.columns:
+        frame["item_id"] = frame["item_id"].astype(str).str.strip().astype("category")
+    if "timestamp" in frame.columns:
+        frame["timestamp"] = to_datetime(frame["timestamp"])
+
+    table = Table.from_pandas(frame, preserve_index=False)
+    if "timestamp" in frame.columns:
+        position = table.schema.get_field_index("timestamp")
+        table = table.set_column(position, "timestamp",
+                                 table.column("timestamp").cast(date32()))
+
+    if path.startswith("s3://"):
+        buffer = BytesIO()
+        pq.write_table(table, buffer)
+        bucket, key = _split_s3_path(path)
+        client(con.aws_service1).put_object(Bucket=bucket, Key=key,
+                                            Body=buffer.getvalue())
+    else:
+        pq.write_table(table, path)
+    return path
+
+
+# 4. Reading an artifact
+
+def read_artifact(csv_path, categorical=False):
+    """Read a dataset written by write_artifact.
+
+    Parameters
+    ----------
+    csv_path : string
+        S3 (s3://...) or local .csv path of the dataset.
+    categorical : bool, optional
+        Keep item_id as a categorical column instead of strings.
+
+    Returns
+    -------
+    dataframe
+        Same columns and values as reading the CSV, with item_id
+        stripped, as strings, and timestamp as 'YYYY-MM-DD' strings.
+
+    """
+    path = artifact_path(csv_path)
+    if con.artifact_format != 'parquet':
+        frame = wr.s3.read_csv(path)
+        if "item_id" in frame.columns:
+            frame["item_id"] = frame["item_id"].astype(str).str.strip()
+        return frame
+
+    if path.startswith("s3://"):
+        bucket, key = _split_s3_path(path)
+        body = client(con.aws_service1).get_object(Bucket=bucket, Key=key)['Body']
+        table = pq.read_table(BytesIO(body.read()))
+    else:
+        table = pq.read_table(path)
+
+    # Dates as 'YYYY-MM-DD' text, cast inside Arrow
+    if "timestamp" in table.column_names:
+        position = table.schema.get_field_index("timestamp")
+        table = table.set_column(position, "timestamp",
+                                 table.column("timestamp").cast(string()))
+
+    frame = table.to_pandas()
+    if ("item_id" in frame.columns) and not categorical:
+        frame["item_id"] = frame["item_id"].astype(str)
+    return frame
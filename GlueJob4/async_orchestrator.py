@@ -0,0 +1,184 @@
+# Asyncio orchestration of the forecast algorithms
+#
+# Python Version: 3.8.12
+#
+# Input :
+#        1) Algorithm, project and run time stamp of each algorithm
+#        2) Run time stamp
+#
+# Output : Status of each algorithm
+#
+# Description :  Runs the round pipeline (forecast_process) of every
+#                algorithm as a coroutine of one event loop, in a single
+#                process, instead of one forked process per algorithm.
+#                The blocking boto3 calls and status polling of each
+#                pipeline are offloaded to a thread pool, over one Forecast
+#                and one S3 client shared by all the pipelines (boto3
+#                clients are thread safe), the analytical inputs are read
+#                once and the modules are loaded once
+#
+# Steps :
+#               1. Read the target and related data once
+#               2. Run each algorithm's forecast_process in the thread pool
+#                  (run_in_executor), awaited as one task per algorithm
+#               3. A failed algorithm doesn't stop the others, the status
+#                  of each one is reported at the end
+#               4. On cancellation or timeout, the algorithms stop at the
+#                  start of their next round or while polling a Forecast
+#                  job, within one polling interval (see orchestrator_timeout)
+#
+# List of called programs: start_forecast_process
+
+
+# Loading libraries
+
+import asyncio
+from time import time
+from functools import partial
+from threading import Event
+from concurrent.futures import ThreadPoolExecutor
+from boto3 import Session
+
+import processed_configuration as con
+from start_forecast_process import forecast_process
+from artifact_io import read_artifact
+from error_logging import create_and_insert_error
+from secret_cache import prime_secret_cache
+
+
+# Inputs shared by the algorithms
+
+def read_forecast_inputs():
+    """Target and related data of the Analytical_outputs, read once."""
+    folder = 's3://' + con.bucket_name + '/' + 'GlueScripts4/' + \
+             con.source_folder + '/'
+    aws_skun = read_artifact(folder + con.target_file_name)
+    aws_rel_skus = read_artifact(folder + con.related_file_name)
+    print("Forecast inputs read :", aws_skun.shape, aws_rel_skus.shape)
+    return aws_skun, aws_rel_skus
+
+
+# Pipeline of one algorithm
+
+async def run_algorithm(executor, run_data, inputs, stop, clients):
+    """Run forecast_process for one algorithm in the thread pool.
+
+    Parameters
+    ----------
+    executor : object
+        Thread pool running the blocking calls.
+    run_data : tuple
+        Algorithm short name, project name and run time stamp.
+    inputs : tuple
+        Target and related data.
+    stop : object
+        threading.Event set on cancellation.
+    clients : dict
+        Forecast ('forecast') and S3 ('s3') clients shared by the
+        pipelines.
+
+    Returns
+    -------
+    tuple
+        Algorithm name and None if it succeeded, else the exception.
+
+    """
+    alg = run_data[0]
+    start = time()
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(executor, partial(forecast_process, run_data,
+                                                     inputs=inputs, stop=stop,
+                                                     forecast=clients['forecast'],
+                                                     s3=clients['s3']))
+        print("Algorithm", alg, "completed in", round((time() - start)/60), "min")
+        return alg, None
+    except asyncio.CancelledError:
+        # The thread stops at its next round or status poll
+        stop.set()
+        raise
+    except BaseException as e:
+        # sys.exit() and errors of one algorithm stay with that algorithm
+        print("Algorithm", alg, "failed after", round((time() - start)/60),
+              "min :", repr(e))
+        return alg, e
+
+
+async def orchestrate(alg_lst, run_time_stamp, timeout=None):
+    """Run the pipelines of all the algorithms concurrently.
+
+    Parameters
+    ----------
+    alg_lst : list
+        (algorithm short name, project name, run time stamp) of each
+        algorithm.
+    run_time_stamp : string
+        Current job's run id.
+    timeout : int, optional
+        Seconds after which the algorithms are cancelled, no limit if None.
+
+    Returns
+    -------
+    dict
+        None (success) or the exception of each algorithm.
+
+    How it works
+    ------------
+        1. Load the DB secret and create one Forecast and one S3
+        client for the region, before the threads start. They are
+        passed down to every call of the pipelines.
+        2. Read the inputs once and start one task per algorithm, each
+        running forecast_process in a thread pool sized to alg_lst.
+        3. Gather the statuses, an algorithm failure is returned, not
+        raised, so the others carry on.
+        4. On timeout or cancellation, set the stop event : each
+        pipeline stops at the start of its next round, or within one
+        polling interval when it is waiting for a Forecast job, so the
+        threads end shortly after.
+
+    """
+    print('Inside... orchestrate()', [run_data[0] for run_data in alg_lst])
+    prime_secret_cache()
+    session = Session(region_name=con.region_name)
+    clients = {
+               'forecast':session.client(service_name=con.service_name),
+               's3':session.client(service_name=con.aws_service1)
+              }
+
+    inputs = read_forecast_inputs()
+    stop = Event()
+
+    executor = ThreadPoolExecutor(max_workers=max(len(alg_lst), 1))
+    try:
+        tasks = [asyncio.ensure_future(run_algorithm(executor, run_data, inputs,
+                                                     stop, clients)) \
+                 for run_data in alg_lst]
+        results = await asyncio.wait_for(asyncio.gather(*tasks), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        print("Orchestration cancelled, stopping the algorithms")
+        stop.set()
+        raise
+    finally:
+        executor.shutdown(wait=False)
+
+    status = dict(results)
+    for alg, error in status.items():
+        print("  ", alg, ":", "completed" if error is None else "failed - " + repr(error))
+    print('Exiting... orchestrate()')
+    return status
+
+
+def async_forecasting(alg_lst, run_time_stamp):
+    """Run all the algorithms with the asyncio orchestrator, raise if any
+    of them failed (once all of them have ended)."""
+    try:
+        status = asyncio.run(orchestrate(alg_lst, run_time_stamp,
+                                         con.orchestrator_timeout))
+        failed = [alg for alg, error in status.items() if error is not None]
+        if failed:
+            raise Exception("Algorithm(s) failed : " + ", ".join(failed))
+    except Exception as async_forecasting_exception:
+        print ("Exception occured in the async_forecasting function.\n",
+               str(async_forecasting_exception))
+        create_and_insert_error(run_time_stamp)
+        raise
@@ -34,10 +34,11 @@
 # Loading libraries
 
 from warnings import simplefilter
-from time import sleep
+from concurrent.futures import CancelledError
 # Library for creating session to AWS forecast platfrom
 from boto3 import Session 
 import notebook_utils as util
+from fcst_utils import wait_or_stop
 from error_logging import create_and_insert_error
 simplefilter("ignore")
 
@@ -45,7 +46,8 @@ simplefilter("ignore")
 # Create Forecast
 
 def create_forecast_function(region_name, service_name, run_time_stamp, 
-                             forecast_name, predictor_arn, forecast_types):  
+                             forecast_name, predictor_arn, forecast_types,
+                             forecast=None, stop=None):  
 
     """Creating forecast
     Parameters:
@@ -54,14 +56,19 @@ def create_forecast_function(region_name, service_name, run_time_stamp,
     argument3 (run_time_stamp): current job's run id
     argument4 (forecast_name): Name of the forecast
     argument5 (predictor_arn): AWS resource name (unique identifier)
+    argument6 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
+    argument7 (stop [OPTIONAL]): threading.Event, the status polling stops
+                        (CancelledError) as soon as it is set
     Returns: Nothing
     """
     try:
 
         # Session set up
 
-        session = Session(region_name=region_name)
-        forecast = session.client(service_name=service_name)
+        if forecast is None:
+            session = Session(region_name=region_name)
+            forecast = session.client(service_name=service_name)
     
         # Using forecast api to call create forecast method
         
@@ -79,12 +86,15 @@ def create_forecast_function(region_name, service_name, run_time_stamp,
             status_indicator.update(status)
             if status in ("ACTIVE", "CREATE_FAILED"):
                 break
-            sleep(10)
+            wait_or_stop(stop, 10)
 
         status_indicator.end()
 
         return 0
 
+    except CancelledError:
+        # Cancelled by the orchestrator, not an error of the function
+        raise
     except Exception as forecast_exception:
         print ("Exception caught in the create_forecast_function.\n",
                                        str(forecast_exception))        
@@ -40,10 +40,11 @@
 # Loading libraries
 
 from warnings import simplefilter
-from time import sleep
+from concurrent.futures import CancelledError
 # Library for creating session to AWS forecast platfrom
 from boto3 import Session 
 import notebook_utils as util
+from fcst_utils import wait_or_stop
 from error_logging import create_and_insert_error
 simplefilter("ignore")
 
@@ -62,7 +63,9 @@ def create_predictor_function(
     forecast_frequency,
     algorithm_arn=None,
     number_of_backtest_windows=None,
-    back_test_window_offset=None
+    back_test_window_offset=None,
+    forecast=None,
+    stop=None
 ):
 
     """Creating predictor
@@ -81,13 +84,18 @@ def create_predictor_function(
         (ex, NumberOfBacktestWindows * BackTestWindowOffset) to move backwards
     argument11 (back_test_window_offset[optional]): # Data period for evaluting 
                                                         or testing
+    argument12 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
+    argument13 (stop [OPTIONAL]): threading.Event, the status polling stops
+                        (CancelledError) as soon as it is set
     Returns: Nothing
     """
     try:
         # Session setup
 
-        session = Session(region_name=region_name)
-        forecast = session.client(service_name=service_name)
+        if forecast is None:
+            session = Session(region_name=region_name)
+            forecast = session.client(service_name=service_name)
     
         # Model building using specific algorithm
         if (
@@ -162,7 +170,7 @@ def create_predictor_function(
             status_indicator.update(status)
             if status in ("ACTIVE", "CREATE_FAILED"):
                 break
-            sleep(10)
+            wait_or_stop(stop, 10)
         status_indicator.end()
 
         # Getting Mapes
@@ -170,6 +178,9 @@ def create_predictor_function(
 
         return 0
 
+    except CancelledError:
+        # Cancelled by the orchestrator, not an error of the function
+        raise
     except Exception as predictor_exception:
         print ("Exception caught in the create_predictor_function.\n",
                                        str(predictor_exception))
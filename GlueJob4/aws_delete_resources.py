@@ -54,20 +54,23 @@ simplefilter("ignore")
 
 
 def delete_forecast_export_job(region_name, service_name, run_time_stamp, 
-                               forecast_export_job_arn):
+                               forecast_export_job_arn, forecast=None):
     """Deletion of forecast export job
     Parameters:
     argument1 (region_name): Amazon region name (service availability)
     argument2 (service_name): Type of amazon service (forecast)
     argument3 (run_time_stamp): current job's run id        
     argument4 (forecast_export_job_arn): AWS resource name (unique identifier)
+    argument5 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
     Returns: Nothing
     """
     try:
         # Session setup
 
-        session = Session(region_name=region_name)
-        forecast = session.client(service_name=service_name)
+        if forecast is None:
+            session = Session(region_name=region_name)
+            forecast = session.client(service_name=service_name)
     
         # Using forecast api to call delete forecast export method
         
@@ -87,20 +90,24 @@ def delete_forecast_export_job(region_name, service_name, run_time_stamp,
 # Delete forecast
 
 
-def delete_forecast(region_name, service_name, run_time_stamp, forecast_arn):
+def delete_forecast(region_name, service_name, run_time_stamp, forecast_arn,
+                    forecast=None):
     """Deletion of forecast
     Parameters:
     argument1 (region_name): Amazon region name (service availability)
     argument2 (service_name): Type of amazon service (forecast)
     argument3 (run_time_stamp): current job's run id                
     argument4 (forecast_arn): AWS resource name (unique identifier)
+    argument5 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
     Returns: Nothing
     """
     try:
         # Session setup
 
-        session = Session(region_name=region_name)
-        forecast = session.client(service_name=service_name)
+        if forecast is None:
+            session = Session(region_name=region_name)
+            forecast = session.client(service_name=service_name)
     
         # Using forecast api to call delete forecast method
     
@@ -117,20 +124,24 @@ def delete_forecast(region_name, service_name, run_time_stamp, forecast_arn):
 # Delete predictor
 
 
-def delete_predictor(region_name, service_name, run_time_stamp, predictor_arn):
+def delete_predictor(region_name, service_name, run_time_stamp, predictor_arn,
+                     forecast=None):
     """Deletion of predictor
     Parameters:
     argument1 (region_name): Amazon region name (service availability)
     argument2 (service_name): Type of amazon service (forecast)
     argument3 (run_time_stamp): current job's run id                        
     argument4 (predictor_arn): AWS resource name (unique identifier)
+    argument5 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
     Returns: Nothing
     """
     try:
         # Session setup
 
-        session = Session(region_name=region_name)
-        forecast = session.client(service_name=service_name)
+        if forecast is None:
+            session = Session(region_name=region_name)
+            forecast = session.client(service_name=service_name)
     
         # Using forecast api to call delete predictor method
     
@@ -148,20 +159,23 @@ def delete_predictor(region_name, service_name, run_time_stamp, predictor_arn):
 
 
 def delete_dataset_import_job(region_name, service_name, run_time_stamp,
-                              dataset_import_job_arn):
+                              dataset_import_job_arn, forecast=None):
     """Deletion of dataset import job
     Parameters:
     argument1 (region_name): Amazon region name (service availability)
     argument2 (service_name): Type of amazon service (forecast)
     argument3 (run_time_stamp): current job's run id                                
     argument4 (dataset_import_job_arn): AWS resource name (unique identifier)
+    argument5 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
     Returns: Nothing
     """
     try:
         # Session setup
 
-        session = Session(region_name=region_name)
-        forecast = session.client(service_name=service_name)
+        if forecast is None:
+            session = Session(region_name=region_name)
+            forecast = session.client(service_name=service_name)
     
         # Using forecast api to call delete dataset import method
     
@@ -181,20 +195,24 @@ def delete_dataset_import_job(region_name, service_name, run_time_stamp,
 # Delete dataset
 
 
-def delete_dataset(region_name, service_name, run_time_stamp, dataset_arn):
+def delete_dataset(region_name, service_name, run_time_stamp, dataset_arn,
+                   forecast=None):
     """Deletion of dataset
     Parameters:
     argument1 (region_name): Amazon region name (service availability)
     argument2 (service_name): Type of amazon service (forecast)
     argument3 (run_time_stamp): current job's run id                                        
     argument4 (dataset_arn): AWS resource name (unique identifier)
+    argument5 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
     Returns: Nothing
     """
     try:
         # Session setup
 
-        session = Session(region_name=region_name)
-        forecast = session.client(service_name=service_name)
+        if forecast is None:
+            session = Session(region_name=region_name)
+            forecast = session.client(service_name=service_name)
     
         # Using forecast api to call delete dataset  method
     
@@ -212,20 +230,23 @@ def delete_dataset(region_name, service_name, run_time_stamp, dataset_arn):
 
 
 def delete_dataset_group(region_name, service_name, run_time_stamp,
-                         dataset_group_arn):
+                         dataset_group_arn, forecast=None):
     """Deletion of dataset group
     Parameters:
     argument1 (region_name): Amazon region name (service availability)
     argument2 (service_name): Type of amazon service (forecast)
     argument3 (run_time_stamp): current job's run id                                                
     argument4 (dataset_group_arn): AWS resource name (unique identifier)
+    argument5 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
     Returns: Nothing
     """
     try:
         # Session setup
 
-        session = Session(region_name=region_name)
-        forecast = session.client(service_name=service_name)
+        if forecast is None:
+            session = Session(region_name=region_name)
+            forecast = session.client(service_name=service_name)
     
         # Using forecast api to call delete dataset dataset group method
     
@@ -35,10 +35,11 @@
 
 # Loading libraries
 from warnings import simplefilter
-from time import sleep
+from concurrent.futures import CancelledError
 # Library for creating session to AWS forecast platfrom
 from boto3 import Session 
 import notebook_utils as util
+from fcst_utils import wait_or_stop
 from error_logging import create_and_insert_error
 simplefilter("ignore")
 
@@ -48,7 +49,8 @@ simplefilter("ignore")
 
 def create_forecast_export(
     region_name, service_name, run_time_stamp,
-    forecast_arn, forecast_export_job_name, s3_data_path, role_arn
+    forecast_arn, forecast_export_job_name, s3_data_path, role_arn,
+    forecast=None, stop=None
 ):
 
     """Creating forecast export job
@@ -60,13 +62,18 @@ def create_forecast_export(
     argument5 (forecast_export_job_name): Name of the dorecast export
     argument6 (s3_data_path): Location of the S3 where the exports reside
     argument7 (role_arn): Forecast role name for connecting AWS forecast to S3
+    argument8 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
+    argument9 (stop [OPTIONAL]): threading.Event, the status polling stops
+                        (CancelledError) as soon as it is set
     Returns: Nothing
     """
     try:
         # Session setup
 
-        session = Session(region_name=region_name)
-        forecast = session.client(service_name=service_name)
+        if forecast is None:
+            session = Session(region_name=region_name)
+            forecast = session.client(service_name=service_name)
     
         # Using forecast api to call following methods..
         create_forecast_export_response = forecast.create_forecast_export_job(
@@ -88,12 +95,15 @@ def create_forecast_export(
             status_indicator.update(status)
             if status in ("ACTIVE", "CREATE_FAILED"):
                 break
-            sleep(10)
+            wait_or_stop(stop, 10)
 
         status_indicator.end()
 
         return 0
 
+    except CancelledError:
+        # Cancelled by the orchestrator, not an error of the function
+        raise
     except Exception as create_forecast_export_exception:
         print ("Exception caught in the create_forecast_export function.\n",
                                        str(create_forecast_export_exception))                
@@ -50,11 +50,12 @@
 
 # Loading libraries
 
-from time import sleep
+from concurrent.futures import CancelledError
 # Library for creating session to AWS forecast platfrom
 from boto3 import Session 
 from warnings import simplefilter
 import notebook_utils as util
+from fcst_utils import wait_or_stop
 from error_logging import create_and_insert_error
 simplefilter("ignore")
 
@@ -65,7 +66,7 @@ simplefilter("ignore")
 
 
 def create_dataset_group_function(region_name, service_name, run_time_stamp,
-                         dataset_group_name):
+                         dataset_group_name, forecast=None):
 
     """Creating Dataset group
     Parameters:
@@ -73,13 +74,16 @@ def create_dataset_group_function(region_name, service_name, run_time_stamp,
     argument2 (service_name): Type of amazon service (forecast)
     argument3 (run_time_stamp): current job's run id                
     argument4 (dataset_group_name): Name of the dataset group
+    argument5 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
     Returns: Nothing
     """
     try:    
         # Session set up
 
-        session = Session(region_name=region_name)
-        forecast = session.client(service_name=service_name)
+        if forecast is None:
+            session = Session(region_name=region_name)
+            forecast = session.client(service_name=service_name)
         
         # Using forecast api to call create dataset group method
         create_dataset_group_response = forecast.create_dataset_group(
@@ -108,7 +112,8 @@ def create_dataset_function(
     related_dataset_name=None,
     related_schema=None,
     item_meta_dataset_name=None,
-    item_schema=None
+    item_schema=None,
+    forecast=None
 ):
 
     """Creating Dataset
@@ -126,13 +131,16 @@ def create_dataset_function(
     argument7 (item meta datset name[optional]): Name of the item dataset
     argument8 (item_schema[optional]): item schema definition (json syntax)
 
+    argument9 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
     Returns: Nothing
     """
     try:
         # Session set up
 
-        session = Session(region_name=region_name)
-        forecast = session.client(service_name=service_name)
+        if forecast is None:
+            session = Session(region_name=region_name)
+            forecast = session.client(service_name=service_name)
     
         # Using forecast api to call following methods..
     
@@ -215,7 +223,10 @@ def import_aws_dataset(
     related_s3_data_path=None,
     item_meta_dataset_import_job_name=None,
     item_meta_dataset_arn=None,
-    item_s3_data_path=None  
+    item_s3_data_path=None,
+    import_format="CSV",
+    forecast=None,
+    stop=None
 ):
 
     """Importing data to AWS
@@ -243,14 +254,22 @@ def import_aws_dataset(
                                                         (unique identifier)
     argument14 (item_s3_data_path[optinal]): S3 location where related input
                                                 file is present
-
+    argument15 (import_format[optional]): Format of the target and related
+                                files, CSV or PARQUET (the item meta data
+                                file is always CSV)
+
+    argument16 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
+    argument17 (stop [OPTIONAL]): threading.Event, the status polling stops
+                        (CancelledError) as soon as it is set
     Returns: Nothing
     """
     try:
         # Session set up
 
-        session = Session(region_name=region_name)
-        forecast = session.client(service_name=service_name)
+        if forecast is None:
+            session = Session(region_name=region_name)
+            forecast = session.client(service_name=service_name)
     
         # Using forecast api to call following methods..
     
@@ -261,6 +280,7 @@ def import_aws_dataset(
             DataSource={"S3Config": {"Path": target_s3_data_path, "RoleArn": \
                                                      role_arn}},
             TimestampFormat=timestamp_format,
+            Format=import_format,
         )
         # Related dataset import Job
         if (
@@ -276,6 +296,7 @@ def import_aws_dataset(
                                  role_arn}
                 },
                 TimestampFormat=timestamp_format,
+                Format=import_format,
             )
            
         # Item meta dataset import Job
@@ -327,7 +348,7 @@ def import_aws_dataset(
             status_indicator_target.update(status)
             if status in ("ACTIVE", "CREATE_FAILED"):
                 break
-            sleep(10)
+            wait_or_stop(stop, 10)
 
         # Status check for item import Job
         if (
@@ -344,7 +365,7 @@ def import_aws_dataset(
                 status_indicator_item.update(status)
                 if status in ("ACTIVE", "CREATE_FAILED"):
                     break
-                sleep(10)
+                wait_or_stop(stop, 10)
 
             status_indicator_item.end()
 
@@ -363,11 +384,14 @@ def import_aws_dataset(
                 status_indicator_related.update(status)
                 if status in ("ACTIVE", "CREATE_FAILED"):
                     break
-                sleep(10)
+                wait_or_stop(stop, 10)
 
             status_indicator_related.end()
             
         return 0
+    except CancelledError:
+        # Cancelled by the orchestrator, not an error of the function
+        raise
     except Exception as import_aws_dataset_exception:
         print ("Exception caught in the import_aws_dataset function.\n",
                                        str(import_aws_dataset_exception))                                        
@@ -0,0 +1,116 @@
+# Content addressed store of the Forecast import payloads
+#
+# Python Version: 3.8.12
+#
+# Description : Upload each prepared target/related slice once, under the
+#               hash of its content, and share the S3 key between the
+#               algorithm processes and the reruns, instead of one copy
+#               per algorithm and round
+#
+# Coding Steps :
+#               1. Hash of a slice : sha256 of the payload format, the
+#                  columns, their types and the row hashes
+#               2. Key of the slice : content/<hash> in the folder of the
+#                  per algorithm file
+#               3. Upload only if the key doesn't exist yet (checked under
+#                  a lock shared by the forked algorithm processes)
+#
+# Only the slices built from the analytical inputs (create_target_ts_data,
+# create_related_ts_data) are stored here, the target data appended with
+# each algorithm's forecasts is never shared. The objects are not deleted
+# by the jobs, see content_store_folder in processed_configuration.
+
+
+# 1. Import built-in packages and user defined functions
+
+import os
+from hashlib import sha256
+from multiprocessing import Lock
+from boto3 import client
+from botocore.exceptions import ClientError
+from pandas.util import hash_pandas_object
+
+import processed_configuration as con
+from forecast_payload import payload_path, write_payload
+
+# Created at import, before parallel_processing forks the algorithm
+# processes, so all of them share it
+_upload_lock = Lock()
+
+# Keys already checked or uploaded by this process
+_known_keys = set()
+
+
+# 2. Hash and key of a slice
+
+def content_hash(frame):
+    """sha256 of the content of the slice, in the payload format."""
+    digest = sha256()
+    digest.update(con.import_payload_format.encode())
+    digest.update("|".join(str(col) + ":" + str(dtype) for col, dtype \
+                           in frame.dtypes.items()).encode())
+    digest.update(hash_pandas_object(frame, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def _exists(path, s3=None):
+    """True if the S3 object exists."""
+    bucket, _, key = path[len("s3://"):].partition("/")
+    if s3 is None:
+        s3 = client(con.aws_service1)
+    try:
+        s3.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+
+# 3. Storing a slice
+
+def store_payload(frame, csv_path, s3=None):
+    """Store a prepared slice and return the path its import job reads.
+
+    Parameters
+    ----------
+    frame : dataframe
+        Target or related slice of the round.
+    csv_path : string
+        Per algorithm S3 .csv path of the slice.
+    s3 : object, optional
+        S3 client shared by the pipelines, created if None.
+
+    Returns
+    -------
+    string
+        .csv path of the slice (payload_path gives the file written),
+        content/<hash>.csv in the folder of csv_path, or csv_path itself
+        when the content store is disabled.
+
+    How it works
+    ------------
+        1. Hash the slice, the same data always gets the same key,
+        whatever the algorithm or the run.
+        2. Under the shared lock, upload it with write_payload unless
+        the key already exists in S3.
+
+    """
+    if not con.content_store_enabled:
+        write_payload(frame, csv_path, s3)
+        return csv_path
+
+    content_path = os.path.dirname(csv_path) + "/" + con.content_store_folder + \
+                   "/" + content_hash(frame) + ".csv"
+    if content_path in _known_keys:
+        print("Slice already stored :", payload_path(content_path))
+        return content_path
+
+    with _upload_lock:
+        if _exists(payload_path(content_path), s3):
+            print("Slice already stored :", payload_path(content_path))
+        else:
+            write_payload(frame, content_path, s3)
+            print("Slice stored :", payload_path(content_path))
+    _known_keys.add(content_path)
+    return content_path
@@ -4,6 +4,7 @@ import gzip
 
 import boto3
 import botocore.exceptions
+from concurrent.futures import CancelledError
 
 import pandas as pd
 #import matplotlib.pyplot as plt
@@ -30,6 +31,16 @@ def wait_till_delete(callback, check_time = 5, timeout = None):
     raise TimeoutError( "Forecast resource deletion timed-out." )
 
 
+def wait_or_stop(stop, time_interval = 10):
+    """Sleep time_interval sec, raise CancelledError as soon as the stop
+    event (threading.Event, None for none) is set. The Forecast job being
+    waited for isn't stopped."""
+    if stop is None:
+        time.sleep(time_interval)
+    elif stop.wait(time_interval):
+        raise CancelledError("Stopped while waiting for a Forecast job")
+
+
 def wait(callback, time_interval = 10):
 
     status_indicator = util.notebook_utils.StatusIndicator()
@@ -33,6 +33,7 @@ from kfs_get_latest_run_id import get_latest_run_id
 import processed_configuration as con
 from error_logging import create_and_insert_error
 from parallel_processing import multi_threading
+from async_orchestrator import async_forecasting
 from datetime import datetime
 from warnings import simplefilter
 simplefilter("ignore")
@@ -138,9 +139,13 @@ def forecast_create_main():
     
     alg_lst = [(alg,project_name,run_time_stamp) for alg in con.alg_lst]
 
-    # Calling multi_threading function from parallel processing script
+    # Calling multi_threading function from parallel processing script, or
+    # the asyncio orchestrator (all the algorithms in this process)
     try:
-        multi_threading(alg_lst,run_time_stamp)
+        if con.orchestration_mode == 'asyncio':
+            async_forecasting(alg_lst,run_time_stamp)
+        else:
+            multi_threading(alg_lst,run_time_stamp)
     
         #Added on 06Feb23 - Ranjan - Successful
         sns = boto3.client("sns", region_name=region_name)
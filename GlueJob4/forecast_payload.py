@@ -0,0 +1,156 @@
+# Payload of the datasets imported by Amazon Forecast
+#
+# Python Version: 3.8.12
+#
+# Description : Write the per round target and related datasets of the
+#               dataset import jobs as plain CSV, gzip CSV or Parquet, and
+#               build the S3 path and import Format matching the chosen
+#               payload format
+#
+# Coding Steps :
+#               1. Path of the payload : the .csv path with the extension of
+#                  the configured format
+#               2. Write : CSV as before, gzip CSV compressed in memory,
+#                  Parquet with the column types of the dataset schema
+#               3. Read back a payload (target data appended every round)
+
+
+# 1. Import built-in packages and user defined functions
+
+import os
+import gzip
+from io import BytesIO
+from boto3 import client
+import pyarrow.parquet as pq
+from pyarrow import Table
+import awswrangler as wr
+
+import processed_configuration as con
+
+
+# 2. Path and import format of the payload
+
+def _split_s3_path(path):
+    """Split an s3://bucket/key path into bucket and key."""
+    bucket, _, key = path[len("s3://"):].partition("/")
+    return bucket, key
+
+
+def payload_path(csv_path):
+    """Path of the payload of a .csv dataset path, in the configured
+    import payload format."""
+    if con.import_payload_format == 'csv.gz':
+        return csv_path + ".gz"
+    if con.import_payload_format == 'parquet':
+        return os.path.splitext(csv_path)[0] + ".parquet"
+    return csv_path
+
+
+def payload_import_format():
+    """Format of the dataset import job (gzip CSV is imported as CSV)."""
+    if con.import_payload_format == 'parquet':
+        return "PARQUET"
+    return "CSV"
+
+
+# 3. Writing and reading a payload
+
+def _schema_types():
+    """Attribute type of each column of the target and related schemas."""
+    types = {}
+    for schema in (con.target_schema, con.related_schema):
+        for attribute in schema["Attributes"]:
+            types[attribute["AttributeName"]] = attribute["AttributeType"]
+    return types
+
+
+# strftime pattern of each timestamp format accepted by the import jobs
+_TIMESTAMP_PATTERNS = {
+                       "yyyy-MM-dd":'%Y-%m-%d',
+                       "yyyy-MM-dd HH:mm:ss":'%Y-%m-%d %H:%M:%S'
+                      }
+
+
+def _timestamp_pattern():
+    """strftime pattern of con.timestamp_format, the format declared to
+    the import jobs."""
+    try:
+        return _TIMESTAMP_PATTERNS[con.timestamp_format]
+    except KeyError:
+        raise ValueError("Unsupported timestamp_format for the payload : " +
+                         str(con.timestamp_format))
+
+
+def _put(path, body, s3=None):
+    """Upload the bytes to the S3 path."""
+    bucket, key = _split_s3_path(path)
+    if s3 is None:
+        s3 = client(con.aws_service1)
+    s3.put_object(Bucket=bucket, Key=key, Body=body)
+
+
+def write_payload(frame, csv_path, s3=None):
+    """Write a dataset to be imported by Amazon Forecast.
+
+    Parameters
+    ----------
+    frame : dataframe
+        Target or related dataset, columns in the schema order.
+    csv_path : string
+        S3 path of the dataset as a .csv file, the payload path is
+        derived from it.
+    s3 : object, optional
+        S3 client shared by the pipelines, created if None.
+
+    Returns
+    -------
+    string
+        S3 path written.
+
+    How it works
+    ------------
+        1. 'csv' : written with wr.s3.to_csv as before.
+        2. 'csv.gz' : CSV text compressed with gzip in memory and
+        uploaded in one put_object.
+        3. 'parquet' : columns cast to their schema attribute type
+        (float as float64, string and timestamp as text in
+        con.timestamp_format, ValueError for a format without a
+        pattern), written with pyarrow and uploaded.
+
+    """
+    path = payload_path(csv_path)
+    if con.import_payload_format == 'csv':
+        wr.s3.to_csv(df=frame, path=path, index=False)
+        return path
+
+    if con.import_payload_format == 'csv.gz':
+        _put(path, gzip.compress(frame.to_csv(index=False).encode()), s3)
+        return path
+
+    frame = frame.copy()
+    types = _schema_types()
+    timestamp_pattern = _timestamp_pattern()
+    for col in frame.columns:
+        attribute_type = types.get(col)
+        if attribute_type == 'float':
+            frame[col] = frame[col].astype('float64')
+        elif attribute_type == 'timestamp' and frame[col].dtype.kind == 'M':
+            frame[col] = frame[col].dt.strftime(timestamp_pattern)
+        elif attribute_type in ('string', 'timestamp'):
+            frame[col] = frame[col].astype(str)
+
+    buffer = BytesIO()
+    pq.write_table(Table.from_pandas(frame, preserve_index=False), buffer)
+    _put(path, buffer.getvalue(), s3)
+    return path
+
+
+def read_payload(csv_path):
+    """Read a dataset written by write_payload (same columns as reading
+    the CSV)."""
+    path = payload_path(csv_path)
+    if con.import_payload_format == 'parquet':
+        return wr.s3.read_parquet(path)
+    if con.import_payload_format == 'csv.gz':
+        return wr.s3.read_csv(path, compression='gzip')
+    return wr.s3.read_csv(path)
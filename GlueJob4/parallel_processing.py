@@ -34,6 +34,7 @@ from multiprocessing import Process
 from start_forecast_process import forecast_process   #---changed name of code
 
 from error_logging import create_and_insert_error
+from secret_cache import prime_secret_cache
 from os import getppid
 from time import sleep
 
@@ -56,6 +57,9 @@ def multi_threading(alg_lst,run_time_stamp):
         procs = []
         wait_cmd = 1
         
+        # Loading the DB secret once, the forked processes inherit it
+        prime_secret_cache()
+        
         # creating process for each algorithm
         for alg in alg_lst:
             print (alg)
@@ -3,6 +3,7 @@
 # To connect ot Snowflake
 
 # Service Name
+aws_service1 = "s3"
 aws_service2 = "secretsmanager"
 
 # Secret name for dev
@@ -19,6 +20,12 @@ WAREHOUSE = "WAREHOUSE"
 DB = "DB"
 SCHEMA = "SCHEMA"
 
+# Keep the pooled Snowflake session alive for the whole job
+db_session_keep_alive = True
+
+# Seconds the parsed DB secret is kept in memory
+secret_cache_ttl_seconds = 3600
+
 
 # KFS_PROCESSED_ORDERS_TARGET queries - changed names of files
 
@@ -161,4 +168,54 @@ insert_error_log = "INSERT INTO KFS_ERROR_LOG( \
                                           EXCEPTION_KEY, \
                                           EXCEPTION_MESSAGE, \
                                           MESSAGE \
-                                         ) VALUES (%s,%s,%s,%s,%s,%s)"
\ No newline at end of file
+                                         ) VALUES (%s,%s,%s,%s,%s,%s)"
+# Query results fetched as dataframes from the connector's Arrow result
+# batches (False = rows fetched as tuples with fetchall)
+arrow_fetch_enabled = True
+
+# Format of the target and related datasets exchanged between the jobs
+# in Analytical_outputs : 'parquet' (item_id dictionary encoded, timestamp
+# as a date, see artifact_io) or 'csv'. The item meta data and the
+# datasets imported by Amazon Forecast stay CSV
+artifact_format = 'parquet'
+
+# Payload of the per round target and related files imported by Amazon
+# Forecast : 'csv', 'csv.gz' (gzip CSV) or 'parquet' (imported with
+# Format PARQUET), see forecast_payload
+import_payload_format = 'parquet'
+
+# Content addressed store of the per round target and related slices :
+# each slice is uploaded once to <processed_folder_name>/<folder>/<hash>
+# and shared by the algorithms and the reruns (False = one file per
+# algorithm as before). Only the slices of create_target_ts_data and
+# create_related_ts_data are stored there, the appended target data of
+# rounds 3+ overwrites the algorithm's own file. The stored slices are
+# never deleted by the jobs : expire <processed_folder_name>/<folder>/
+# with an S3 lifecycle rule (a few days, longer than one run)
+content_store_enabled = True
+content_store_folder = 'content'
+
+# Dataset groups : 'per_algorithm' (one dataset group and import per
+# algorithm) or 'shared_round1' (round 1 imported once per group of
+# algorithms with the same inputs, see shared_dataset_groups), the wait
+# for the imports of the group to be ACTIVE (sec) and, shorter, the wait
+# for the group leader to create them (sec, the followers fail after it
+# when the leader failed before importing).
+# 'shared_round1' saves round 1 imports only, it costs dataset quota :
+# every algorithm still has its own dataset group and datasets (rounds
+# 2+), plus up to 3 shared_* groups with their datasets and imports that
+# no job deletes (6 default algorithms : 9 groups / 18 datasets instead
+# of 6 / 12). Kept off until the shared groups are cleaned up
+dataset_group_mode = 'per_algorithm'
+shared_import_timeout = 10800
+shared_import_start_timeout = 1800
+
+# Orchestration of the algorithms : 'asyncio' (one process, the pipelines
+# run as tasks of an event loop over a thread pool, see async_orchestrator)
+# or 'processes' (one forked process per algorithm), and the time after
+# which the asyncio pipelines are cancelled (sec, None = no limit).
+# On timeout, the pipelines stop waiting for their import, predictor,
+# forecast or export job within one polling interval (10 to 30 sec); the
+# Forecast jobs already created keep running in AWS until they end
+orchestration_mode = 'asyncio'
+orchestrator_timeout = None
@@ -0,0 +1,159 @@
+# Dataset groups shared by the algorithms with the same inputs
+#
+# Python Version: 3.8.12
+#
+# Description : Group the algorithms by input signature (target only,
+#               target + related, target + related + item meta data) so
+#               the first round of a group is imported once into one
+#               shared dataset group, the predictors of all the algorithms
+#               of the group being trained on it
+#
+# Coding Steps :
+#               1. Input signature and shared dataset group of an algorithm
+#               2. Leader of the group : first algorithm of alg_lst with the
+#                  signature, it creates the shared datasets and imports
+#               3. The other algorithms wait for the imports of the leader,
+#                  failing fast if the leader doesn't create them
+#
+# Only the first round can be shared : from round 3 on, each algorithm
+# imports its own forecasts (target_append) into the dataset group its
+# round 2 predictor was trained on, so round 2 runs in the algorithm's
+# own dataset group as before. The shared groups (with their datasets
+# and imports) are added to the algorithms' own groups and aren't
+# deleted, so this mode uses more dataset quota, not less (see
+# dataset_group_mode).
+
+
+# 1. Import built-in packages and user defined functions
+
+from time import time
+from boto3 import Session
+
+import processed_configuration as con
+from fcst_utils import wait_or_stop
+
+
+# 2. Signature and group of an algorithm
+
+def input_signature(algorithm_name):
+    """Datasets imported for the algorithm, as in forecast_process."""
+    if ('cnn_qr' in algorithm_name or 'deep_ar_plus' in algorithm_name) and \
+                                        (con.item_metadataset_name != ""):
+        return ('target', 'related', 'item')
+    if 'cnn_qr' in algorithm_name or 'prophet' in algorithm_name or \
+                                        'deep_ar_plus' in algorithm_name:
+        return ('target', 'related')
+    return ('target',)
+
+
+def shared_group_name(algorithm_name):
+    """Name used in place of the algorithm name for the resources of the
+    shared dataset group (dataset group, datasets and import jobs)."""
+    return 'shared_' + '_'.join(input_signature(algorithm_name))
+
+
+def is_group_leader(algorithm_name):
+    """True for the first algorithm of alg_lst with this signature."""
+    signature = input_signature(algorithm_name)
+    for alg in con.alg_lst:
+        if input_signature(alg) == signature:
+            return alg == algorithm_name
+    return True
+
+
+# 3. Waiting for the imports of the group leader
+
+def wait_for_shared_import(region_name, service_name, project,
+                           algorithm_name, import_job_names, forecast=None,
+                           stop=None):
+    """Wait until the leader's imports into the shared dataset group are
+    ACTIVE.
+
+    Parameters
+    ----------
+    region_name : string
+        Amazon region name.
+    service_name : string
+        Type of amazon service (forecast).
+    project : string
+        Project name.
+    algorithm_name : string
+        Algorithm waiting for the imports.
+    import_job_names : dict
+        Import job name of each dataset of the signature ('target',
+        'related', 'item').
+    forecast : object, optional
+        Forecast client shared by the pipelines, created if None.
+    stop : object, optional
+        threading.Event, the wait stops (CancelledError) as soon as it
+        is set.
+
+    Returns
+    -------
+    string
+        '0' once all the imports are ACTIVE, else the error.
+
+    How it works
+    ------------
+        1. The leader creates all its round 1 import jobs at once, a
+        job not found means the leader hasn't got there yet.
+        2. Fail at once if the shared dataset group failed, and after
+        shared_import_start_timeout sec if the jobs still don't exist
+        (the leader failed before importing).
+        3. Once the jobs exist, wait up to shared_import_timeout sec for
+        them to be ACTIVE, fail at once on CREATE_FAILED.
+
+    """
+    if forecast is None:
+        forecast = Session(region_name=region_name).client(service_name=service_name)
+    group = shared_group_name(algorithm_name)
+    prefix = con.aws_common_arn_prefix + 'dataset-import-job/' + \
+             project.replace('-','_') + '_' + group + '_'
+    dataset_names = {
+                     'target':con.target_dataset_name,
+                     'related':con.related_dataset_name,
+                     'item':con.item_metadataset_name
+                    }
+
+    dataset_group_arn = con.aws_common_arn_prefix + 'dataset-group/' + \
+                        project.replace('-','_') + '_' + group + '_' + \
+                        con.dataset_group_name
+
+    start = time()
+    for dataset in input_signature(algorithm_name):
+        import_job_arn = prefix + dataset_names[dataset] + '/' + \
+                         project.replace('-','_') + '_' + import_job_names[dataset]
+        print("Waiting for the shared import", import_job_arn)
+        while True:
+            try:
+                status = forecast.describe_dataset_import_job(\
+                                    DatasetImportJobArn=import_job_arn)["Status"]
+            except forecast.exceptions.ResourceNotFoundException:
+                # Not created by the leader yet
+                status = None
+
+            if status == "ACTIVE":
+                break
+            if status == "CREATE_FAILED":
+                return "Shared import failed : " + import_job_arn
+            if status is None:
+                try:
+                    group_status = forecast.describe_dataset_group(\
+                                    DatasetGroupArn=dataset_group_arn)["Status"]
+                except forecast.exceptions.ResourceNotFoundException:
+                    group_status = None
+                if group_status in ("CREATE_FAILED", "DELETE_PENDING",
+                                    "DELETE_IN_PROGRESS"):
+                    return "Shared dataset group " + str(group_status) + \
+                           " : " + dataset_group_arn
+                if time() - start > con.shared_import_start_timeout:
+                    return "Shared import not created by the leader after " + \
+                           str(con.shared_import_start_timeout) + " sec : " + \
+                           import_job_arn
+            elif time() - start > con.shared_import_timeout:
+                return "Shared import not ACTIVE after " + \
+                       str(con.shared_import_timeout) + " sec : " + import_job_arn
+            wait_or_stop(stop, 30)
+
+    print("Shared imports of", group, "ACTIVE after", round(time() - start), "sec")
+    return str(0)
@@ -56,8 +56,8 @@ from error_logging import create_and_insert_error
 from snowflake_db_connection import connect_to_db
 
 import sys
-from time import sleep
-from boto3 import client, resource
+from fcst_utils import wait_or_stop
+from boto3 import Session, client
 from pandas import DataFrame, read_csv, to_datetime, concat, merge
 from numpy import where
 from creating_mape_for_selected_sku import calculating_mape
@@ -70,12 +70,19 @@ from creating_mape_for_selected_sku_p40 import calculating_mape_p40
 # Added
 
 from math import ceil
+from concurrent.futures import CancelledError
 import awswrangler as wr
+from artifact_io import read_artifact
+from forecast_payload import payload_path, payload_import_format, write_payload, \
+                             read_payload
+from content_store import store_payload
+from shared_dataset_groups import shared_group_name, is_group_leader, \
+                                  wait_for_shared_import
 
 # Dataset group creation..
 
 def create_dataset_group(region_name, service_name,run_time_stamp,
-                         project, algorithm_name):
+                         project, algorithm_name, forecast=None):
     
     """Creating Dataset group
     Parameters: 
@@ -84,6 +91,8 @@ def create_dataset_group(region_name, service_name,run_time_stamp,
     argument3 (run_time_stamp): current job's run id  
     argument4 (project): project name as a string
     argument5 (algorithm_name): algorithm short name as a string
+    argument6 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
     Returns: 0 on successful creation of the dataset group. Else, error.
     """
     
@@ -94,7 +103,7 @@ def create_dataset_group(region_name, service_name,run_time_stamp,
                                             '_' + con.dataset_group_name
         flag = create_dataset_group_function(region_name, service_name,
                                              run_time_stamp,
-                                             dataset_group)
+                                             dataset_group, forecast=forecast)
         return str(flag)
     except Exception as create_dataset_group_exception:
         print("Exception occured in the create dataset group calling function.\
@@ -109,7 +118,7 @@ def create_dataset_group(region_name, service_name,run_time_stamp,
 def create_dataset(region_name, service_name,run_time_stamp,
                     algorithm_name, project, target_dataset_name, 
                    related_dataset_name,
-                   item_meta_dataset_name=None):
+                   item_meta_dataset_name=None, forecast=None):
     
     """Creating Dataset 
     Parameters: 
@@ -122,6 +131,8 @@ def create_dataset(region_name, service_name,run_time_stamp,
     argument7 (related_dataset_name): related dataset name as a string
     argument8 (item_meta_dataset_name[OPTIONAL]): item meta dataset name-string
     argument9 (run_time_stamp): current job's run id as a string
+    argument10 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
     Returns: 0 on successful creation of the dataset(s). Else, error.
     """
     
@@ -148,7 +159,8 @@ def create_dataset(region_name, service_name,run_time_stamp,
                                         target_dataset, con.dataset_frequency, 
                                   con.target_schema,dataset_group_arn, 
                                   related_dataset, con.related_schema,
-                                  item_dataset,con.item_schema)
+                                  item_dataset,con.item_schema,
+                                  forecast=forecast)
         
         # Creating datasets for target and related
         elif (related_dataset_name !="") & (con.related_schema !=""):
@@ -161,7 +173,8 @@ def create_dataset(region_name, service_name,run_time_stamp,
                                            run_time_stamp,
                                          target_dataset, con.dataset_frequency, 
                                   con.target_schema,dataset_group_arn,
-                                  related_dataset, con.related_schema)
+                                  related_dataset, con.related_schema,
+                                  forecast=forecast)
         # Creating datasets for target    
         else:
             
@@ -171,7 +184,8 @@ def create_dataset(region_name, service_name,run_time_stamp,
             flag = create_dataset_function(region_name, service_name,
                                            run_time_stamp,
                                         target_dataset, con.dataset_frequency, 
-                                  con.target_schema, dataset_group_arn)
+                                  con.target_schema, dataset_group_arn,
+                                  forecast=forecast)
                     
         return str(flag)
     except Exception as create_dataset_exception:
@@ -191,7 +205,8 @@ def import_dataset(region_name, service_name,run_time_stamp,
                    related_dataset_import_job_name = None,
                    item_metadataset_name = None,
                    item_metadata_file_name = None,
-                   item_meta_dataset_import_job_name = None):
+                   item_meta_dataset_import_job_name = None,
+                   data_paths = None, forecast=None, stop=None):
 
     """Creating Dataset 
     Parameters: 
@@ -220,6 +235,12 @@ def import_dataset(region_name, service_name,run_time_stamp,
                                                                 as a string
     argument18 (item_meta_dataset_import_job_name [OPTIONAL]): item meta \
                                             dataset import job name as a string
+    argument19 (data_paths [OPTIONAL]): stored target/related data paths of
+                        the round (content_store), override the file names
+    argument20 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
+    argument21 (stop [OPTIONAL]): threading.Event, the status polling stops
+                        (CancelledError) as soon as it is set
     Returns: 0 on successful creation of the dataset(s). Else, error.
     """
         
@@ -254,15 +275,22 @@ def import_dataset(region_name, service_name,run_time_stamp,
         target_s3_data_path = 's3://' + bucket_name + '/' + 'GlueScripts4/'+ \
                                 processed_folder_name+ '/' + project + '_' + \
                                 algorithm_name + '_'+ target_file_name
+        # Shared slice of the content store, if stored this round
+        if data_paths and ('target' in data_paths):
+            target_s3_data_path = data_paths['target']
+        # File in the configured payload format (csv, csv.gz or parquet)
+        target_s3_data_path = payload_path(target_s3_data_path)
     
 #     s3://nvs3dvdf01.dfa.data/GlueScripts4/
     
 #         if related_file_name != None: related_s3_data_path = 's3://' + \
 #                             bucket_name + '/' + processed_folder_name+ '/' \
 #                     + project + '_' + algorithm_name + '_'+related_file_name
-        if related_file_name != None: related_s3_data_path = 's3://' + \
+        if related_file_name != None: related_s3_data_path = payload_path('s3://' + \
                             bucket_name + '/' + 'GlueScripts4/' + processed_folder_name+ '/' \
-                    + project + '_' + algorithm_name + '_'+related_file_name
+                    + project + '_' + algorithm_name + '_'+related_file_name)
+        if (related_file_name != None) and data_paths and ('related' in data_paths):
+            related_s3_data_path = payload_path(data_paths['related'])
         if item_metadata_file_name != None: 
 #             item_s3_data_path = 's3://' + bucket_name + '/' + \
 #                         con.source_folder+ '/' + item_metadata_file_name
@@ -279,7 +307,9 @@ def import_dataset(region_name, service_name,run_time_stamp,
                                       related_dataset_import_job, 
                                     related_dataset_arn, related_s3_data_path, 
                                     item_meta_dataset_import_job, 
-                                    item_meta_dataset_arn, item_s3_data_path)
+                                    item_meta_dataset_arn, item_s3_data_path,
+                                    import_format=payload_import_format(),
+                                    forecast=forecast, stop=stop)
         
         # Creating importing jobs for target, related data
         elif (related_dataset_import_job_name != None) :            
@@ -288,19 +318,26 @@ def import_dataset(region_name, service_name,run_time_stamp,
                                       target_dataset_arn, target_s3_data_path,
                                       con.role_arn, timestamp_format, 
                                       related_dataset_import_job, 
-                                     related_dataset_arn, related_s3_data_path)
+                                     related_dataset_arn, related_s3_data_path,
+                                     import_format=payload_import_format(),
+                                     forecast=forecast, stop=stop)
         
         # Creating importing job for target
         else:
             flag = import_aws_dataset(region_name, service_name,run_time_stamp,
                                       target_dataset_import_job, 
                                       target_dataset_arn, target_s3_data_path,
-                                      con.role_arn, timestamp_format)
+                                      con.role_arn, timestamp_format,
+                                      import_format=payload_import_format(),
+                                      forecast=forecast, stop=stop)
             # If dataset import job is successfull, flag holds value 0 else 
             # unsuccessful.
         print("Dataset importing function completed")
         return (str(flag))
         
+    except CancelledError:
+        # Cancelled by the orchestrator, not an error of the function
+        raise
     except Exception as import_aws_dataset_exception:
         print(" Exception occured in the Dataset importing calling function.\
               The details are as follows.\n",str(import_aws_dataset_exception))    
@@ -317,7 +354,7 @@ def create_predictor(region_name, service_name,run_time_stamp,
                      forecast_frequency,
                      short_name_of_the_algorithm,
                      number_of_back_test_windows,
-                     back_test_window_offset):
+                     back_test_window_offset, forecast=None, stop=None):
 
     """Creating predictor 
     Parameters: 
@@ -338,6 +375,10 @@ def create_predictor(region_name, service_name,run_time_stamp,
                                                                     integer
     argument14 (back_test_window_offset): back test windows ( slicing window 
                                             (test data period) ) as a integer
+    argument15 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
+    argument16 (stop [OPTIONAL]): threading.Event, the status polling stops
+                        (CancelledError) as soon as it is set
 
     Returns: 0 on successful creation of the dataset(s). Else, error.
     """
@@ -358,7 +399,8 @@ def create_predictor(region_name, service_name,run_time_stamp,
                                              run_time_stamp,
                                     hpo_flag,predictor_model_name, 
                                     forecast_horizon, dataset_group_arn, 
-                                    forecast_frequency)
+                                    forecast_frequency, forecast=forecast,
+                                    stop=stop)
             
         # If Auto ml is false, then specific algorithm model is created
         else:
@@ -370,12 +412,16 @@ def create_predictor(region_name, service_name,run_time_stamp,
                                     forecast_horizon, dataset_group_arn, 
                                     forecast_frequency, algorithm_arn, 
                                     number_of_back_test_windows, 
-                                    back_test_window_offset)
+                                    back_test_window_offset, forecast=forecast,
+                                    stop=stop)
 
         # If model building is successfull, flag holds value 0 else 
         # unsuccessful.
         print("predictor building completed")
         return (str(flag))
+    except CancelledError:
+        # Cancelled by the orchestrator, not an error of the function
+        raise
     except Exception as create_predictor_exception:
         print(" Exception occured in the Model Building calling function.\
                 The details are as follows.\n",str(create_predictor_exception))        
@@ -387,7 +433,8 @@ def create_predictor(region_name, service_name,run_time_stamp,
                    
 def create_forecast(region_name, service_name, run_time_stamp,
         algorithm_name,aws_common_arn_prefix,project,
-                    predictor_name,forecast_name,forecast_types):  #Added forecast_types
+                    predictor_name,forecast_name,forecast_types,  #Added forecast_types
+                    forecast=None, stop=None):
 
     """Creating forecast 
     Parameters: 
@@ -399,6 +446,10 @@ def create_forecast(region_name, service_name, run_time_stamp,
     argument6 (project): project name as a string
     argument7 (predictor_name): predictor name as a string
     argument8 (forecast_name): predictor name as a string
+    argument9 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
+    argument10 (stop [OPTIONAL]): threading.Event, the status polling stops
+                        (CancelledError) as soon as it is set
 
     Returns: 0 on successful creation of the dataset(s). Else, error.
     """
@@ -414,12 +465,16 @@ def create_forecast(region_name, service_name, run_time_stamp,
         # Calling the AWS forecast create forecast method
         flag = create_forecast_function(region_name, service_name, 
                                         run_time_stamp,
-            forecast_model_name, predictor_arn,forecast_types)  #Added forecast_types
+            forecast_model_name, predictor_arn,forecast_types,  #Added forecast_types
+            forecast=forecast, stop=stop)
         
         # If forecast building is successfull, flag holds value 0 else 
         # unsuccessful.   
         print("forecast creation completed")
         return (str(flag))    
+    except CancelledError:
+        # Cancelled by the orchestrator, not an error of the function
+        raise
     except Exception as create_forecast_exception:
         print(" Exception occured in the Forecast creation calling function.\
                 The details are as follows.\n",str(create_forecast_exception))        
@@ -430,7 +485,8 @@ def create_forecast(region_name, service_name, run_time_stamp,
 def forecast_export(region_name, service_name, run_time_stamp,
         algorithm_name,role_arn,aws_common_arn_prefix,project,
                     bucket_name,forecast_name,
-                    forecast_export_name,forecast_output_folder_name):
+                    forecast_export_name,forecast_output_folder_name,
+                    forecast=None, s3=None, stop=None):
 
     """Creating forecast export
     Parameters: 
@@ -446,6 +502,12 @@ def forecast_export(region_name, service_name, run_time_stamp,
     argument10 (forecast_export_name): forecast export name as a string
     argument11 (forecast_output_folder_name): S3 folder location where the 
                     forecast output csv files are generated - string
+    argument12 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
+    argument13 (s3 [OPTIONAL]): S3 client shared by the pipelines, created
+                        if None
+    argument14 (stop [OPTIONAL]): threading.Event, the status polling stops
+                        (CancelledError) as soon as it is set
 
     Returns: 0 on successful creation of the dataset(s). Else, error.
     """
@@ -463,7 +525,7 @@ def forecast_export(region_name, service_name, run_time_stamp,
         directory = 'GlueScripts4/' + forecast_output_folder_name + '/'+ \
                     project.replace('-','_') + '_' + algorithm_name + '/'
                 
-        s3 = client('s3')
+        if s3 is None: s3 = client('s3')
         s3.put_object(Bucket=bucket_name, Key=(directory + \
                                                forecast_export_name+'/'))
         
@@ -475,11 +537,15 @@ def forecast_export(region_name, service_name, run_time_stamp,
         flag = create_forecast_export(region_name, service_name,
                                       run_time_stamp,
                                       forecast_arn,forecast_export_job_name,
-                                      s3_data_path,role_arn)
+                                      s3_data_path,role_arn, forecast=forecast,
+                                      stop=stop)
         
         # If the exporting is successful, flag holds value 0 else unsuccessful.
         print("forecast export completed")
         return (str(flag))
+    except CancelledError:
+        # Cancelled by the orchestrator, not an error of the function
+        raise
     except Exception as forecast_export_exception: 
         print(" Exception occured in the forecast export calling function.\
                 The details are as follows.\n",str(forecast_export_exception))        
@@ -491,7 +557,8 @@ def target_append(run_time_stamp,algorithm_name,project,bucket_name,
                       forecast_output_folder_name,
                     forecast_export_name,processed_folder_name,
                     target_file_name,
-                    aws_skun):
+                    aws_skun,
+                    data_paths=None, s3=None):
     
     """Creating Bdays adjustment / appending target data with current forecast 
                                                             data points
@@ -505,6 +572,12 @@ def target_append(run_time_stamp,algorithm_name,project,bucket_name,
     argument7 (processed_folder_name): Analytical ouptut folder in S3 as string
     argument8 (target_file_name): target data file name as a string
     argument9 (aws_skun): input data item id's(PF/TOS) as a dataframe
+    argument10 (data_paths [OPTIONAL]): stored target/related data paths of
+                        the round (content_store), the appended target data
+                        is written to the algorithm's own file and its
+                        path updated
+    argument11 (s3 [OPTIONAL]): S3 client shared by the pipelines, created
+                        if None
     
     Returns: 0 on successful creation of the dataset(s). Else, error.
     """
@@ -513,20 +586,20 @@ def target_append(run_time_stamp,algorithm_name,project,bucket_name,
     try:
     
         # Reading the forecast op files
-        s3 = resource("s3")
-        s3_bucket = s3.Bucket(bucket_name)
+        if s3 is None: s3 = client('s3')
 #         directory = forecast_output_folder_name +'/'+ project.replace('-','_')\
 #                     + '_' + algorithm_name +'/' + forecast_export_name +'/'
         directory = 'GlueScripts4/'+ forecast_output_folder_name +'/'+ project.replace('-','_')\
                     + '_' + algorithm_name +'/' + forecast_export_name +'/'
         
-        files_in_s3 = [f.key.split(directory)[1] \
-                    for f in s3_bucket.objects.filter(Prefix=directory).all()]
+        files_in_s3 = [f['Key'].split(directory)[1] \
+                    for page in s3.get_paginator('list_objects_v2').paginate(\
+                                        Bucket=bucket_name, Prefix=directory) \
+                    for f in page.get('Contents', [])]
         csv_file_names = [csv for csv in files_in_s3 if csv.endswith('csv')]
         updated_target_df = DataFrame(columns=['item_id', 'date', 'p50'])
 
         # mape input directory creation
-        s3 = client('s3')
 #         mape_input_directory = forecast_output_folder_name + '/'+ \
 #                         project.replace('-','_') + '_' + algorithm_name +'/'
         mape_input_directory = 'GlueScripts4/'+ forecast_output_folder_name + '/'+ \
@@ -598,13 +671,20 @@ def target_append(run_time_stamp,algorithm_name,project,bucket_name,
                 algorithm_name + '_'+ target_file_name
         
         #target_data = read_csv(initial_target_file)
-        target_data = wr.s3.read_csv(initial_target_file)
+        if data_paths and ('target' in data_paths):
+            target_data = read_payload(data_paths['target'])
+        else:
+            target_data = read_payload(initial_target_file)
         final_data = target_data.append(updated_target_df)
         final_data["timestamp"] = to_datetime(final_data['timestamp'], \
                                                  format = "%Y-%m-%d")
         final_data = final_data.sort_values(by=['timestamp',"item_id"])
         #final_data.to_csv(initial_target_file,index=False)
-        wr.s3.to_csv(df=final_data, path=initial_target_file, index=False)
+        # The appended data differs for each algorithm and run, it
+        # overwrites the algorithm's own file instead of the content store
+        write_payload(final_data, initial_target_file, s3)
+        if data_paths is not None:
+            data_paths['target'] = initial_target_file
         print("target_append completed")
         return 0
     except Exception as target_append_exception:
@@ -617,7 +697,8 @@ def target_append(run_time_stamp,algorithm_name,project,bucket_name,
 def delete_forecast_export_job_calling_function(region_name, service_name, 
                                                 run_time_stamp,
         algorithm_name, project, aws_common_arn_prefix,
-                               forecast_name,forecast_export_name):
+                               forecast_name,forecast_export_name,
+                               forecast=None):
 
     """Deleting forecast export
     Parameters: 
@@ -629,6 +710,8 @@ def delete_forecast_export_job_calling_function(region_name, service_name,
     argument6 (aws_common_arn_prefix): Generic AWS arn prefix as a string
     argument7 (forecast_name): predictor name as a string
     argument8 (forecast_export_name): forecast export name as a string
+    argument9 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
 
     Returns: 0 on successful creation of the dataset(s). Else, error.
     """
@@ -640,7 +723,8 @@ def delete_forecast_export_job_calling_function(region_name, service_name,
             + project  + '_' + forecast_name + '/' + forecast_export_name
         flag = delete_forecast_export_job(region_name, service_name, 
                                           run_time_stamp,
-                                          forecast_export_job_arn)
+                                          forecast_export_job_arn,
+                                          forecast=forecast)
         # If the deletion is successful, flag holds value 0 else unsuccessful.
         print("delete forecast export completed")
         return (str(flag))
@@ -655,7 +739,7 @@ def delete_forecast_export_job_calling_function(region_name, service_name,
 
 def delete_forecast_calling_function(region_name, service_name, run_time_stamp,
         algorithm_name, project, aws_common_arn_prefix,
-                    forecast_name):
+                    forecast_name, forecast=None):
 
     """Deleting forecast 
     Parameters:
@@ -666,6 +750,8 @@ def delete_forecast_calling_function(region_name, service_name, run_time_stamp,
     argument5 (project): project name as a string
     argument6 (aws_common_arn_prefix): Generic AWS arn prefix as a string
     argument7 (forecast_name): predictor name as a string
+    argument8 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
 
     Returns: 0 on successful creation of the dataset(s). Else, error.
     """
@@ -675,7 +761,7 @@ def delete_forecast_calling_function(region_name, service_name, run_time_stamp,
         forecast_arn = aws_common_arn_prefix + 'forecast/' + project  + '_' +\
                         forecast_name
         flag = delete_forecast(region_name, service_name, run_time_stamp,
-                               forecast_arn)
+                               forecast_arn, forecast=forecast)
         # If the deletion is successful, flag holds value 0 else unsuccessful.
         print("delete forecast completed")
         return str(flag)
@@ -692,7 +778,8 @@ def delete_dataset_import_job_calling_function(region_name, service_name,
                                         algorithm_name, project, 
                                        aws_common_arn_prefix, 
                         target_dataset_name, target_dataset_import_job_name,
-        related_dataset_name = None, related_dataset_import_job_name = None):
+        related_dataset_name = None, related_dataset_import_job_name = None,
+        forecast=None):
 
     """Deleting dataset import job 
     Parameters: 
@@ -707,6 +794,8 @@ def delete_dataset_import_job_calling_function(region_name, service_name,
     argument9 (related_dataset_name [OPTIONAL): target dataset name as a string
     argument10 (related_dataset_import_job_name [OPTIONAL]): target datasetname
                                                                 as a string
+    argument11 (forecast [OPTIONAL]): Forecast client shared by the
+                        pipelines, created if None
 
     Returns: 0 on successful creation of the dataset(s). Else, error.
     """
@@ -728,10 +817,12 @@ def delete_dataset_import_job_calling_function(region_name, service_name,
                 related_dataset_import_job_name
             target_flag = delete_dataset_import_job(region_name, service_name,
                                                     run_time_stamp,
-                                    target_dataset_import_job_arn)
+                                    target_dataset_import_job_arn,
+                                    forecast=forecast)
             related_flag = delete_dataset_import_job(region_name, service_name,
                                                      run_time_stamp,
-                                        related_dataset_import_job_arn)
+                                        related_dataset_import_job_arn,
+                                        forecast=forecast)
             print ("delete dataset import -target and related completed")
             return (target_flag, related_flag)
             
@@ -739,7 +830,7 @@ def delete_dataset_import_job_calling_function(region_name, service_name,
         # If the deletion is successful, flag holds value 0 else unsuccessful.        
         target_flag = delete_dataset_import_job(region_name, service_name,
                                                 run_time_stamp,
-            target_dataset_import_job_arn)
+            target_dataset_import_job_arn, forecast=forecast)
         print("delete dataset import - target completed")
         return str(target_flag)
     except Exception as delete_dataset_import_job_calling_function_exception: 
@@ -751,7 +842,7 @@ def delete_dataset_import_job_calling_function(region_name, service_name,
                 str(delete_dataset_import_job_calling_function_exception))        
         return (str(delete_dataset_import_job_calling_function_exception))
     
-def forecast_process(run_data):
+def forecast_process(run_data, inputs=None, stop=None, forecast=None, s3=None):
 
     """Starting AWS forecast process
     Parameters:
@@ -759,6 +850,16 @@ def forecast_process(run_data):
             1) algorithm short name as substring - string
             2) run(project) name as a string
             3) run_timestamp as string
+    argument2 (inputs [OPTIONAL]): target and related data already read 
+                                    (dataframes), read from S3 if None
+    argument3 (stop [OPTIONAL]): threading.Event, once it is set the process
+                                    stops (CancelledError) at the start of
+                                    the next round or within the polling
+                                    interval of the Forecast job it waits for
+    argument4 (forecast [OPTIONAL]): Forecast client shared by the 
+                                    pipelines, one for the process if None
+    argument5 (s3 [OPTIONAL]): S3 client shared by the pipelines, one for
+                                    the process if None
     Returns: NA
     """
 
@@ -767,6 +868,12 @@ def forecast_process(run_data):
     project = run_data[1]
     alg = run_data[0]
     
+    # One client of each service for all the calls of the process
+    if forecast is None:
+        forecast = Session(region_name=con.region_name).client(\
+                                                service_name=con.service_name)
+    if s3 is None: s3 = client(con.aws_service1)
+    
     # Calling dataset group and dataset functions
     try:
         print("Start forecasting process on algorithm :"+str(alg)+" \
@@ -796,12 +903,14 @@ def forecast_process(run_data):
                 item_meta_dataset_import_job_name = 'item_meta_data_import'
             #aws_skun = read_csv(target_file)
             #aws_rel_skus = read_csv(related_file)
-            aws_skun = wr.s3.read_csv(target_file)
-            aws_rel_skus = wr.s3.read_csv(related_file)
-            aws_skun['item_id'] = aws_skun['item_id'].str.strip()
-            aws_skun['item_id'] = aws_skun['item_id'].astype(str)
-            aws_rel_skus['item_id'] = aws_rel_skus['item_id'].str.strip()
-            aws_rel_skus['item_id'] = aws_rel_skus['item_id'].astype(str)
+            # Typed artifacts (Parquet) of GlueJob3, item_id already
+            # stripped, see artifact_io
+            if inputs is None:
+                aws_skun = read_artifact(target_file)
+                aws_rel_skus = read_artifact(related_file)
+            else:
+                # Read once by the orchestrator for all the algorithms
+                aws_skun, aws_rel_skus = inputs[0].copy(), inputs[1].copy()
         except Exception as forecast_process_reading_analytical_csvs_exception:
             # writing the exception/error to the error log table 
             create_and_insert_error(run_time_stamp)                                    
@@ -828,41 +937,56 @@ def forecast_process(run_data):
 
         # Dataset Group and Dataset creations
         
-        print ("Dataset group creation #######################")
-        dgc_flag = create_dataset_group(con.region_name, con.service_name,
-                                        run_time_stamp,project,alg)
+        # Dataset group of the algorithm, plus the dataset group shared by
+        # the algorithms with the same inputs for round 1 (created by the
+        # first algorithm of the group)
+        shared_group = None
+        dataset_groups = [alg]
+        if con.dataset_group_mode == 'shared_round1':
+            shared_group = shared_group_name(alg)
+            if is_group_leader(alg): dataset_groups.append(shared_group)
+            print ("Round 1 on the shared dataset group", shared_group)
+        
+        for group_name in dataset_groups:
+            print ("Dataset group creation #######################", group_name)
+            dgc_flag = create_dataset_group(con.region_name, con.service_name,
+                                            run_time_stamp,project,group_name,
+                                            forecast=forecast)
 
-        if dgc_flag!=str(0): 
-            print("Dataset group creation ERROR @@@@@@@@@@@@@@@@@@@\n"+\
-                         str(dgc_flag))
+            if dgc_flag!=str(0): 
+                print("Dataset group creation ERROR @@@@@@@@@@@@@@@@@@@\n"+\
+                             str(dgc_flag))
             
-            raise Exception('error :'+str(dgc_flag))
-        else:
-            print ("Dataset creation  #######################")
-            if ('cnn_qr' in alg or 'deep_ar_plus' in alg) and (\
-                                    con.item_metadataset_name !=""): 
-                dc_flag = create_dataset(con.region_name, con.service_name,
-                                         run_time_stamp,
-                                         alg, project, 
-                                         con.target_dataset_name, 
-                            con.related_dataset_name,con.item_metadataset_name)
+                raise Exception('error :'+str(dgc_flag))
+            else:
+                print ("Dataset creation  #######################")
+                if ('cnn_qr' in alg or 'deep_ar_plus' in alg) and (\
+                                        con.item_metadataset_name !=""): 
+                    dc_flag = create_dataset(con.region_name, con.service_name,
+                                             run_time_stamp,
+                                             group_name, project, 
+                                             con.target_dataset_name, 
+                                con.related_dataset_name,con.item_metadataset_name,
+                                forecast=forecast)
                 
-            elif 'cnn_qr' in alg or 'prophet' in alg or 'deep_ar_plus' in alg: 
-                dc_flag = create_dataset(con.region_name, con.service_name,
-                                         run_time_stamp,
-                                           alg, project, 
-                            con.target_dataset_name, con.related_dataset_name)
+                elif 'cnn_qr' in alg or 'prophet' in alg or 'deep_ar_plus' in alg: 
+                    dc_flag = create_dataset(con.region_name, con.service_name,
+                                             run_time_stamp,
+                                               group_name, project, 
+                                con.target_dataset_name, con.related_dataset_name,
+                                forecast=forecast)
                 
-            else: dc_flag = create_dataset(con.region_name, con.service_name,
-                                           run_time_stamp,
-                                            alg, project, 
-                        con.target_dataset_name, related_dataset_name="")
+                else: dc_flag = create_dataset(con.region_name, con.service_name,
+                                               run_time_stamp,
+                                                group_name, project, 
+                            con.target_dataset_name, related_dataset_name="",
+                            forecast=forecast)
             
-            if dc_flag!=str(0):
-                print ("Dataset creation ERROR @@@@@@@@@@@@@@@@@@@\n"+\
-                             str(dc_flag))
-                print ('error :'+str(dc_flag))
-                sys.exit(1)
+                if dc_flag!=str(0):
+                    print ("Dataset creation ERROR @@@@@@@@@@@@@@@@@@@\n"+\
+                                 str(dc_flag))
+                    print ('error :'+str(dc_flag))
+                    sys.exit(1)
         
     except Exception as forecast_process_before_for_loop_exception:
         # writing the exception/error to the error log table 
@@ -875,11 +999,19 @@ def forecast_process(run_data):
     no_of_rolling_forecasts = \
                 ceil(con.total_forecast_period / con.forecast_horizon)
     
+    # Paths of the target and related data imported in the current round,
+    # slices shared between the algorithms (content_store)
+    data_paths = {}
+    
     # Iterate for long forecasting
     for i in range(1,no_of_rolling_forecasts+2):
         
         print ("Begin for loop #######################")
         print ('### ROUND '+str(i)+' ###')
+        
+        # Cancelled by the orchestrator
+        if (stop is not None) and stop.is_set():
+            raise CancelledError(alg + ' cancelled before round ' + str(i))
 
         target_dataset_import_job_name = 'target_data_import'+'r'+str(i)
         related_dataset_import_job_name = 'related_data_import'+'r'+str(i)
@@ -902,12 +1034,11 @@ def forecast_process(run_data):
 #                                  + project + '_' + alg + '_'+ \
 #                                  target_file_name,
 #                                  index=False)
-                wr.s3.to_csv(df=target_ts_data,
-                                 path='s3://' + con.bucket_name + \
+                data_paths['target'] = store_payload(target_ts_data,
+                                 's3://' + con.bucket_name + \
                                 '/' + 'GlueScripts4/' + con.processed_folder_name + '/' \
                                  + project + '_' + alg + '_'+ \
-                                 target_file_name,
-                                 index=False)
+                                 target_file_name, s3=s3)
                 
                 #target_ts_data.to_csv('s3://' + con.bucket_name + \
                 #            '/' + con.processed_folder_name + '/' \
@@ -931,12 +1062,11 @@ def forecast_process(run_data):
 #                                             + project + '_' + alg + '_'+ \
 #                                             related_file_name,
 #                                      index=False)
-                    wr.s3.to_csv(df=related_ts_data,
-                                     path='s3://' + con.bucket_name + '/' + 'GlueScripts4/' \
+                    data_paths['related'] = store_payload(related_ts_data,
+                                     's3://' + con.bucket_name + '/' + 'GlueScripts4/' \
                                             + con.processed_folder_name + '/' \
                                             + project + '_' + alg + '_'+ \
-                                            related_file_name,
-                                     index=False)
+                                            related_file_name, s3=s3)
                     print ("target and related data written to files")
     
             except Exception as for_loop_it1_exception:
@@ -965,12 +1095,11 @@ def forecast_process(run_data):
 #                                         + project + '_' + alg + '_'+ \
 #                                         target_file_name,
 #                                  index=False)
-                wr.s3.to_csv(df=target_ts_data,
-                                 path='s3://' + con.bucket_name + '/' + 'GlueScripts4/' + \
+                data_paths['target'] = store_payload(target_ts_data,
+                                 's3://' + con.bucket_name + '/' + 'GlueScripts4/' + \
                                         con.processed_folder_name + '/' \
                                         + project + '_' + alg + '_'+ \
-                                        target_file_name,
-                                 index=False)
+                                        target_file_name, s3=s3)
                 
                 #target_ts_data.to_csv('s3://' + con.bucket_name + '/' + \
                 #                            con.processed_folder_name + '/' \
@@ -989,12 +1118,11 @@ def forecast_process(run_data):
 #                                             + project + '_' + alg + '_'+ \
 #                                             related_file_name,
 #                                      index=False)
-                    wr.s3.to_csv(df=related_ts_data,
-                                     path='s3://' + con.bucket_name + '/' + 'GlueScripts4/' + \
+                    data_paths['related'] = store_payload(related_ts_data,
+                                     's3://' + con.bucket_name + '/' + 'GlueScripts4/' + \
                                             con.processed_folder_name + '/' \
                                             + project + '_' + alg + '_'+ \
-                                            related_file_name,
-                                     index=False)
+                                            related_file_name, s3=s3)
                   
                     #print (related_ts_data)
                     #related_ts_data.to_csv('s3://' + con.bucket_name + '/' + \
@@ -1030,12 +1158,11 @@ def forecast_process(run_data):
 #                                            + project + '_' + alg + '_'+\
 #                                            related_file_name,
 #                                      index=False)
-                    wr.s3.to_csv(df=related_ts_data,
-                                     path='s3://' + con.bucket_name + '/' + 'GlueScripts4/' + \
+                    data_paths['related'] = store_payload(related_ts_data,
+                                     's3://' + con.bucket_name + '/' + 'GlueScripts4/' + \
                                            con.processed_folder_name + '/' \
                                            + project + '_' + alg + '_'+\
-                                           related_file_name,
-                                     index=False)
+                                           related_file_name, s3=s3)
                     
                     #related_ts_data.to_csv('s3://' + con.bucket_name + '/' + \
                     #                       con.processed_folder_name + '/' \
@@ -1054,11 +1181,27 @@ def forecast_process(run_data):
         # Calling AWS dataset import method
         try:
             print ("Importing #######################")
-            if ('cnn_qr' in alg or 'deep_ar_plus' in alg) and \
-                (con.item_metadataset_name !="") and (i==1) :
+            
+            # Round 1 imported once per shared dataset group, by its first
+            # algorithm, the item meta data then imported in round 2 into
+            # the algorithm's own dataset group
+            import_group = alg
+            if (shared_group != None) and (i==1): import_group = shared_group
+            
+            if (shared_group != None) and (i==1) and not is_group_leader(alg):
+                flag = wait_for_shared_import(con.region_name, con.service_name,
+                                        project, alg,
+                                        {'target':target_dataset_import_job_name,
+                                         'related':related_dataset_import_job_name,
+                                         'item':'item_meta_data_import'},
+                                         forecast=forecast, stop=stop)
+            
+            elif ('cnn_qr' in alg or 'deep_ar_plus' in alg) and \
+                (con.item_metadataset_name !="") and \
+                ((i==1) or ((shared_group != None) and (i==2))) :
                 flag = import_dataset(con.region_name, con.service_name,
                                       run_time_stamp,
-                                alg, project,
+                                import_group, project,
                                con.aws_common_arn_prefix,
                                con.target_dataset_name,
                                target_dataset_import_job_name,
@@ -1071,13 +1214,15 @@ def forecast_process(run_data):
                                related_dataset_import_job_name,
                                con.item_metadataset_name,
                                item_file_name,
-                               item_meta_dataset_import_job_name
+                               item_meta_dataset_import_job_name,
+                               data_paths=data_paths,
+                               forecast=forecast, stop=stop
                                )
                 
             elif 'cnn_qr' in alg or 'prophet' in alg or 'deep_ar_plus' in alg:
                 flag = import_dataset(con.region_name, con.service_name,
                                       run_time_stamp,
-                                      alg, project,
+                                      import_group, project,
                                con.aws_common_arn_prefix,
                                con.target_dataset_name,
                                target_dataset_import_job_name,
@@ -1087,20 +1232,24 @@ def forecast_process(run_data):
                                con.timestamp_format,
                                con.related_dataset_name,
                                related_file_name,
-                               related_dataset_import_job_name
+                               related_dataset_import_job_name,
+                               data_paths=data_paths,
+                               forecast=forecast, stop=stop
                                )
                 
             else:
                 flag = import_dataset(con.region_name, con.service_name,
                                       run_time_stamp,
-                                      alg, project,
+                                      import_group, project,
                                con.aws_common_arn_prefix,
                                con.target_dataset_name,
                                target_dataset_import_job_name,
                                target_file_name,
                                con.processed_folder_name,
                                con.bucket_name,
-                               con.timestamp_format
+                               con.timestamp_format,
+                               data_paths=data_paths,
+                               forecast=forecast, stop=stop
                                )
                 
             
@@ -1127,7 +1276,7 @@ def forecast_process(run_data):
                 
                 model_flag = create_predictor(con.region_name,con.service_name,
                                               run_time_stamp,
-                                              hpo_flag, alg, 
+                                              hpo_flag, import_group, 
                                               con.aws_common_arn_prefix,
                                               project, 
                                               con.dataset_group_name,
@@ -1136,19 +1285,20 @@ def forecast_process(run_data):
                                               con.forecast_frequency,
                                               short_name_of_the_algorithm,
                                               con.number_of_back_test_windows,
-                                              con.back_test_window_offset)
+                                              con.back_test_window_offset,
+                                              forecast=forecast, stop=stop)
 
                 print ("############",model_flag)
                 if 'Status : IN_PROGRESS' in str(model_flag): 
                     print ("Modelling Error -- Status : IN_PROGRESS\
                                  @@@@@@@@@@@@@@@@@@ "+str(model_flag))
-                    sleep(1200)
+                    wait_or_stop(stop, 1200)
                     print ("Running Modelling again #######################")
                     
                     model_flag = create_predictor(con.region_name,
                                                 con.service_name,
                                                 run_time_stamp,
-                                                hpo_flag, alg, 
+                                                hpo_flag, import_group, 
                                                 con.aws_common_arn_prefix, 
                                                 project, 
                                                 con.dataset_group_name,\
@@ -1157,7 +1307,8 @@ def forecast_process(run_data):
                                                 con.forecast_frequency,\
                                              short_name_of_the_algorithm, 
                                              con.number_of_back_test_windows, 
-                                             con.back_test_window_offset)
+                                             con.back_test_window_offset,
+                                             forecast=forecast, stop=stop)
                 print ("############",model_flag)    
                 if model_flag!=str(0): 
                     # writing the exception/error to the error log table 
@@ -1185,12 +1336,13 @@ def forecast_process(run_data):
                                        alg, con.aws_common_arn_prefix,
                                        project,
                                        predictor_name,
-                                       forecast_name,forecast_types) #Added forecast_types
+                                       forecast_name,forecast_types, #Added forecast_types
+                                       forecast=forecast, stop=stop)
             print ("############",fct_flag)
             if 'Status : IN_PROGRESS' in str(fct_flag): 
                 print ("Forecast Error -- Status : IN_PROGRESS @@@@@@@\
                              @@@@@@@@@@@ "+str(fct_flag))
-                sleep(1200)
+                wait_or_stop(stop, 1200)
                 print ("Running Forecasting again #######################")
                 print ("Running Forecasting again ####################")
                 
@@ -1198,7 +1350,8 @@ def forecast_process(run_data):
                 fct_flag = create_forecast(con.region_name,con.service_name,
                                            run_time_stamp,
                     alg, con.aws_common_arn_prefix,
-                                project, predictor_name, forecast_name,forecast_types) #Added forecast_types
+                                project, predictor_name, forecast_name,forecast_types, #Added forecast_types
+                                       forecast=forecast, stop=stop)
             print ("############",fct_flag)    
             if fct_flag!=str(0): 
                 # writing the exception/error to the error log table 
@@ -1225,7 +1378,8 @@ def forecast_process(run_data):
                             con.bucket_name,
                             forecast_name,
                             forecast_export_name,
-                            con.forecast_output_folder_name)
+                            con.forecast_output_folder_name,
+                            forecast=forecast, s3=s3, stop=stop)
             
             if export_flag!=str(0): 
                 # writing the exception/error to the error log table 
@@ -1251,7 +1405,8 @@ def forecast_process(run_data):
                                            forecast_export_name,
                                            con.processed_folder_name,
                                            target_file_name,
-                                           aws_skun)
+                                           aws_skun,
+                                           data_paths=data_paths, s3=s3)
             print ("############",target_append_flag)
             if str(target_append_flag)!=str(0):
                 # writing the exception/error to the error log table 
@@ -1276,7 +1431,7 @@ def forecast_process(run_data):
                                     con.service_name,run_time_stamp,alg, 
                                     project, con.aws_common_arn_prefix,
                                    forecast_name,
-                                   forecast_export_name)
+                                   forecast_export_name, forecast=forecast)
             print ("############",delete_fct_export_flag)
             if delete_fct_export_flag!=str(0): 
                 # writing the exception/error to the error log table 
@@ -1298,7 +1453,8 @@ def forecast_process(run_data):
             
             delete_fct_flag = delete_forecast_calling_function(con.region_name,
                             con.service_name, run_time_stamp,alg, project,\
-                                    con.aws_common_arn_prefix,forecast_name)
+                                    con.aws_common_arn_prefix,forecast_name,
+                                    forecast=forecast)
             print ("############",delete_fct_flag)
             if delete_fct_flag!=str(0): 
                 # writing the exception/error to the error log table 
@@ -1328,7 +1484,8 @@ def forecast_process(run_data):
                                        con.target_dataset_name, 
                                        target_dataset_import_job_name, 
                                        con.related_dataset_name, 
-                                       related_dataset_import_job_name)
+                                       related_dataset_import_job_name,
+                                       forecast=forecast)
                     print ("############",delete_dataset_target_flag, 
                            delete_dataset_related_flag)
                     if delete_dataset_target_flag!=str(0) or \
@@ -1344,7 +1501,8 @@ def forecast_process(run_data):
                                     run_time_stamp, alg, project, \
                                        con.aws_common_arn_prefix, 
                                        con.target_dataset_name, 
-                                       target_dataset_import_job_name,)
+                                       target_dataset_import_job_name,
+                                       forecast=forecast)
                     print ("############",delete_dataset_target_flag)
                     if delete_dataset_target_flag!=str(0): 
                         print ("Delete dataset_flag Error @@@@@@ "+\
@@ -1363,16 +1521,16 @@ def forecast_process(run_data):
         print ("MAPE OUTPUT AND DATABASE LOADING ##################")
 
         
-        # Reading the forecast output from S3
-        s3 = resource("s3")
-        s3_bucket = s3.Bucket(con.bucket_name)
+        # Reading the forecast output from S3, with the shared S3 client
 #         directory = con.forecast_output_folder_name + '/' + project + '_' \
 #                             + alg + '/mape_input/'
         directory = 'GlueScripts4/' + con.forecast_output_folder_name + '/' + project + '_' \
                             + alg + '/mape_input/'
         
-        files_in_s3 = [f.key.split(directory)[1] \
-                    for f in s3_bucket.objects.filter(Prefix=directory).all()]
+        files_in_s3 = [f['Key'].split(directory)[1] \
+                    for page in s3.get_paginator('list_objects_v2').paginate(\
+                                        Bucket=con.bucket_name, Prefix=directory) \
+                    for f in page.get('Contents', [])]
         
         csv_file_names = [csv for csv in files_in_s3 if csv.endswith('csv')]
         
@@ -1421,7 +1579,9 @@ def forecast_process(run_data):
                 project + '_' + alg + '_'+ con.target_file_name
         
         #df_target = read_csv(target_data_file)
-        df_target = wr.s3.read_csv(target_data_file)
+        # Last target data of the algorithm, in its payload format
+        # (stored slice of the content store, if enabled)
+        df_target = read_payload(data_paths.get('target', target_data_file))
         
         df_target_sku = df_target
         
@@ -1494,7 +1654,6 @@ def forecast_process(run_data):
         
         # Creating the output directory in S3
         try:
-            s3 = client('s3')
             s3.put_object(Bucket=con.bucket_name, Key=(final_output_directory))
             
         except Exception as mape_output_directory_creation_exception: 
@@ -21,9 +21,9 @@
 # 1. Import packages and functions
 
 import boto3
-import snowflake.connector as snow
 import processed_configuration as cfg
 from error_logging import create_and_insert_error
+from snowflake_db_connection import connect_to_db, get_login_stats
 from kfs_get_latest_run_id import get_latest_run_id
 import sys
 from awsglue.utils import getResolvedOptions
@@ -38,52 +38,7 @@ sns_Topic_Arn = args['SNS_TOPIC_ARN']
 DATE = datetime. now(). strftime("%Y%m%d_%H%M%S") 
 
 
-# 2. Get DB secret keys from AWS Secrets Manager
-
-def get_secret():
-    """Get snowflake secret keys and values from AWS secrets manager.
-
-    Returns
-    -------
-    dict
-        Secret keys and values.
-
-    How it works
-    ------------
-        1. Create a Secrets Manager client using boto3 for the 
-        given service and region name.
-        2. Then get the secret values using the client 
-        for the given secret and return it.
-
-    """
-    try:
-        print("Inside... get_secret()")
-
-        # Get service, region and secret name from config file
-        service_name = cfg.service_name
-        region_name = cfg.region_name
-        secret_name = cfg.secret_name
-
-        # Create a Secrets Manager client
-        session = boto3.session.Session()
-        client = session.client(
-                                service_name = service_name,
-                                region_name = region_name
-                                )
-
-        # Get secret keys and values and return the dict
-        get_secret_value_response = client.get_secret_value(
-            SecretId = secret_name
-        )
-        
-        print("Exiting... get_secret()")
-        return get_secret_value_response
-    except:
-        print("Error occured inside get_secret()")
-        raise
-
-
-# 3. Execute champion rank stored procedure
+# 2. Execute champion rank stored procedure
 
 def main():
     """Execute champion rank stored procedure to calculate
@@ -102,30 +57,9 @@ def main():
         conn = None
         cur = None
         
-        # Get the secret keys from Secrets Manager
-        response = get_secret()
-        secret_string = eval(response['SecretString']) 
-        pwd = secret_string[cfg.PASSWORD]
-        user = secret_string[cfg.USERNAME]
-        account = secret_string[cfg.ACCOUNT]
-        warehouse = secret_string[cfg.WAREHOUSE]
-        database = secret_string[cfg.DB]
-        schema = secret_string[cfg.SCHEMA]
-        #role = secret_string[cfg.key7]
-        
-        # Establish connection with the Snowflake database
-        conn = snow.connect(user=user,
-                            account=account,
-                            password=pwd,
-                            database=database,
-                            schema=schema,
-                            warehouse=warehouse
-                            # role=role
-                            )
-                        
-        # Call the champ_rank() stored procedure 
-        # using the Snowflake connection's cursor 
-        cur = conn.cursor()
+        # Establish connection with the Snowflake database 
+        # (the pooled connection of this process)
+        cur, conn = connect_to_db()
         
         # Initializing run_time_stamp (run id) as empty string
         run_time_stamp = ""
@@ -162,6 +96,7 @@ def main():
         # Close the database connection
         if conn is not None:
             print("Closing the connection")
+            print("Snowflake login stats :", get_login_stats())
             conn.close() 
 
 
@@ -22,6 +22,7 @@ SCHEMA = "SCHEMA"
 
 # Service Name
 service_name = "secretsmanager"
+aws_service2 = service_name
 
 # Secret name
 secret_name = "nvsmdvdf01"
@@ -29,6 +30,12 @@ secret_name = "nvsmdvdf01"
 # Region
 region_name = "us-east-1"
 
+# Keep the pooled Snowflake session alive for the whole job
+db_session_keep_alive = True
+
+# Seconds the parsed DB secret is kept in memory
+secret_cache_ttl_seconds = 3600
+
 # PROCESSED_AA_SHIPMENTS_TARGET queries
 prsd_KFS_orders_table = "KFS_PROCESSED_ORDERS_TARGET" 
 sel_run_tmp_kfs_order = "select RUN_TIME_STAMP from " + prsd_KFS_orders_table
@@ -0,0 +1,153 @@
+# Cached resolution of the secrets in AWS Secrets Manager
+#
+# Python Version: 3.6.10
+#
+# Description : Get the DB secret keys and values from AWS Secrets Manager
+#               once and keep them in memory for a configurable time
+#
+# Coding Steps :
+#               1. Get the secret from Secrets Manager on a cache miss
+#               2. Parse the secret string (JSON, no eval)
+#               3. Serve the parsed values from memory until the TTL expires
+#               4. Count cache hits and misses
+#
+# The cache lives in the process memory. When it is primed in the parent
+# before the algorithm processes are forked, every child starts with the
+# parsed secret and never calls Secrets Manager.
+
+
+# 1. Import packages and functions
+
+import json
+from ast import literal_eval
+from time import time
+from threading import Lock
+import boto3
+
+import processed_configuration as con
+
+
+# Parsed secrets, keyed by secret name : (expiry time, values)
+_secret_cache = {}
+_secret_lock = Lock()
+
+# Cache statistics of this process
+_secret_stats = {'hits':0, 'misses':0}
+
+
+# 2. Get DB secret keys from AWS Secrets Manager
+
+def get_secret(secret_name=None):
+    """Get snowflake secret keys and values from AWS secrets manager.
+
+    Parameters
+    ----------
+    secret_name : string, optional
+        Secret name, the one in the config file if None.
+
+    Returns
+    -------
+    dict
+        Secret keys and values.
+
+    How it works
+    ------------
+        1. Create a Secrets Manager client using boto3 for the
+        given service and region name.
+        2. Then get the secret values using the client
+        for the given secret and return it.
+
+    """
+    try:
+        print("Inside... get_secret()")
+
+        # Get service, region and secret name from config file
+        service_name = con.aws_service2
+        region_name = con.region_name
+        if secret_name is None:
+            secret_name = con.secret_name
+
+        # Create a Secrets Manager client
+        session = boto3.session.Session()
+        client = session.client(
+                                service_name = service_name,
+                                region_name = region_name
+                                )
+
+        # Get secret keys and values and return the dict
+        get_secret_value_response = client.get_secret_value(
+            SecretId = secret_name
+        )
+
+        print("Exiting... get_secret()")
+        return get_secret_value_response
+    except Exception as get_secret_function_exception:
+        print("Error occured inside get_secret()",str(get_secret_function_exception))
+        raise
+
+
+# 3. Parsing the secret string
+
+def parse_secret_string(secret_string):
+    """Parse the secret string to a dict.
+
+    The secret is stored as JSON. A Python dict literal (which the
+    former eval() accepted) is parsed with literal_eval, never executed.
+
+    """
+    try:
+        return json.loads(secret_string)
+    except ValueError:
+        return literal_eval(secret_string)
+
+
+# 4. Cached secret values
+
+def get_secret_values(secret_name=None, ttl_seconds=None):
+    """Parsed secret keys and values, from memory when available.
+
+    Parameters
+    ----------
+    secret_name : string, optional
+        Secret name, the one in the config file if None.
+    ttl_seconds : int, optional
+        Seconds the values are kept, the config value if None.
+
+    Returns
+    -------
+    dict
+        Secret keys and values.
+
+    """
+    if secret_name is None:
+        secret_name = con.secret_name
+    if ttl_seconds is None:
+        ttl_seconds = con.secret_cache_ttl_seconds
+
+    with _secret_lock:
+        cached = _secret_cache.get(secret_name)
+        if (cached is not None) and (cached[0] > time()):
+            _secret_stats['hits'] += 1
+            return dict(cached[1])
+
+        _secret_stats['misses'] += 1
+        response = get_secret(secret_name)
+        values = parse_secret_string(response['SecretString'])
+        _secret_cache[secret_name] = (time() + ttl_seconds, values)
+        return dict(values)
+
+
+def prime_secret_cache(secret_name=None):
+    """Load the secret before forking, so the children inherit it."""
+    get_secret_values(secret_name)
+
+
+def get_secret_cache_stats():
+    """Number of cache hits and misses of this process."""
+    return dict(_secret_stats)
+
+
+def clear_secret_cache():
+    """Forget the cached secrets, e.g. after a password rotation."""
+    with _secret_lock:
+        _secret_cache.clear()
@@ -23,11 +23,14 @@
 # Approximate time to execute the code: 2 mins
 
 # Loading Libraries..
-from pandas import DataFrame, to_datetime
+from pandas import DataFrame
 import processed_configuration as con
 from error_logging import create_and_insert_error
 from snowflake_db_connection import connect_to_db
 from kfs_get_latest_run_id import get_latest_run_id
+from snowflake_fetch import fetch_frame
+from artifact_io import read_artifact
+from kfs_period_codec import encode_periods
 from datetime import datetime
 from pytz import timezone
 import awswrangler as wr
@@ -65,13 +68,11 @@ def champion_alteration():
         sys.exit(1)
     
         
-    cur.execute(con.latest_run_time_stamp_data)
-    result=cur.fetchall()
-    
-    
-    df = DataFrame(result, columns=['RUN_TIME_STAMP', 'ITEM_ID', \
+    # Latest run's forecasts, fetched from the Arrow result batches
+    df = fetch_frame(conn, con.latest_run_time_stamp_data)
+    df.columns = ['RUN_TIME_STAMP', 'ITEM_ID', \
                                 'MONTH_YEAR', 'FORECAST_METHOD', \
-        'FORECAST_VALUE', 'TEST_MAPE','TEST_MAD', 'UPDATE_TIME_STAMP','CHAMP_RANK', 'LONG_FORECAST'])
+        'FORECAST_VALUE', 'TEST_MAPE','TEST_MAD', 'UPDATE_TIME_STAMP','CHAMP_RANK', 'LONG_FORECAST']
 
 
     # 2. For all algorithms, identify if there is a flat forecast over last 15 
@@ -100,9 +101,8 @@ def champion_alteration():
         from pandas import read_csv
         target_file = 's3://' + con.bucket_name + '/' + 'GlueScripts4/' + \
                     con.source_folder + '/' + con.target_file_name
-        aws_skun = wr.s3.read_csv(target_file)
-        aws_skun['item_id'] = aws_skun['item_id'].str.strip()
-        aws_skun['item_id'] = aws_skun['item_id'].astype(str)
+        # Typed artifact (Parquet) of GlueJob3, see artifact_io
+        aws_skun = read_artifact(target_file)
         
         # Get all PF/Item whose average volume is <= configurable value
         target_data_volume = aws_skun.groupby('item_id')\
@@ -269,8 +269,8 @@ def champion_alteration():
                            str(pf))
                     continue
                     
-                df_true_champion = df_true_champion.iloc[to_datetime(\
-                        df_true_champion.MONTH_YEAR, format='%b-%Y').argsort()]
+                df_true_champion = df_true_champion.iloc[encode_periods(\
+                        df_true_champion.MONTH_YEAR).argsort()]
                 df_hybrid_model = df_false_champion
                 df_hybrid_model.FORECAST_VALUE[3:6] = \
                     df_false_champion.FORECAST_VALUE[3:6]
@@ -109,8 +109,9 @@ def create_and_insert_error(run_time_stamp = ""):
         # Insert the exception inside the error log table
         if(cur != ""):
             cur.executemany(insert_qry, data)
+            
+            # Only the cursor is closed, the pooled connection stays open
             cur.close()
-            conn.close()
         else:
             print("Cursor object is empty.")
         
@@ -26,9 +26,8 @@
 
 # 1. Import packages and functions
 
-from pandas import read_sql
-
 import processed_configuration as con
+from snowflake_fetch import fetch_frame
 from error_logging import create_and_insert_error
 
 
@@ -64,7 +63,7 @@ def get_latest_run_id(cur, conn):
         run_time_stamp = ""
         
         # Select all run timestamps from the processed shipments table
-        df_all_run_ts = read_sql(con.sel_run_tmp_kfs_order, conn)
+        df_all_run_ts = fetch_frame(conn, con.sel_run_tmp_kfs_order)
         list_all_run_ts = list(df_all_run_ts.RUN_TIME_STAMP.unique())
 
         # Sort run timestamps in desc order
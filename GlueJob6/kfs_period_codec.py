@@ -0,0 +1,141 @@
+# Period (Mon-yyyy) codec
+#
+# Python Version: 3.8.12
+#
+# Description : Convert the Mon-yyyy period labels to an integer month
+#               index (year*12 + month) and back, vectorized
+#
+# Coding Steps :
+#               1. Convert each unique label once, using a cached lookup
+#               2. Map the codes back to the rows
+#               3. Month arithmetic directly on the codes
+#               4. Conversion of the codes to and from dates
+
+
+# 1. Import built-in packages and user defined functions
+
+from functools import lru_cache
+from calendar import month_abbr
+from numpy import asarray, int64
+from pandas import factorize
+
+
+# Mmm abbreviation to month number (Jan -> 1, ..., Dec -> 12)
+MONTH_NUMBER = {mon: i for i, mon in enumerate(month_abbr) if mon != ""}
+
+# Month index of 1970-01, the origin of datetime64[M]
+EPOCH_CODE = 1970*12 + 1
+
+
+# 2. Conversion of a single label
+
+@lru_cache(maxsize=None)
+def period_to_code(period):
+    """Month index (year*12 + month) of a Mon-yyyy label.
+
+    Parameters
+    ----------
+    period : string
+        Mon-yyyy, e.g. Jan-2023.
+
+    Returns
+    -------
+    int
+        Month index, e.g. 2023*12 + 1.
+
+    """
+    try:
+        return int(period[-4:])*12 + MONTH_NUMBER[period[:3]]
+    except (KeyError, ValueError, TypeError):
+        raise ValueError("Period not in the Mon-yyyy format : " + str(period))
+
+
+@lru_cache(maxsize=None)
+def code_to_period(code):
+    """Mon-yyyy label of a month index."""
+    year, month = divmod(int(code) - 1, 12)
+    return month_abbr[month + 1] + "-" + str(year)
+
+
+# 3. Vectorized conversion of the labels
+
+def encode_periods(periods):
+    """Month index of each Mon-yyyy label.
+
+    Each unique label is parsed once, the codes are then mapped
+    back to the rows.
+
+    Parameters
+    ----------
+    periods : series or list
+        Mon-yyyy labels.
+
+    Returns
+    -------
+    array
+        Month index (int64) of each label.
+
+    """
+    labels, uniques = factorize(asarray(periods, dtype=object))
+    if (labels < 0).any():
+        raise ValueError("Period not in the Mon-yyyy format : None")
+
+    codes = asarray([period_to_code(period) for period in uniques], dtype=int64)
+    return codes[labels]
+
+
+def decode_periods(codes):
+    """Mon-yyyy label of each month index.
+
+    Parameters
+    ----------
+    codes : series or array
+        Month index.
+
+    Returns
+    -------
+    array
+        Mon-yyyy labels.
+
+    """
+    labels, uniques = factorize(asarray(codes, dtype=int64))
+    periods = asarray([code_to_period(code) for code in uniques], dtype=object)
+    return periods[labels]
+
+
+# 4. Month arithmetic on the codes
+
+def add_months(codes, months):
+    """Shift the month index by a number of months (negative to go back)."""
+    return asarray(codes, dtype=int64) + months
+
+
+# 5. Conversion of the codes to and from dates
+
+def codes_to_dates(codes):
+    """First day of the month of each month index, as datetime64[ns]."""
+    months = (asarray(codes, dtype=int64) - EPOCH_CODE).astype('datetime64[M]')
+    return months.astype('datetime64[ns]')
+
+
+def dates_to_codes(dates):
+    """Month index of each date.
+
+    Parameters
+    ----------
+    dates : series or array
+        Dates (datetime64).
+
+    Returns
+    -------
+    array
+        Month index (int64) of each date.
+
+    """
+    months = asarray(dates, dtype='datetime64[ns]').astype('datetime64[M]')
+    return months.astype(int64) + EPOCH_CODE
+
+
+def periods_to_dates(periods):
+    """First day of the month of each Mon-yyyy label, as datetime64[ns]."""
+    return codes_to_dates(encode_periods(periods))
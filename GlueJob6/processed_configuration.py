@@ -14,6 +14,7 @@
 # To connect ot Snowflake
 
 # Service Name
+aws_service1 = "s3"
 aws_service2 = "secretsmanager"
 
 # Secret name for prod
@@ -27,6 +28,12 @@ WAREHOUSE = "WAREHOUSE"
 DB = "DB"
 SCHEMA = "SCHEMA"
 
+# Keep the pooled Snowflake session alive for the whole job
+db_session_keep_alive = True
+
+# Seconds the parsed DB secret is kept in memory
+secret_cache_ttl_seconds = 3600
+
 # AWS region 
 region_name = "us-east-1"
 
@@ -75,3 +82,13 @@ insert_error_log = "INSERT INTO KFS_ERROR_LOG( \
                                           EXCEPTION_MESSAGE, \
                                           MESSAGE \
                                          ) VALUES (%s,%s,%s,%s,%s,%s)" 
+
+# Query results fetched as dataframes from the connector's Arrow result
+# batches (False = rows fetched as tuples with fetchall)
+arrow_fetch_enabled = True
+
+# Format of the target and related datasets exchanged between the jobs
+# in Analytical_outputs : 'parquet' (item_id dictionary encoded, timestamp
+# as a date, see artifact_io) or 'csv'. The item meta data and the
+# datasets imported by Amazon Forecast stay CSV
+artifact_format = 'parquet'
@@ -5,8 +5,9 @@
 # Description : Connect to snowflake DB
 #
 # Coding Steps :
-#               1. Get the DB credentials from the config file
-#               2. Connect to DB using the credentials
+#               1. Get the DB credentials from the (cached) secret
+#               2. Connect to DB using the credentials, or reuse the pooled
+#                  connection of this process for the same role & warehouse
 #               3. Return the created cursor and connection
 #
 # Created By: Ranjan Kumar
@@ -22,65 +23,118 @@
 
 # 1. Import packages and functions
 
+import os
+import atexit
+from time import time
+from threading import Lock
+from contextlib import contextmanager
 import snowflake.connector as snow
 import processed_configuration as con
 from error_logging import create_and_insert_error
-import boto3
+from secret_cache import get_secret_values, get_secret_cache_stats
 
-# 2. Get DB secret keys from AWS Secrets Manager
 
-def get_secret():
-    """Get snowflake secret keys and values from AWS secrets manager.
+# Open connections, keyed by (role, warehouse, process id). A forked 
+# algorithm process never reuses the connection of its parent.
+_connection_pool = {}
+_pool_lock = Lock()
+
+# Login statistics of this process
+_login_stats = {'logins':0, 'reuses':0, 'login_seconds':0.0}
+
+
+# 2. Creation of cursor and connection to connect to database
+
+def _login(role=None, warehouse=None):
+    """Log in to snowflake with the secret values.
+
+    Parameters
+    ----------
+    role : string, optional
+        Role of the session, the user's default role if None.
+    warehouse : string, optional
+        Warehouse of the session, the one in the secret if None.
 
     Returns
     -------
-    dict
-        Secret keys and values.
+    object
+        Connection object.
 
-    How it works
-    ------------
-        1. Create a Secrets Manager client using boto3 for the 
-        given service and region name.
-        2. Then get the secret values using the client 
-        for the given secret and return it.
+    """
+    start = time()
+
+    # Get the secret keys from Secrets Manager (cached)
+    secret_string = get_secret_values()
+    
+    user = secret_string[con.USERNAME]
+    pwd = secret_string[con.PASSWORD]
+    account = secret_string[con.ACCOUNT]
+    database = secret_string[con.DB]
+    schema = secret_string[con.SCHEMA]
+    if warehouse is None:
+        warehouse = secret_string[con.WAREHOUSE]
+
+    connect_args = {}
+    if role is not None:
+        connect_args['role'] = role
+    
+    # Connection creation using the snoflake secret values, the session 
+    # is kept alive for the whole job
+    connection = snow.connect(
+                              account = account,
+                              user = user,
+                              password = pwd,
+                              database = database,
+                              schema = schema,
+                              warehouse = warehouse,
+                              client_session_keep_alive = con.db_session_keep_alive,
+                              **connect_args
+                              )
+
+    _login_stats['logins'] += 1
+    _login_stats['login_seconds'] += time() - start
+    return connection
+
+
+def get_connection(role=None, warehouse=None):
+    """Pooled connection of this process for the role and warehouse.
+
+    Parameters
+    ----------
+    role : string, optional
+        Role of the session.
+    warehouse : string, optional
+        Warehouse of the session.
+
+    Returns
+    -------
+    object
+        Open connection object, created on the first call only.
 
     """
-    try:
-        print("Inside... get_secret()")
-
-        # Get service, region and secret name from config file
-        service_name = con.aws_service2
-        region_name = con.region_name
-        secret_name = con.secret_name
-
-        # Create a Secrets Manager client
-        session = boto3.session.Session()
-        client = session.client(
-                                service_name = service_name,
-                                region_name = region_name
-                                )
-
-        # Get secret keys and values and return the dict
-        get_secret_value_response = client.get_secret_value(
-            SecretId = secret_name
-        )
-        
-        print("Exiting... get_secret()")
-        return get_secret_value_response
-    except Exception as get_secret_function_exception:
-        print("Error occured inside get_secret()",str(get_secret_function_exception))
-        
-        # Creating and logging an error message, in case of an exception
-        create_and_insert_error()
-        raise
+    key = (role, warehouse, os.getpid())
 
+    with _pool_lock:
+        connection = _connection_pool.get(key)
+        if (connection is not None) and not connection.is_closed():
+            _login_stats['reuses'] += 1
+            return connection
 
+        connection = _login(role, warehouse)
+        _connection_pool[key] = connection
+        return connection
 
-# 3. Creation of cursor and connection to connect to database
 
-def connect_to_db():
+def connect_to_db(role=None, warehouse=None):
     """Creating connection using the snowflake connector.
 
+    Parameters
+    ----------
+    role : string, optional
+        Role of the session.
+    warehouse : string, optional
+        Warehouse of the session.
+
     Returns
     -------
     objects
@@ -88,8 +142,9 @@ def connect_to_db():
 
     How it works
     ------------
-        1. Creates connection object using the credentials from 
-        the config file and the snowflake connector.
+        1. Reuses the open connection of this process for the role 
+        and warehouse, if any, else creates it using the credentials 
+        from the config file and the snowflake connector.
         2. Creates cursor using the above connection object.
         3. Returns both objects.
 
@@ -101,38 +156,61 @@ def connect_to_db():
         connection = ""
         cursor = ""
         
-        # Get the secret keys from Secrets Manager
-        get_secret_value_response = get_secret()
-        secret_string = eval(get_secret_value_response['SecretString']) 
-        
-        user = secret_string[con.USERNAME]
-        pwd = secret_string[con.PASSWORD]
-        account = secret_string[con.ACCOUNT]
-        warehouse = secret_string[con.WAREHOUSE]
-        database = secret_string[con.DB]
-        schema = secret_string[con.SCHEMA]
-        #role = secret_string[con.key7]
-        
-        # Connection creation using the snoflake secret values
-        connection = snow.connect(
-                                  account = account,
-                                  user = user,
-                                  password = pwd,
-                                  database = database,
-                                  schema = schema,
-                                  warehouse = warehouse
-                                  #role = role
-                                  )
+        connection = get_connection(role, warehouse)
         
-        # Cursor creation using the above created connection
+        # Cursor creation using the above connection
         cursor = connection.cursor()
         
         print("Exiting... connect_to_db()")
         return cursor, connection   
     
     except Exception as connect_to_db_function_exception:
-        print("Error occured inside connect_to_db()",str(connect_to_db_function_exception))
+        print("Error occured inside connect_to_db()", str(connect_to_db_function_exception))
         
         # Creating and logging an error message, in case of an exception
         create_and_insert_error()
         raise
+
+
+@contextmanager
+def db_session(role=None, warehouse=None):
+    """Cursor on the pooled connection, closed on exit. The connection
+    stays open for the next caller.
+
+    Usage
+    -----
+        with db_session() as (cur, conn):
+            cur.execute(query)
+
+    """
+    cursor, connection = connect_to_db(role, warehouse)
+    try:
+        yield cursor, connection
+    finally:
+        cursor.close()
+
+
+# 3. Login statistics and closing the pool
+
+def get_login_stats():
+    """Number of logins and reuses, and seconds spent logging in."""
+    stats = dict(_login_stats)
+    stats['login_seconds'] = round(stats['login_seconds'], 2)
+    return stats
+
+
+def close_all_connections():
+    """Close the pooled connections of this process."""
+    with _pool_lock:
+        for key in list(_connection_pool):
+            if key[2] == os.getpid():
+                try:
+                    _connection_pool.pop(key).close()
+                except Exception as e:
+                    print(f'Error while closing the connection : {e}')
+    print("Snowflake login stats :", get_login_stats())
+    print("Secret cache stats :", get_secret_cache_stats())
+
+
+# Closing the connections when the job ends
+atexit.register(close_all_connections)
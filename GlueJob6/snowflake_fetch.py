@@ -0,0 +1,124 @@
+# Arrow based fetch of Snowflake query results
+#
+# Python Version: 3.8.12
+#
+# Description : Fetch the result of a query as column typed dataframes
+#               built from the connector's Arrow result batches, instead
+#               of materializing the rows as Python tuples (read_sql,
+#               fetchall), whole or streamed batch by batch
+#
+# Coding Steps :
+#               1. Execute the query on a new cursor
+#               2. Fetch the whole result (fetch_pandas_all) or pass each
+#                  batch to a callback (fetch_pandas_batches)
+#               3. Fall back to fetchall when the result isn't in Arrow
+#                  format (SHOW/DESCRIBE, Arrow disabled)
+#               4. Report the rows fetched per second
+
+
+# 1. Import built-in packages and user defined functions
+
+from time import time
+from pandas import DataFrame
+from snowflake.connector.errors import NotSupportedError
+
+import processed_configuration as con
+
+
+# 2. Column types of the fetched frames
+
+def _column_names(cur):
+    """Column names of the result of the cursor."""
+    return [col[0] for col in cur.description]
+
+
+def _widen_integers(frame):
+    """Integer columns as int64, as read_sql returns them (the Arrow
+    batches use the narrowest integer type of the values)."""
+    for col in frame.columns:
+        if (frame[col].dtype.kind == 'i') and (frame[col].dtype.itemsize < 8):
+            frame[col] = frame[col].astype('int64')
+    return frame
+
+
+def _typed_frame(frame, cur):
+    """Fetched frame with its columns even when the result is empty."""
+    if (frame is None) or (frame.shape[1] == 0):
+        return DataFrame(columns=_column_names(cur))
+    return _widen_integers(frame)
+
+
+def _report(query, rows, start):
+    """Print the rows fetched and the fetch rate."""
+    elapsed = time() - start
+    rate = rows / elapsed if elapsed > 0 else float(rows)
+    print("Fetched", rows, "row(s) in", round(elapsed, 2), "sec (",
+          int(rate), "rows/sec ) :", " ".join(query.split())[:80])
+
+
+# 3. Fetching a query result
+
+def fetch_frame(conn, query, params=None, on_batch=None):
+    """Result of the query as a dataframe, or streamed to on_batch.
+
+    Parameters
+    ----------
+    conn : object
+        Snowflake DB connection object.
+    query : string
+        Query to be executed.
+    params : tuple or dict, optional
+        Bind parameters of the query.
+    on_batch : function, optional
+        Called with each result batch (dataframe) for the results too
+        large to be held in memory at once.
+
+    Returns
+    -------
+    dataframe or int
+        Result of the query (same rows and columns as read_sql), or the
+        number of rows passed to on_batch when it is given.
+
+    How it works
+    ------------
+        1. Execute the query on a new cursor.
+        2. Build the frame from the Arrow batches (fetch_pandas_all),
+        or pass the batches one by one to on_batch
+        (fetch_pandas_batches). Integer columns are widened to int64.
+        3. If the result isn't in Arrow format or arrow_fetch_enabled
+        is False, fetch the rows with fetchall.
+        4. Print the rows fetched per second.
+
+    """
+    start = time()
+    cur = conn.cursor()
+    try:
+        cur.execute(query, params)
+
+        if con.arrow_fetch_enabled:
+            try:
+                if on_batch is None:
+                    frame = _typed_frame(cur.fetch_pandas_all(), cur)
+                    _report(query, frame.shape[0], start)
+                    return frame
+
+                rows = 0
+                for batch in cur.fetch_pandas_batches():
+                    if batch.shape[0] > 0:
+                        on_batch(_widen_integers(batch))
+                        rows += batch.shape[0]
+                _report(query, rows, start)
+                return rows
+            except NotSupportedError:
+                # Result not in Arrow format, nothing fetched yet
+                print("Arrow fetch not supported, fetching the rows ...")
+
+        frame = DataFrame(cur.fetchall(), columns=_column_names(cur))
+        _report(query, frame.shape[0], start)
+        if on_batch is None:
+            return frame
+        if frame.shape[0] > 0:
+            on_batch(frame)
+        return frame.shape[0]
+    finally:
+        cur.close()